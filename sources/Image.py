@@ -2,7 +2,11 @@ import ee
 
 
 import math
+import json
+import os
 import eoAuxData as eoAD
+import eoTileGrids as eoTG
+import eoTaskMonitor as eoTM
 
 
 
@@ -55,6 +59,7 @@ pix_date        = 'date'
 neg_blu_score   = 'neg_blu_score'
 Texture_name    = 'texture'
 mosaic_ssr_code = 'ssr_code'
+pix_obs_count   = 'obs_count'
 PARAM_NDVI      = 'ndvi'
 
 
@@ -694,6 +699,9 @@ def CVA_SAM(Image1, Image2, ValScale):
 #############################################################################################################
 # Description: This function returns a superpixel ee.Image object corresponding to a give image
 #
+# Note:        For whole tiles, exported mosaics can be segmented locally with "SNIC_files" function in
+#              LocalSNIC.py, which uses the same seed spacing, compactness and connectivity.
+#
 # Revision history:  2022-Apr-01  Lixin Sun  Initial creation
 #
 #############################################################################################################
@@ -711,33 +719,66 @@ def superpixel_img(inImage):
 
 
 
+#############################################################################################################
+# Description: This function starts an exporting task and returns the task, so that the ID of the task can
+#              be kept in a task list (note that "ee.batch.Task.start" returns None).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def start_task(Task):
+  Task.start()
+
+  return Task
+
+
+
+
 #############################################################################################################
 # Description: This function manages a list of exporting tasks
 #
+# Note:        The 'status' type uses a task monitor (see eoTaskMonitor.py) kept for each filter string, so
+#              that repeated calls poll the operations incrementally and report the throughput, ETA, stalled
+#              and failed tasks of a job. The 'cancel' type cancels all the active operations matching the
+#              filter, including older copies of resubmitted tasks.
+#
 # Revision history:  2022-Feb-10  Lixin Sun  Initial creation 
+#                    2026-Oct-19             Used cached task monitors for 'status' type
 #
 #############################################################################################################
+_TASK_MONITORS = {}
+
+def task_monitor(filter):
+  '''Returns the task monitor of a filter string, which is created when it does not exist.'''
+  if filter not in _TASK_MONITORS:
+    _TASK_MONITORS[filter] = eoTM.new_monitor(filter, ListOps = ee.data.listOperations)
+
+  return _TASK_MONITORS[filter]
+
+
+
 def manage_tasks(manage_type, filter):
   '''This function manages a list of exporting tasks.
      Args:
        manage_type(string): a string representing a task type, such as 'status' or 'cancel';
        filter(string): a string for filtering task names. '''
   #==========================================================================================================
+  # Report the status of the tasks through a task monitor (always polled for an interactive report)
+  #==========================================================================================================  
+  if manage_type.find('status') > -1:
+    return eoTM.print_status(task_monitor(filter), '', True, True)
+
+  #==========================================================================================================
   # Get a list of exporting tasks
   #==========================================================================================================  
   task_list = ee.data.listOperations()
 
-  if manage_type.find('status') > -1:
+  if manage_type.find('cancel') > -1:
     for task in task_list:
-      if task['metadata']['description'].find(filter) > -1: 
-        print(task['metadata']['description']+': ' + task['metadata']['state'])
-    
-  elif manage_type.find('cancel') > -1:
-    for task in task_list:
-      if task['metadata']['description'].find(filter) > -1:         
+      if task['metadata']['description'].find(filter) > -1 and task['metadata'].get('state', '') in ['PENDING', 'RUNNING']:
         ee.data.cancelOperation(task['name'])
         print(task['metadata']['description'] + ' has been cancelled.')
-    
+
   elif manage_type.find('list') > -1:  
     print('<manage_tasks> the list of all exporting tasks:', ee.data.listOperations())
   
@@ -789,7 +830,7 @@ def get_folder_file_names(inParams, prod_name):
 #              QC map to either Google Drive or Google Cloud Storage
 #
 # Revision history:  2022-Nov-14  Lixin Sun  Initial creation 
-#
+#                    2026-Oct-19             Added Cloud Optimized GeoTIFF option.
 #############################################################################################################
 def export_compact_params(fun_Param_dict, region, compactImg, task_list):
   '''Exports a 64-Bits image that contains FOUR biophysical parameter maps and one QC map to either GD or GCS.
@@ -829,6 +870,8 @@ def export_compact_params(fun_Param_dict, region, compactImg, task_list):
                  'crs': 'EPSG:3979',
                  'maxPixels': 1e11,
                  'region': region}
+  
+  set_export_format(fun_Param_dict, export_dict)
 
   #==========================================================================================================
   # Export a 64-bits image containing FOUR biophysical parameter maps and one map to either GD or GCS
@@ -837,11 +880,119 @@ def export_compact_params(fun_Param_dict, region, compactImg, task_list):
 
   if out_location.find('drive') > -1:
     export_dict['folder'] = exportFolder
-    task_list.append(ee.batch.Export.image.toDrive(**export_dict).start())
+    task_list.append(start_task(ee.batch.Export.image.toDrive(**export_dict)))
   elif out_location.find('storage') > -1:
     export_dict['bucket'] = str(fun_Param_dict['bucket'])
     export_dict['fileNamePrefix'] = exportFolder + '/' + filename
-    task_list.append(ee.batch.Export.image.toCloudStorage(**export_dict).start())
+    task_list.append(start_task(ee.batch.Export.image.toCloudStorage(**export_dict)))
+
+
+
+
+#############################################################################################################
+# Description: This function sets the file format options of a given export dictionary, so that the images
+#              are exported as Cloud Optimized GeoTIFFs (internally tiled, with overviews) when the 
+#              'cloud_optimized' parameter is True.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def set_export_format(inParams, ExportDict):
+  if 'cloud_optimized' in inParams and inParams['cloud_optimized'] == True:
+    ExportDict['fileFormat']    = 'GeoTIFF'
+    ExportDict['formatOptions'] = {'cloudOptimized': True}
+
+  return ExportDict
+
+
+
+
+#############################################################################################################
+# Description: This function returns a list of (name, region) pairs into which an export is fanned out. 
+#              When 'fan_out' parameter is 4 or 9 and current region is a full tile, one pair is returned
+#              for each subtile, otherwise only one pair for the given region is returned.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def get_export_pieces(inParams, Region):
+  '''Returns a list of (name, region) pairs into which an export is fanned out.
+
+     Args:
+       inParams(dictionary): a dictionary storing other required running parameters;
+       Region(ee.Geometry): the spatial region of interest.'''
+  region_str = str(inParams['current_region'])
+  nSubs      = int(inParams['fan_out']) if 'fan_out' in inParams else 0
+
+  sub_regions = eoTG.get_subTile_regions(region_str, nSubs)
+  if len(sub_regions) < 1:
+    return [(region_str, ee.Geometry(Region))]
+  
+  return [(name, sub_regions[name]) for name in eoTG.get_subTile_names(region_str, nSubs)]
+
+
+
+
+#############################################################################################################
+# Description: This function returns the filename of one export piece by replacing the region name at the 
+#              beginning of a given filename with the name of the piece.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def get_piece_filename(inParams, FileName, PieceName):
+  region_str = str(inParams['current_region'])
+
+  if region_str == PieceName:
+    return FileName
+  elif FileName.startswith(region_str):
+    return PieceName + FileName[len(region_str):]
+  else:
+    return FileName + '_' + PieceName.split('_')[-1]
+
+
+
+
+#############################################################################################################
+# Description: This function writes a JSON manifest listing all the pieces of a fanned out export, so that 
+#              the pieces can be checked, retried and reassembled after the exporting tasks are finished.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def write_export_manifest(inParams, ProdName, ExportFolder, Pieces):
+  '''Writes a JSON manifest file for a fanned out export and returns its full path.
+
+     Args:
+       inParams(dictionary): a dictionary storing other required running parameters;
+       ProdName(string): a name string for the exported product;
+       ExportFolder(string): the folder name on GD or GCS where the pieces are exported to;
+       Pieces(list): a list of dictionaries, each describing one export piece.'''
+  if len(set([piece['name'] for piece in Pieces])) < 2:
+    return None   # No manifest is necessary for an export that is not fanned out 
+
+  region_str = str(inParams['current_region'])
+  time_str   = str(inParams['time_str'])
+  out_dir    = str(inParams['manifest_folder']) if 'manifest_folder' in inParams else ''
+  out_dir    = out_dir if len(out_dir) > 0 else os.getcwd()
+
+  manifest = {'region':       region_str,
+              'time_str':     time_str,
+              'product':      ProdName,
+              'fan_out':      int(inParams['fan_out']),
+              'resolution':   int(inParams['resolution']),
+              'projection':   str(inParams['projection']),
+              'out_location': str(inParams['out_location']).lower(),
+              'folder':       ExportFolder,
+              'pieces':       Pieces}
+
+  os.makedirs(out_dir, exist_ok = True)
+  full_path = os.path.join(out_dir, region_str + '_' + time_str + '_' + ProdName + '_manifest.json')
+  with open(full_path, 'w') as manifest_file:
+    json.dump(manifest, manifest_file, indent = 2)
+
+  print('<write_export_manifest> Export manifest was saved to', full_path)
+  return full_path
 
 
 
@@ -850,7 +1001,9 @@ def export_compact_params(fun_Param_dict, region, compactImg, task_list):
 # Description: This function exports one biophysical parameter map to either GD or GCS.
 #
 # Revision history:  2022-Nov-14  Lixin Sun  Initial creation 
-#
+#                    2026-Oct-19             Fanned out the export into subtile tasks as required, and saved
+#                                            a manifest of the pieces.
+#                    2026-Oct-19             Added Cloud Optimized GeoTIFF option.
 #############################################################################################################
 def export_one_map(inParams, Region, OutMap, ProdName, task_list):
   '''Exports one biophysical parameter map to one of three places: GD, GCS or GEE assets.
@@ -880,22 +1033,35 @@ def export_one_map(inParams, Region, OutMap, ProdName, task_list):
                  'crs': proj_str,   #'EPSG:3979',
                  'maxPixels': 1e11,
                  'region': ee.Geometry(Region)}  
+  
+  set_export_format(inParams, export_dict)
 
   #==========================================================================================================
-  # Export a biophysical parameter map to one of three places: GD, GCS or GEE Assets
+  # Export a biophysical parameter map to one of three places: GD, GCS or GEE Assets. One exporting task is
+  # submitted for each piece (the whole region or one of its subtiles)
   #==========================================================================================================  
   out_location = str(inParams['out_location']).lower()
+  pieces       = []
 
-  if out_location.find('drive') > -1:
-    print('<export_one_param> Exporting a resultant map to Google Drive......')
-    export_dict['folder']         = exportFolder
-    export_dict['fileNamePrefix'] = filename
-    task_list.append(ee.batch.Export.image.toDrive(**export_dict).start())
+  for piece_name, piece_region in get_export_pieces(inParams, Region):
+    piece_file = get_piece_filename(inParams, filename, piece_name)
+    export_dict['region']      = piece_region
+    export_dict['description'] = piece_file
 
-  elif out_location.find('storage') > -1:
-    print('<export_one_param> Exporting biophysical map to Google Cloud Storage......')
-    export_dict['bucket']         = str(inParams['bucket'])
-    export_dict['fileNamePrefix'] = exportFolder + '/' + filename
-    task_list.append(ee.batch.Export.image.toCloudStorage(**export_dict).start())
+    if out_location.find('drive') > -1:
+      print('<export_one_param> Exporting a resultant map to Google Drive......')
+      export_dict['folder']         = exportFolder
+      export_dict['fileNamePrefix'] = piece_file
+      task_list.append(start_task(ee.batch.Export.image.toDrive(**export_dict)))
+
+    elif out_location.find('storage') > -1:
+      print('<export_one_param> Exporting biophysical map to Google Cloud Storage......')
+      export_dict['bucket']         = str(inParams['bucket'])
+      export_dict['fileNamePrefix'] = exportFolder + '/' + piece_file
+      task_list.append(start_task(ee.batch.Export.image.toCloudStorage(**export_dict)))
+
+    pieces.append({'name': piece_name, 'description': piece_file, 'file_prefix': export_dict.get('fileNamePrefix', piece_file)})
+
+  write_export_manifest(inParams, ProdName, exportFolder, pieces)
 
   
\ No newline at end of file
@@ -2,6 +2,7 @@ import ee
 
 import Image as Img
 import eoAuxData as eoAD
+import eoQALUT as eoQA
 
 
 
@@ -10,6 +11,16 @@ WATER_MASK = 2
 SNOW_MASK  = 3
 SATU_MASK  = 4   #Radiometric satuation
 
+# The bits in the mask band created by "Img_MaskBits" function
+BIT_CLOUD  = 1 << 0
+BIT_SHADOW = 1 << 1
+BIT_SNOW   = 1 << 2
+BIT_WATER  = 1 << 3
+BIT_VEG    = 1 << 4
+BIT_SATU   = 1 << 5
+BIT_RANGE  = 1 << 6   # Out-of-range reflectance values
+BIT_NONVEG = 1 << 7   # Non-vegetated pixels ('lxi' index in "Img_NonVegMask")
+
 
 
 
@@ -77,35 +88,75 @@ def mask_from_MODIS(Image, SsrData, MODIS_mosaic):
 
 
 #############################################################################################################
-# Description: Returns a clear-sky mask (1 indicates cloud/cloud shadow) for a given Sentinel-2 image
+# Description: This function converts the bit-packed LUT codes of the QA bands of an image into pixel
+#              classes (QA_CLEAR, QA_CLOUD, QA_SHADOW, QA_SNOW, QA_WATER and QA_SATU in eoQALUT.py) with one
+#              "remap" call.
+#
+# Revision history:  2026-Oct-19  Initial creation
 #
-# Revision history:  2023-Dec-02  Lixin Sun  Created for usable in the "map" function
-#                    2025-Mar-31  Lixin Sun  Updated to align with the changes in Sentinel-2 image 
 #############################################################################################################
-def S2_ClearMask(inImg, Year, inUnit):
-  # For Sentinel-2, only two bands, 'QA60' and 'SCL', include mask information    
+def LUT_class_img(CodeImg, LUT):
+  '''Returns a uint8 image of bit-packed pixel classes.
+
+     Args:
+       CodeImg(ee.Image): A single-band image of LUT codes;
+       LUT(ndarray): The LUT of a sensor (eoQA.S2_LUT, eoQA.LS_LUT or eoQA.HLS_LUT).'''
+  nb_codes = len(LUT)
+
+  return ee.Image(CodeImg).remap(list(range(nb_codes)), [int(value) for value in LUT], 0).uint8()
+
 
-  scl  = ee.Image.constant(0)
-  mask = ee.Image.constant(0)
-  if inUnit == 2:   #The given image is surface reflectance
-    scl = inImg.select(['SCL'])
-  #scl = scl.where(ee.Number(inUnit).eq(2), inImg.select(['SCL']))
 
-  if Year > 2023:
-    cloud  = inImg.select(['MSK_CLASSI_OPAQUE'])
-    cirrus = inImg.select(['MSK_CLASSI_CIRRUS'])
 
-    mask = cloud.eq(1).Or(cirrus.eq(1))
+#############################################################################################################
+# Description: These functions create the single-band LUT code images from the QA bands of Sentinel-2,
+#              Landsat and HLS images, in the same way as "S2_codes", "LS_codes" and "HLS_codes" functions
+#              in eoQALUT.py.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def S2_code_img(inImg, Year, inUnit):
+  # For Sentinel-2, only 'SCL' and 'QA60' (or 'MSK_CLASSI_xxx' since 2024) bands include mask information
+  scl = inImg.select(['SCL']).uint8() if inUnit == 2 else ee.Image.constant(0).uint8()
+
+  if Year > 2023:
+    opaque = inImg.select(['MSK_CLASSI_OPAQUE']).eq(1).multiply(16)
+    cirrus = inImg.select(['MSK_CLASSI_CIRRUS']).eq(1).multiply(32)
+    cloud  = opaque.add(cirrus)
   else:
-    qa = inImg.select(['QA60']).uint16()
+    cloud = inImg.select(['QA60']).uint16().rightShift(10).bitwiseAnd(3).multiply(16)
+
+  return scl.add(cloud).uint8()
+
+
+
+def LS_code_img(inImg):
+  # For Landsat series images, only 'QA_PIXEL' band includes mask information  
+  return inImg.select(['QA_PIXEL']).uint16().bitwiseAnd(0xFF).uint8()
 
-    cloud  = ee.Image.constant(1 << 10)   # Opaque clouds
-    cirrus = ee.Image.constant(1 << 11)   # Cirrus clouds
 
-    mask = qa.bitwiseAnd(cloud).Or(qa.bitwiseAnd(cirrus))
 
-  # Note: Adding SCL=7 will cause the misiing of boundary pixels between water and land 
-  return mask.Or(scl.eq(3)).Or(scl.eq(8)).Or(scl.eq(9)).Or(scl.eq(10))   #.Or(scl.eq(7))
+def HLS_code_img(inImg):
+  # For a harminized Landsat Sentinel image, only 'Fmask' band includes mask information  
+  return inImg.select(['Fmask']).uint8()
+
+
+
+
+#############################################################################################################
+# Description: Returns a clear-sky mask (1 indicates cloud/cloud shadow) for a given Sentinel-2 image
+#
+# Revision history:  2023-Dec-02  Lixin Sun  Created for usable in the "map" function
+#                    2025-Mar-31  Lixin Sun  Updated to align with the changes in Sentinel-2 image 
+#                    2026-Oct-19             Replaced the chain of bitwise and comparison operations with a
+#                                            lookup table (see eoQALUT.py).
+#############################################################################################################
+def S2_ClearMask(inImg, Year, inUnit):
+  # Note: SCL=7 is not regarded as cloud since it causes the misiing of boundary pixels between water and land 
+  classes = LUT_class_img(S2_code_img(inImg, Year, inUnit), eoQA.S2_LUT)
+
+  return classes.bitwiseAnd(eoQA.QA_CLOUD_SHADOW).neq(0)
 
   
 
@@ -113,17 +164,13 @@ def S2_ClearMask(inImg, Year, inUnit):
 # Description: Returns a clear-sky mask (1 indicates cloud/cloud shadow) for a given Landsat image
 #
 # Revision history:  2023-Dec-02  Lixin Sun  Created for usable in the "map" function
-# 
+#                    2026-Oct-19             Replaced the chain of bitwise operations with a lookup table.
 #############################################################################################################
 def LS_ClearMask(inImg):
-  # For Landsat series images, only 'QA_PIXEL' band includes mask information  
-  qa = inImg.select(['QA_PIXEL']).uint16()
-  dilated = ee.Image.constant(1 << 1)
-  cirrus  = ee.Image.constant(1 << 2)
-  cloud   = ee.Image.constant(1 << 3)
-  shadow  = ee.Image.constant(1 << 4)
+  # Dilated cloud, cirrus, cloud and cloud shadow are all flagged 
+  classes = LUT_class_img(LS_code_img(inImg), eoQA.LS_LUT)
   
-  return qa.bitwiseAnd(dilated).Or(qa.bitwiseAnd(cirrus)).Or(qa.bitwiseAnd(cloud)).Or(qa.bitwiseAnd(shadow))
+  return classes.bitwiseAnd(eoQA.QA_CLOUD_SHADOW).neq(0)
       
 
 
@@ -131,18 +178,13 @@ def LS_ClearMask(inImg):
 # Description: Returns a clear-sky mask (1 indicates cloud/cloud shadow) for a given HLS image
 #
 # Revision history:  2023-Dec-02  Lixin Sun  Created for usable in the "map" function
-# 
+#                    2026-Oct-19             Replaced the chain of bitwise operations with a lookup table.
 #############################################################################################################
 def HLS_ClearMask(inImg):
-  # For a harminized Landsat Sentinel image, only 'Fmask' band includes mask information  
-  qa = inImg.select(['Fmask']).uint8()            
-  cloud  = ee.Image.constant(1 << 1)
-  AdjCS  = ee.Image.constant(1 << 2)
-  shadow = ee.Image.constant(1 << 3) 
-  AOT    = ee.Image.constant(1 << 7)
+  # Only cloud and cloud shadow are flagged (the pixels adjacent to cloud/shadow and high aerosol are not)
+  classes = LUT_class_img(HLS_code_img(inImg), eoQA.HLS_LUT)
 
-  return qa.bitwiseAnd(cloud).Or(qa.bitwiseAnd(shadow))  #.Or(qa.bitwiseAnd(AdjCS)).Or(qa.bitwiseAnd(AOT))
-  #return qa.bitwiseAnd(cloud).Or(qa.bitwiseAnd(AdjCS)).Or(qa.bitwiseAnd(shadow)).Or(qa.bitwiseAnd(AOT))
+  return classes.bitwiseAnd(eoQA.QA_CLOUD_SHADOW).neq(0)
 
 
 
@@ -159,6 +201,10 @@ def HLS_ClearMask(inImg):
 # Revision history:  2022-Jun-22  Lixin Sun  Initial creation
 #                    2023-Jan-11  Lixin Sun  Added MODIS sensor code option and MODIS mosaic image.
 #                    2023-Nov-30  Lixin Sun  Added mask option for harmonized Landsat and Sentinel-2 images
+#                    2026-Oct-19             Applied the given MODIS mosaic to clear-sky masks.
+#                    2026-Oct-19             Used the lookup tables in eoQALUT.py for Sentinel-2, Landsat and
+#                                            HLS images.
+#                    2026-Oct-19             Regarded the pixels without a valid MODIS test as not cloudy.
 #
 #############################################################################################################
 def Img_VenderMask(Image, Year, SsrData, MaskType, MODIS_mosaic = None):
@@ -193,33 +239,32 @@ def Img_VenderMask(Image, Year, SsrData, MaskType, MODIS_mosaic = None):
     return mask
   elif ssr_code > Img.MAX_LS_CODE and ssr_code < Img.MOD_sensor:  # For Sentinel-2 image
     if mask_type == CLEAR_MASK:
-      return S2_ClearMask(Image, Year, data_unit)
+      mask = S2_ClearMask(Image, Year, data_unit)
+      return mask if MODIS_mosaic is None else mask.Or(mask_from_MODIS(Image, SsrData, MODIS_mosaic).unmask(0))
     else:
-      scl = ee.Image.constant(0)
-      scl = scl.where(ee.Number(data_unit).eq(2), Image.select(['SCL']))
+      classes = LUT_class_img(S2_code_img(Image, Year, data_unit), eoQA.S2_LUT)
 
       if mask_type == WATER_MASK:
-        return scl.eq(6)
+        return classes.bitwiseAnd(eoQA.QA_WATER).neq(0)
       elif mask_type == SNOW_MASK:
-        return scl.eq(11)
+        return classes.bitwiseAnd(eoQA.QA_SNOW).neq(0)
       elif mask_type == SATU_MASK:
-        return scl.eq(1)
+        return classes.bitwiseAnd(eoQA.QA_SATU).neq(0)
       else:
         return ee.Image.constant(0)
       
   elif ssr_code < Img.MAX_LS_CODE:   # For both BOA and TOA reflectance data of Landsat 5/7/8/9
     # For Landsat, only 'QA_PIXEL' band includes mask information
     if mask_type == CLEAR_MASK:
-      return LS_ClearMask(Image)
+      mask = LS_ClearMask(Image)
+      return mask if MODIS_mosaic is None else mask.Or(mask_from_MODIS(Image, SsrData, MODIS_mosaic).unmask(0))
     
     else:
-      qa = Image.select(['QA_PIXEL']).uint16()
+      classes = LUT_class_img(LS_code_img(Image), eoQA.LS_LUT)
       if mask_type == WATER_MASK:
-        water = ee.Image.constant(1 << 7)
-        return qa.bitwiseAnd(water)   # Bit 7: Water
+        return classes.bitwiseAnd(eoQA.QA_WATER).neq(0)   # Bit 7: Water
       elif mask_type == SNOW_MASK:
-        snow = ee.Image.constant(1 << 5)
-        return qa.bitwiseAnd(snow)    # Bit 5: Snow
+        return classes.bitwiseAnd(eoQA.QA_SNOW).neq(0)    # Bit 5: Snow
       elif mask_type == SATU_MASK:
         sa = Image.select(['QA_RADSAT']).uint8()
         mask = sa.bitwiseOr(0)
@@ -227,15 +272,14 @@ def Img_VenderMask(Image, Year, SsrData, MaskType, MODIS_mosaic = None):
         
   elif ssr_code == Img.HLS_sensor:    
     if mask_type == CLEAR_MASK:
-      return HLS_ClearMask(Image)
+      mask = HLS_ClearMask(Image)
+      return mask if MODIS_mosaic is None else mask.Or(mask_from_MODIS(Image, SsrData, MODIS_mosaic).unmask(0))
     else:
-      qa = Image.select(['Fmask']).uint8()            
+      classes = LUT_class_img(HLS_code_img(Image), eoQA.HLS_LUT)
       if mask_type == WATER_MASK:
-        water = ee.Image.constant(1 << 5)
-        return qa.bitwiseAnd(water)   # Bit 7: Water
+        return classes.bitwiseAnd(eoQA.QA_WATER).neq(0)   # Bit 5: Water
       elif mask_type == SNOW_MASK:
-        snow   = ee.Image.constant(1 << 4)
-        return qa.bitwiseAnd(snow)    # Bit 5: Snow        
+        return classes.bitwiseAnd(eoQA.QA_SNOW).neq(0)    # Bit 4: Snow        
       else:
         return ee.Image.constant(0)    
     
@@ -549,6 +593,117 @@ def Img_ValidMask(Image, Year, SsrData, MaxRef):
 
   
 
+#############################################################################################################
+# Description: This function creates all the masks of an image in one pass and packs them into one uint8
+#              band. The spectral bands and the indices shared by different masks (e.g., NDVI and the mean of
+#              two SWIR bands) are computed only once, and the vendor QA bands are decoded with one lookup
+#              table "remap". 
+#
+# Note:        (1) The bits in the returned band are BIT_CLOUD, BIT_SHADOW, BIT_SNOW, BIT_WATER, BIT_VEG,
+#                  BIT_SATU, BIT_RANGE and BIT_NONVEG, which are the same as the results of "Img_VenderMask",
+#                  "Img_SnowMask", "Img_WaterMask", "Img_VegMask", "Img_ValueMask" and "Img_NonVegMask"
+#                  (with 'lxi' index) functions;
+#              (2) The bits can be tested with "test_MaskBits" function;
+#              (3) The StateQA mask of MODIS images does not separate cloud from snow, so it is all put into
+#                  BIT_CLOUD.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Unmasked the spectral tests where an index has a zero denominator
+#
+#############################################################################################################
+def Img_MaskBits(Image, Year, SsrData, MaxRef):
+  '''Creates a uint8 band (named 'mask_bits') with all the masks of an image packed as bits.
+
+     Args:
+       Image(ee.Image): a given ee.Image object;
+       Year(int): An integer representing a targeted year;
+       SsrData(Dictionary): A Dictionary containing metadata associated with a sensor and data unit;
+       MaxRef(int): a maximum reflectance value (1 or 100).'''
+  ssr_code = SsrData['SSR_CODE']
+  max_ref  = ee.Number(MaxRef)
+
+  #==========================================================================================================
+  # Decode vendor QA bands into the bits of cloud, shadow, snow, water and saturation 
+  #==========================================================================================================
+  if ssr_code == Img.MOD_sensor:
+    bits = Img_VenderMask(Image, Year, SsrData, CLEAR_MASK).neq(0).multiply(BIT_CLOUD)
+  else:
+    if ssr_code < Img.MAX_LS_CODE:
+      classes = LUT_class_img(LS_code_img(Image), eoQA.LS_LUT)
+    elif ssr_code == Img.HLS_sensor:
+      classes = LUT_class_img(HLS_code_img(Image), eoQA.HLS_LUT)
+    else:
+      classes = LUT_class_img(S2_code_img(Image, Year, SsrData['DATA_UNIT']), eoQA.S2_LUT)
+
+    # The class flags in eoQALUT are mapped to the bits of the mask band
+    bits = classes.bitwiseAnd(eoQA.QA_CLOUD).neq(0).multiply(BIT_CLOUD) \
+           .add(classes.bitwiseAnd(eoQA.QA_SHADOW).neq(0).multiply(BIT_SHADOW)) \
+           .add(classes.bitwiseAnd(eoQA.QA_SNOW).neq(0).multiply(BIT_SNOW)) \
+           .add(classes.bitwiseAnd(eoQA.QA_WATER).neq(0).multiply(BIT_WATER))
+
+    if ssr_code < Img.MAX_LS_CODE:
+      bits = bits.add(Image.select(['QA_RADSAT']).uint8().gt(0).multiply(BIT_SATU))
+    elif ssr_code != Img.HLS_sensor:
+      bits = bits.add(classes.bitwiseAnd(eoQA.QA_SATU).neq(0).multiply(BIT_SATU))
+
+  bits = ee.Image(bits).uint8()
+
+  #==========================================================================================================
+  # Compute the bands and the indices shared by the spectral tests only once
+  #==========================================================================================================
+  blu = Image.select(SsrData['BLU'])
+  grn = Image.select(SsrData['GRN'])
+  red = Image.select(SsrData['RED'])
+  nir = Image.select(SsrData['NIR'])
+  sw1 = Image.select(SsrData['SW1'])
+  sw2 = Image.select(SsrData['SW2'])
+
+  ndvi    = nir.subtract(red).divide(nir.add(red))
+  sw_mean = sw1.add(sw2).divide(2.0)
+  ndwi    = grn.subtract(sw_mean).divide(grn.add(sw_mean))
+  ndsi    = grn.subtract(sw1).divide(grn.add(sw1))
+
+  #==========================================================================================================
+  # Spectral tests (the same as those in "Img_SnowMask", "Img_WaterMask", "Img_VegMask", "Img_NonVegMask"
+  # and "Img_ValueMask" functions). The pixels where an index is undefined (zero denominator) fail the test
+  # rather than masking the whole 'mask_bits' band
+  #==========================================================================================================
+  snow  = ndsi.gt(0.2).And(grn.gt(max_ref.multiply(0.1))).unmask(0)
+  water = sw_mean.lt(max_ref.multiply(0.02)).And(ndwi.gt(0.3)) \
+          .Or(nir.lt(max_ref.multiply(0.15)).And(ndwi.gt(0.3))) \
+          .Or(nir.lt(max_ref.multiply(0.10)).And(ndwi.gt(0.2))).unmask(0)
+  veg    = ndvi.gt(0.3).And(grn.gt(blu)).And(grn.gt(red)).unmask(0)
+  nonveg = ndvi.lt(0.3).And(nir.gt(max_ref.multiply(0.08))).unmask(0)
+
+  used_img  = Image.select(SsrData['OUT_BANDS'])
+  out_range = used_img.lt(max_ref.multiply(-0.005)).Or(used_img.gt(max_ref.multiply(1.05))).reduce(ee.Reducer.max())
+
+  bits = bits.bitwiseOr(snow.multiply(BIT_SNOW)).bitwiseOr(water.multiply(BIT_WATER)) \
+             .bitwiseOr(veg.multiply(BIT_VEG)).bitwiseOr(nonveg.multiply(BIT_NONVEG)) \
+             .bitwiseOr(out_range.multiply(BIT_RANGE))
+
+  return bits.uint8().rename(['mask_bits'])
+
+
+
+
+#############################################################################################################
+# Description: This function tests the given bits in a mask band created by "Img_MaskBits" function.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def test_MaskBits(MaskBits, Bits):
+  '''Returns a 0/1 image with 1 representing the pixels with any of the given bits set.
+
+     Args:
+       MaskBits(ee.Image): A mask band created by "Img_MaskBits" function;
+       Bits(int): One or more bits combined with "|" operator (e.g., BIT_CLOUD | BIT_SHADOW).'''
+  return ee.Image(MaskBits).bitwiseAnd(int(Bits)).neq(0)
+
+
+
+
 #############################################################################################################
 # Description: This function creates a mask that mask out the land outside Canada and optionally water based
 #              on a land cover map.
@@ -5,10 +5,21 @@ import ee
 
 import pandas as pd
 import calendar
-from datetime import datetime
+import math
+from datetime import datetime, timedelta
 
 import Image as Img
 import ImgMask as IM
+import eoCatalog as eoCat
+import eoDateWin as eoDW
+
+
+
+# The image collections built in current job (see "getCollection" function)
+_COLLECTIONS = {}
+
+# The client-side GeoJSON geometries of the regions queried in a local catalog (see "region_geojson" function)
+_REGION_GEOJSONS = {}
 
 
 
@@ -75,6 +86,7 @@ def summer_centre(Year):
 # Revision history:  2021-May-20  Lixin Sun  Initial creation
 #                    2021-Oct-15  Lixin Sun  Added a new case where if "Month" is out of the 1 to 12 range,
 #                                            the start and end dates of the peak season will be returned. 
+#                    2026-Oct-19             Computed the dates on client side with "eoDateWin" module.
 #############################################################################################################
 def month_range(Year, Month, ee_Date_format = True):
   '''Creates the start and end date strings of a specified year and month
@@ -82,31 +94,9 @@ def month_range(Year, Month, ee_Date_format = True):
        Year(int or ee.Number): A specified year;
        Month(int or ee.Number): A specified month. When the value of this argument is out of range
                                (1 to 12), a time range for a peak season is returned. '''
-  #==========================================================================================================
-  # Validate the given 'Year' integer
-  #==========================================================================================================
-  current_year = datetime.now().year
-  if Year < 1970:
-    Year = 1970
-  elif Year > current_year:
-    Year = current_year
-  
-  #==========================================================================================================
-  # Return proper start and end dates for a specified period
-  #==========================================================================================================
-  if Month < 1 or Month > 12:
-    start_date, end_date = summer_range(Year, ee_Date_format)
-    return start_date, end_date 
-  else:
-    if not ee_Date_format:
-      year_month_str = str(Year) + '-' + str(Month)
-      return year_month_str + '-1', year_month_str + '-' + str(month_end(Year, Month, False))
-
-    else:  
-      start_date = ee.Date.fromYMD(Year, Month, 1)
-      end_date   = ee.Date.fromYMD(Year, Month, month_end(Year, Month, True))
+  start_date, end_date = eoDW.month_range(Year, Month)
 
-      return start_date, end_date  
+  return (ee.Date(start_date), ee.Date(end_date)) if ee_Date_format else (start_date, end_date)
 
 
 
@@ -117,13 +107,16 @@ def month_range(Year, Month, ee_Date_format = True):
 # Description: This function returns the middle date of a given time period.
 # 
 # Revision history:  2021-May-20  Lixin Sun  Initial creation 
-#  
+#                    2026-Oct-19             Computed on client side when both dates are client-side dates.
 ######################################################################################################
 def period_centre(StartD, StopD):
   '''Returns the middle date of a given time period. 
   Arg: 
     StartD(string or ee.Date): Start date string;
     StopD(string or ee.Date): Stop date string.'''  
+  if eoDW.is_client_date(StartD) and eoDW.is_client_date(StopD):
+    return ee.Date(eoDW.period_centre(StartD, StopD))
+
   start = ee.Date(StartD)
   stop  = ee.Date(StopD)
 
@@ -137,13 +130,17 @@ def period_centre(StartD, StopD):
 # Description: This function returns a time range based on a given centre date and time window size.
 # 
 # Revision history:  2023-Nov-20  Lixin Sun  Initial creation 
-#  
+#                    2026-Oct-19             Computed on client side when "MidDate" is a client-side date.
 ######################################################################################################
 def time_range(MidDate, WinSize):
   '''Returns a time range based on a given centre date and time window size.
   Arg: 
     MidDate(string or ee.Date): A given centre date or string;
     WinSize(int): Stop date string.'''  
+  if eoDW.is_client_date(MidDate):
+    start, stop = eoDW.time_range(MidDate, WinSize)
+    return ee.Date(start), ee.Date(stop)
+
   millis_per_day = ee.Number(86400000)
   half_millis    = ee.Number(WinSize/2).multiply(millis_per_day)
   centre         = ee.Date(MidDate)
@@ -162,13 +159,16 @@ def time_range(MidDate, WinSize):
 # Description: This function returns the time window size based on given start and stop dates.
 # 
 # Revision history:  2023-Nov-20  Lixin Sun  Initial creation 
-#  
+#                    2026-Oct-19             Computed on client side when both dates are client-side dates.
 ######################################################################################################
 def time_window_size(StartD, StopD):
   '''Returns the middle date of a given time period. 
   Arg: 
     StartD(string or ee.Date): Start date string;
     StopD(string or ee.Date): Stop date string.'''  
+  if eoDW.is_client_date(StartD) and eoDW.is_client_date(StopD):
+    return ee.Number(eoDW.window_days(StartD, StopD))
+
   millis_per_day = ee.Number(86400000)
 
   return ee.Date(StopD).millis().subtract(ee.Date(StartD).millis()).abs().divide(millis_per_day)
@@ -177,6 +177,67 @@ def time_window_size(StartD, StopD):
 
 
 
+######################################################################################################
+# Description: These functions form the key of a collection built by "getCollection" function and clear
+#              the collections memoized in current job.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def collection_key(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate, AttachCS = False):
+  def date_key(Date):
+    return eoDW.date_str(Date) if eoDW.is_client_date(Date) else ee.Date(Date).serialize()
+
+  cloud_rate = -100 if CloudRate < 0 or CloudRate > 99.99 else float(CloudRate)
+
+  return (SsrData.get('NAME', ''), int(SsrData['SSR_CODE']), int(SsrData['DATA_UNIT']), SsrData['GEE_NAME'],
+          ee.Geometry(Region).serialize(), date_key(StartDate), date_key(EndDate), int(ExtraBandCode), cloud_rate,
+          bool(AttachCS))
+
+
+
+def clear_collection_cache():
+  _COLLECTIONS.clear()
+
+
+
+
+
+######################################################################################################
+# Description: This function attaches the given bands of the matching images in an auxiliary collection
+#              (e.g., CloudScore+ or Landsat TOA) to each image in a primary collection, with one join on
+#              'system:index' rather than one "linkCollection" lookup per image.
+#
+# Note:        As with "linkCollection", the images without a matching auxiliary image are kept, and the
+#              attached bands of such images are fully masked. The matched image saved by the join is
+#              dropped from the properties of each image once its bands are attached.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def join_aux_bands(PrimColl, AuxColl, BandNames):
+  '''Returns an image collection with the given auxiliary bands attached to each image.
+
+  Arg: 
+     PrimColl(ee.ImageCollection): A primary image collection;
+     AuxColl(ee.ImageCollection): An auxiliary image collection sharing 'system:index' with "PrimColl";
+     BandNames(list): The names of the auxiliary bands to be attached.'''
+  match_key = 'aux_match'
+  empty_img = ee.Image.constant([0]*len(BandNames)).rename(BandNames).updateMask(0)
+  key_match = ee.Filter.equals(leftField = 'system:index', rightField = 'system:index')
+  joined    = ee.Join.saveFirst(matchKey = match_key, outer = True).apply(PrimColl, AuxColl.select(BandNames), key_match)
+
+  def attach(image):
+    image   = ee.Image(image)
+    aux_img = ee.Image(ee.Algorithms.If(image.get(match_key), image.get(match_key), empty_img))
+    return image.addBands(aux_img, BandNames, True).set(match_key, None)
+
+  return ee.ImageCollection(joined).map(attach)
+
+
+
+
+
 ######################################################################################################
 # Description: This function creates a image collection acquired by a sensor over a geographical 
 #              region during a period of time.
@@ -192,8 +253,14 @@ def time_window_size(StartD, StopD):
 #                                            both of them will be put into the returned collection.
 #                    2023-Nov-09  Lixin Sun  Attach a "Cloud Score+" band to each image in a 
 #                                            Sentinel-2 image collection.
+#                    2026-Oct-19             Determined the target year on client side.
+#                    2026-Oct-19             Memoized the built collections, so that the same collection
+#                                            object is returned for the same sensor, region, time window,
+#                                            extra bands and cloud rate within a job.
+#                    2026-Oct-19             Attached CS+ and Landsat angle bands with joins, and attached
+#                                            CS+ band only when "AttachCS" is True.
 ######################################################################################################
-def getCollection(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate = -100):  
+def getCollection(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate = -100, AttachCS = False):  
   '''Returns a image collection acquired by a sensor over a spatial region during a period of time  
 
   Arg: 
@@ -202,14 +269,20 @@ def getCollection(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate
      StartDate(string or ee.Date): The start acquisition date (e.g., '2020-07-01');
      EndDate(string or ee.Date): The stop acquisition date (e.g., '2020-07-31');
      ExtraBandCode(int): An integr representing additional band type to be attached;
-     CloudRate(float): A given cloud coverage rate.'''
+     CloudRate(float): A given cloud coverage rate;
+     AttachCS(Boolean): A flag indicating if to attach CS+ band to Sentinel-2 images (required only when
+                        CloudScore+ mask will be applied).'''
   
   #print('<getCollection> SsrData info:', SsrData)
+  coll_key = collection_key(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate, AttachCS)
+  if coll_key in _COLLECTIONS:
+    return _COLLECTIONS[coll_key]
+
   # Cast the input parameters into proper formats  
   region = ee.Geometry(Region)
   start  = ee.Date(StartDate)
   end    = ee.Date(EndDate)
-  year   = int(start.get('year').getInfo())
+  year   = eoDW.year_of(StartDate)     # No "getInfo" call for a string or datetime start date
   #print('\n<getCollection> The year of time window = ', year) 
 
   #===================================================================================================
@@ -246,10 +319,11 @@ def getCollection(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate
     # Attach a "Cloud Score+" band to each image in Sentinel-2 image collection
     # Note: This function is unstable for now (Feb. 10, 2024)
     #-------------------------------------------------------------------------------------------
-    CS_plus = ee.ImageCollection('GOOGLE/CLOUD_SCORE_PLUS/V1/S2_HARMONIZED') \
-               .filterBounds(region).filterDate(start, end)
+    if AttachCS == True:
+      CS_plus = ee.ImageCollection('GOOGLE/CLOUD_SCORE_PLUS/V1/S2_HARMONIZED') \
+                 .filterBounds(region).filterDate(start, end)
     
-    coll   = coll.map(lambda img: img.linkCollection(CS_plus, ['cs']))
+      coll = join_aux_bands(coll, CS_plus, [Img.cloud_score])
 
   elif ssr_code < Img.MAX_LS_CODE: 
     # for Landsat data
@@ -261,7 +335,7 @@ def getCollection(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate
         toa_ssr_data = Img.SSR_META_DICT['L8_TOA']
         toa_coll     = ee.ImageCollection(toa_ssr_data['GEE_NAME']).filterBounds(region).filterDate(start, end).filterMetadata(toa_ssr_data['CLOUD'], 'less_than', cloud_rate) 
         
-        coll = coll.map(lambda img: img.linkCollection(toa_coll, ['SZA', 'SAA', 'VZA', 'VAA']))
+        coll = join_aux_bands(coll, toa_coll, ['SZA', 'SAA', 'VZA', 'VAA'])
 
     else:
       if data_unit == Img.sur_ref:
@@ -278,8 +352,8 @@ def getCollection(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate
           L8_toa_coll = ee.ImageCollection(L8_toa_ssr_data['GEE_NAME']).filterBounds(region).filterDate(start, end).filterMetadata(L8_toa_ssr_data['CLOUD'], 'less_than', cloud_rate) 
           L9_toa_coll = ee.ImageCollection(L9_toa_ssr_data['GEE_NAME']).filterBounds(region).filterDate(start, end).filterMetadata(L9_toa_ssr_data['CLOUD'], 'less_than', cloud_rate) 
 
-          L8_sr_coll = L8_sr_coll.map(lambda img: img.linkCollection(L8_toa_coll, ['SZA', 'SAA', 'VZA', 'VAA']))
-          L9_sr_coll = L9_sr_coll.map(lambda img: img.linkCollection(L9_toa_coll, ['SZA', 'SAA', 'VZA', 'VAA']))
+          L8_sr_coll = join_aux_bands(L8_sr_coll, L8_toa_coll, ['SZA', 'SAA', 'VZA', 'VAA'])
+          L9_sr_coll = join_aux_bands(L9_sr_coll, L9_toa_coll, ['SZA', 'SAA', 'VZA', 'VAA'])
 
         coll = L8_sr_coll.merge(L9_sr_coll)
       else:
@@ -300,6 +374,7 @@ def getCollection(SsrData, Region, StartDate, EndDate, ExtraBandCode, CloudRate
   #print('\n<getCollection> The name of data catalog = ', CollName)             
   #print('<getCollection> The number of images in selected image collection = ', coll.size().getInfo())
 
+  _COLLECTIONS[coll_key] = coll
   return coll 
   
   
@@ -391,6 +466,566 @@ def get_ImgColl_Angles(SsrData, Region, StartDate, EndDate, CloudRate = -100):
 
 
 
+######################################################################################################
+# Description: This function returns the GEE names of the image collections that "getCollection"
+#              function queries for a sensor and a year, so that the same scenes can be queried from a
+#              local catalog (see eoCatalog.py).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def catalog_coll_names(SsrData, Year):
+  ssr_code  = SsrData['SSR_CODE']
+  data_unit = SsrData['DATA_UNIT']
+
+  if ssr_code < Img.MAX_LS_CODE and int(Year) >= 2022 and ssr_code >= Img.LS_sensor:
+    unit = 'SR' if data_unit == Img.sur_ref else 'TOA'
+    return [Img.SSR_META_DICT['L8_' + unit]['GEE_NAME'], Img.SSR_META_DICT['L9_' + unit]['GEE_NAME']]
+  else:
+    return [SsrData['GEE_NAME']]
+
+
+
+
+
+######################################################################################################
+# Description: This function ingests the metadata of all the scenes returned by "getCollection" function
+#              into a local catalog (see eoCatalog.py). The scenes are fetched page by page, and each page
+#              is committed together with the progress of the job, so that an interrupted ingestion is
+#              resumed from the last committed page.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def ingest_catalog(Conn, SsrData, RegionName, Region, StartDate, EndDate, CloudRate = -100, PageSize = 500):
+  '''Ingests scene metadata into a local catalog and returns the number of ingested scenes.
+
+  Arg:
+     Conn(sqlite3.Connection): A catalog opened with "eoCatalog.open_catalog" function;
+     SsrData(Dictionary): A Dictionary containing metadata associated with a sensor;
+     RegionName(string): The name of ROI (used to identify the ingestion job);
+     Region(ee.Geometry): A geospatial polygon of ROI;
+     StartDate(string): The start acquisition date string (e.g., '2020-07-01');
+     EndDate(string): The stop acquisition date string (e.g., '2020-07-31');
+     CloudRate(float): A given cloud coverage rate;
+     PageSize(int): The number of scenes fetched with one "getInfo" call.'''
+  if SsrData['SSR_CODE'] == Img.MOD_sensor:
+    print('\n<ingest_catalog> MODIS images are not catalogued!')
+    return 0
+
+  job_key = '{}|{}|{}|{}|{}'.format(SsrData['NAME'], RegionName, str(StartDate)[:10], str(EndDate)[:10], CloudRate)
+  total, offset = eoCat.get_job(Conn, job_key)
+
+  coll = getCollection(SsrData, Region, StartDate, EndDate, Img.EXTRA_NONE, CloudRate).sort('system:time_start')
+  if total == None:
+    total = coll.size().getInfo()
+    eoCat.set_job(Conn, job_key, total, 0)
+    Conn.commit()
+
+  def to_feature(image):
+    img = ee.Image(image)
+    props = {'sys_id':     img.get('system:id'),
+             'millis':     img.get('system:time_start'),
+             'cloud':      img.get(SsrData['CLOUD']),
+             'sza':        img.get(SsrData['SZA']),
+             'saa':        img.get(SsrData['SAA']),
+             'vza':        img.get(SsrData['VZA']),
+             'vaa':        img.get(SsrData['VAA']),
+             'asset_size': img.get('system:asset_size'),
+             'grid_key':   scene_grid_key(img, SsrData)}
+    return ee.Feature(img.geometry().simplify(500), props)
+
+  #==================================================================================================
+  # Fetch and commit scene metadata page by page 
+  #==================================================================================================
+  nb_ingested = 0
+  while offset < total:
+    page = ee.FeatureCollection(coll.toList(PageSize, offset).map(to_feature)).getInfo()['features']
+    if len(page) < 1:
+      break
+
+    records = []
+    for feature in page:
+      props = feature['properties']
+      coll_name, scene_id = str(props['sys_id']).rsplit('/', 1)
+      records.append({'coll_name': coll_name, 'scene_id': scene_id, 'millis': props['millis'], 'cloud': props.get('cloud'),
+                      'sza': props.get('sza'), 'saa': props.get('saa'), 'vza': props.get('vza'), 'vaa': props.get('vaa'),
+                      'asset_size': props.get('asset_size'), 'grid_key': props.get('grid_key'), 'footprint': feature['geometry']})
+
+    eoCat.insert_scenes(Conn, records)
+    offset += len(page)
+    nb_ingested += len(page)
+    eoCat.set_job(Conn, job_key, total, offset)
+    Conn.commit()
+    print('<ingest_catalog> {} of {} scenes ingested for {}.'.format(offset, total, job_key))
+
+  return nb_ingested
+
+
+
+
+
+######################################################################################################
+# Description: This function returns the client-side GeoJSON geometry of a region, which is required for
+#              querying a local catalog. The tile regions are computed geometries, which cannot be
+#              converted with "toGeoJSON", so they are fetched with one "getInfo" call per region and
+#              cached for the session.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def region_geojson(Region):
+  if isinstance(Region, dict):
+    return Region
+
+  key = ee.Geometry(Region).serialize()
+  if key not in _REGION_GEOJSONS:
+    _REGION_GEOJSONS[key] = ee.Geometry(Region).getInfo()
+
+  return _REGION_GEOJSONS[key]
+
+
+
+
+######################################################################################################
+# Description: This function returns the availability (the number of scenes and the expected number of
+#              clear observations) of a list of sensors over a region during a period of time.
+#
+# Note:        When a local catalog (see eoCatalog.py) is given, the availability is derived from the
+#              catalog without any GEE request, so the catalog must have been filled with "ingest_catalog"
+#              for the candidate sensors. Otherwise, the availability of all the sensors is obtained with
+#              one "getInfo" call. The clear observations of Landsat 7 after SLC failure are penalized.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Penalized Landsat 7 SLC-off scenes
+#                    2026-Oct-19  Obtained the GeoJSON of a region with "region_geojson" function
+#
+######################################################################################################
+def sensor_availability(SsrDataList, Region, StartDate, EndDate, Conn = None):
+  '''Returns a dictionary of {sensor name: (number of scenes, expected number of clear observations)}.
+
+  Arg: 
+     SsrDataList(list): A list of sensor dictionaries;
+     Region(ee.Geometry or dictionary): A geospatial polygon of ROI (or its GeoJSON geometry);
+     StartDate(string): The start date string of a time window;
+     EndDate(string): The stop date string of a time window;
+     Conn(sqlite3.Connection): An optional local catalog.'''
+  year = eoDW.year_of(StartDate)
+
+  if Conn != None:
+    geojson = region_geojson(Region)
+    stats   = {}
+    for ssr_data in SsrDataList:
+      scenes = eoCat.query_scenes(Conn, catalog_coll_names(ssr_data, year), geojson, eoDW.date_str(StartDate), eoDW.date_str(EndDate), -100, ssr_data['SSR_CODE'])
+      stats[ssr_data['NAME']] = eoCat.coverage_stats(scenes, ssr_data['SSR_CODE'])
+
+    return stats
+
+  #==================================================================================================
+  # Count the scenes and sum up their cloud coverages on GEE, with one request for all the sensors.
+  # The Landsat 7 scenes after SLC failure are also counted separately to penalize their clear
+  # fractions in the same way as "eoCatalog.coverage_stats" function.
+  #==================================================================================================
+  ee_stats = {}
+  for ssr_data in SsrDataList:
+    coll  = getCollection(ssr_data, Region, StartDate, EndDate, Img.EXTRA_NONE)
+    cloud = coll.aggregate_sum(ssr_data['CLOUD']) if ssr_data['SSR_CODE'] != Img.MOD_sensor else ee.Number(0)
+    if ssr_data['SSR_CODE'] == Img.LS7_sensor:
+      off_coll = coll.filter(ee.Filter.gte('system:time_start', eoCat.date_millis(eoCat.SLC_OFF_DATE)))
+      ee_stats[ssr_data['NAME']] = ee.List([coll.size(), cloud, off_coll.size(), off_coll.aggregate_sum(ssr_data['CLOUD'])])
+    else:
+      ee_stats[ssr_data['NAME']] = ee.List([coll.size(), cloud, 0, 0])
+
+  stats = {}
+  for name, (count, cloud_sum, off_count, off_cloud) in ee.Dictionary(ee_stats).getInfo().items():
+    clear_obs = float(count) - float(cloud_sum or 0)/100.0
+    off_clear = float(off_count) - float(off_cloud or 0)/100.0
+    stats[name] = (int(count), clear_obs - (1.0 - eoCat.SLC_OFF_VALID)*off_clear)
+
+  return stats
+
+
+
+
+######################################################################################################
+# Description: This function selects the sensors that can contribute to a composite, based on their
+#              actual availability over a region during a period of time, rather than on year rules.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def select_sensors(SsrDataList, Region, StartDate, EndDate, MinScenes = 1, MinClearObs = 0.5, Conn = None):
+  '''Returns a list of the sensor dictionaries that can contribute, sorted by the expected number of clear
+     observations (descending).
+
+  Arg: 
+     SsrDataList(list): A list of candidate sensor dictionaries;
+     Region(ee.Geometry): A geospatial polygon of ROI;
+     StartDate(string): The start date string of a time window;
+     EndDate(string): The stop date string of a time window;
+     MinScenes(int): The minimum number of scenes of a contributing sensor;
+     MinClearObs(float): The minimum expected number of clear observations of a contributing sensor;
+     Conn(sqlite3.Connection): An optional local catalog (see "sensor_availability" function).'''
+  stats    = sensor_availability(SsrDataList, Region, StartDate, EndDate, Conn)
+  selected = []
+  for ssr_data in SsrDataList:
+    count, clear_obs = stats.get(ssr_data['NAME'], (0, 0.0))
+    if count >= MinScenes and clear_obs >= MinClearObs:
+      selected.append(ssr_data)
+    else:
+      print('<select_sensors> Skip {} ({} scenes, {:.1f} expected clear observations).'.format(ssr_data['NAME'], count, clear_obs))
+
+  return sorted(selected, key = lambda ssr_data: stats[ssr_data['NAME']][1], reverse = True)
+
+
+
+
+
+######################################################################################################
+# Description: This function returns a string key identifying the path/row (Landsat) or granule
+#              (Sentinel-2 and HLS) of a given image. The images sharing a key image the same ground
+#              footprint and thus compete with each other during compositing.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def scene_grid_key(Image, SsrData):
+  '''Returns a string key identifying the path/row or the granule of a given image.
+
+  Arg:
+     Image(ee.Image): A given image from a sensor's image collection;
+     SsrData(Dictionary): A Dictionary containing metadata associated with a sensor.'''
+  ssr_code = SsrData['SSR_CODE']
+
+  if ssr_code < Img.MAX_LS_CODE:    # for Landsat data (WRS-2 path/row)
+    path = ee.Number(Image.get('WRS_PATH')).format('%03d')
+    row  = ee.Number(Image.get('WRS_ROW')).format('%03d')
+    return ee.String(path).cat('_').cat(row)
+
+  elif ssr_code == Img.HLS_sensor:  # for harmonized Landsat and Sentinel-2 (MGRS tile)
+    return ee.String(Image.get('MGRS_TILE_ID'))
+
+  else:                             # for Sentinel-2 data (MGRS tile)
+    return ee.String(Image.get('MGRS_TILE'))
+
+
+
+
+
+######################################################################################################
+# Description: This function limits the number of scenes entering compositing. All the scenes in a
+#              given collection are pre-ranked using three cheap metadata-based criteria (cloud cover,
+#              date distance to the middle of compositing window and the fraction of ROI covered by
+#              scene footprint), and then only the best N scenes per path/row or granule are kept.
+#
+# Note:        (1) A smaller rank value represents a better scene;
+#              (2) The returned ranked collection contains all the given scenes with 'budget_rank',
+#                  'budget_group' and 'budget_foot' properties attached, and can be passed to
+#                  "budget_report" function to find out which scenes were dropped.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def budget_collection(ImgColl, SsrData, Region, StartDate, EndDate, SceneBudget):
+  '''Returns a kept image collection with only the best N scenes per path/row or granule, and a ranked
+     image collection containing all the given scenes.
+
+  Arg:
+     ImgColl(ee.ImageCollection): A given image collection (before masking and scoring);
+     SsrData(Dictionary): A Dictionary containing metadata associated with a sensor;
+     Region(ee.Geometry): A geospatial polygon of ROI;
+     StartDate(string or ee.Date): The start date of a compositing window;
+     EndDate(string or ee.Date): The stop date of a compositing window;
+     SceneBudget(Dictionary): A dictionary containing the maximum number of scenes per path/row or
+                              granule ('max_scenes') and the weighting factors for cloud cover ('cloud'),
+                              date distance ('temporal') and footprint ('footprint') criteria.'''
+
+  #==================================================================================================
+  # Obtain budget settings. No scene will be dropped if 'max_scenes' is not a positive integer
+  #==================================================================================================
+  max_scenes = int(SceneBudget['max_scenes']) if 'max_scenes' in SceneBudget else 0
+  cloud_w    = float(SceneBudget['cloud'])     if 'cloud'     in SceneBudget else 1.0
+  time_w     = float(SceneBudget['temporal'])  if 'temporal'  in SceneBudget else 0.5
+  foot_w     = float(SceneBudget['footprint']) if 'footprint' in SceneBudget else 0.5
+
+  ssr_code = SsrData['SSR_CODE']
+  if max_scenes <= 0 or ssr_code == Img.MOD_sensor:  # MODIS images have no cloud coverage property
+    return ImgColl, ImgColl
+
+  #==================================================================================================
+  # Attach a rank, a path/row or granule key and a footprint fraction to each image
+  #==================================================================================================
+  region      = ee.Geometry(Region)
+  region_area = region.area(1000)
+  start       = ee.Date(StartDate)
+  end         = ee.Date(EndDate)
+  mid_millis  = period_centre(start, end).millis()
+  half_millis = end.millis().subtract(start.millis()).divide(2).max(1)
+
+  def attach_rank(image):
+    cloud = ee.Number(image.get(SsrData['CLOUD'])).divide(100)
+    gap   = image.date().millis().subtract(mid_millis).abs().divide(half_millis).min(1)
+    foot  = image.geometry().intersection(region, 1000).area(1000).divide(region_area).min(1)
+    rank  = cloud.multiply(cloud_w).add(gap.multiply(time_w)).add(ee.Number(1).subtract(foot).multiply(foot_w))
+
+    return image.set({'budget_rank': rank, 'budget_group': scene_grid_key(image, SsrData), 'budget_foot': foot})
+
+  ranked_coll = ImgColl.map(attach_rank)
+
+  #==================================================================================================
+  # Keep only the best N scenes for each path/row or granule
+  #==================================================================================================
+  groups = ee.List(ranked_coll.aggregate_array('budget_group')).distinct()
+
+  def best_of_group(key):
+    return ranked_coll.filter(ee.Filter.eq('budget_group', key)).sort('budget_rank').limit(max_scenes)
+
+  kept_coll = ee.ImageCollection(ee.FeatureCollection(groups.map(best_of_group)).flatten())
+
+  return kept_coll, ranked_coll
+
+
+
+
+
+######################################################################################################
+# Description: This function reports the scenes dropped by "budget_collection" function and how much
+#              compute was avoided.
+#
+# Note:        The avoided compute is given in two ways: the fraction of dropped scenes and the fraction
+#              of ROI-clipped footprint area that will not be masked and scored.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def budget_report(RankedColl, KeptColl):
+  '''Returns a dictionary describing the scenes dropped by "budget_collection" function.
+
+  Arg:
+     RankedColl(ee.ImageCollection): The ranked collection returned by "budget_collection";
+     KeptColl(ee.ImageCollection): The kept collection returned by "budget_collection".'''
+
+  kept_IDs = KeptColl.aggregate_array('system:index')
+  dropped  = RankedColl.filter(ee.Filter.inList('system:index', kept_IDs).Not())
+
+  info = ee.Dictionary({'total':      RankedColl.size(),
+                        'kept':       KeptColl.size(),
+                        'dropped_IDs':dropped.aggregate_array('system:index'),
+                        'total_foot': RankedColl.aggregate_sum('budget_foot'),
+                        'drop_foot':  dropped.aggregate_sum('budget_foot')}).getInfo()
+
+  total      = int(info['total'])
+  total_foot = float(info['total_foot'])
+
+  report = {'total':        total,
+            'kept':         int(info['kept']),
+            'dropped':      info['dropped_IDs'],
+            'avoided_scene_fraction': len(info['dropped_IDs'])/total if total > 0 else 0.0,
+            'avoided_area_fraction':  float(info['drop_foot'])/total_foot if total_foot > 0 else 0.0}
+
+  print('\n<budget_report> {} of {} scenes kept, {:.1%} of scenes ({:.1%} of ROI footprint area) avoided.'.format(
+        report['kept'], total, report['avoided_scene_fraction'], report['avoided_area_fraction']))
+  print('<budget_report> dropped scenes:', report['dropped'])
+
+  return report
+
+
+
+
+
+######################################################################################################
+# Description: This function determines the half size (in days) of an adaptive compositing window
+#              centred on a middle date, which is the smallest one that is expected to provide a target
+#              number of clear observations for each location.
+#
+# Note:        The expected number of clear observations is estimated as the sum of the clear fractions
+#              (1 - cloud cover) of the scenes in a window divided by the number of the path/rows or
+#              granules covering the ROI. This is pure Python and no GEE call is involved.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def adaptive_half_days(DayOffsets, ClearFracs, NbGroups, TargetClear, MinHalf, MaxHalf):
+  '''Returns the half size (in days) of an adaptive compositing window and the expected number of clear
+     observations within it.
+
+  Arg:
+     DayOffsets(list): The absolute day distances of the scenes to the middle date;
+     ClearFracs(list): The clear fractions (0 to 1) of the scenes;
+     NbGroups(int): The number of path/rows or granules covering the ROI;
+     TargetClear(float): The target number of clear observations for each location;
+     MinHalf(int): The minimum half size (in days) of the window;
+     MaxHalf(int): The maximum half size (in days) of the window.'''
+  nb_groups = max(1, int(NbGroups))
+  scenes    = sorted(zip(DayOffsets, ClearFracs))
+
+  half_days = int(MinHalf)
+  expected  = sum(frac for offset, frac in scenes if offset <= half_days)/nb_groups
+
+  for offset, frac in scenes:
+    if expected >= TargetClear or offset > MaxHalf:
+      break
+
+    if offset > half_days:
+      half_days = int(math.ceil(offset))
+      expected  = sum(f for o, f in scenes if o <= half_days)/nb_groups
+
+  # Use the largest window if the target cannot be reached
+  if expected < TargetClear:
+    half_days = int(MaxHalf)
+    expected  = sum(frac for offset, frac in scenes if offset <= half_days)/nb_groups
+
+  return min(half_days, int(MaxHalf)), expected
+
+
+
+
+
+######################################################################################################
+# Description: This function shrinks or grows a compositing window around its middle date so that the
+#              window is expected to contain a target number of clear observations. The cheap scene
+#              statistics (acquisition dates, cloud covers and path/row or granule keys) over the
+#              largest allowed window are obtained with only one "getInfo" call.
+#
+# Note:        This balances the sizes of the collections entering scoring, and thus the runtimes of
+#              the exporting tasks, across the tiles with very different cloud conditions. 
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def adaptive_time_window(SsrData, Region, StartDate, EndDate, AdaptWin):
+  '''Returns the start and stop date strings of an adaptive compositing window and the expected number
+     of clear observations within it.
+
+  Arg:
+     SsrData(Dictionary): A Dictionary containing metadata associated with a sensor;
+     Region(ee.Geometry): A geospatial polygon of ROI;
+     StartDate(string): The start date string ('YYYY-MM-DD') of a nominal compositing window;
+     EndDate(string): The stop date string ('YYYY-MM-DD') of a nominal compositing window;
+     AdaptWin(Dictionary): A dictionary containing the target number of clear observations
+                           ('target_clear') and the minimum and maximum window sizes relative to the
+                           nominal one ('min_ratio' and 'max_ratio').'''
+  start = datetime.strptime(str(StartDate)[:10], '%Y-%m-%d')
+  end   = datetime.strptime(str(EndDate)[:10], '%Y-%m-%d')
+
+  target    = float(AdaptWin['target_clear']) if 'target_clear' in AdaptWin else 0.0
+  min_ratio = float(AdaptWin['min_ratio'])    if 'min_ratio'    in AdaptWin else 0.5
+  max_ratio = float(AdaptWin['max_ratio'])    if 'max_ratio'    in AdaptWin else 2.0
+
+  if target <= 0 or SsrData['SSR_CODE'] == Img.MOD_sensor:  # MODIS images have no cloud coverage property
+    return str(StartDate), str(EndDate), None
+
+  #==================================================================================================
+  # Obtain the statistics of all the scenes within the largest allowed window
+  #==================================================================================================
+  mid_date  = start + (end - start)/2
+  nom_half  = max(1.0, (end - start).days/2.0)
+  min_half  = max(1, int(round(nom_half*min_ratio)))
+  max_half  = max(min_half, int(round(nom_half*max_ratio)))
+  mid_str   = mid_date.strftime('%Y-%m-%d')
+
+  wide_coll = getCollection(SsrData, Region, eoDW.shift_days(mid_str, -max_half), eoDW.shift_days(mid_str, max_half + 1), 0)
+  wide_coll = wide_coll.map(lambda img: img.set('adapt_group', scene_grid_key(img, SsrData)))
+
+  stats = ee.Dictionary({'millis': wide_coll.aggregate_array('system:time_start'),
+                         'cloud':  wide_coll.aggregate_array(SsrData['CLOUD']),
+                         'groups': wide_coll.aggregate_array('adapt_group').distinct().size()}).getInfo()
+
+  mid_millis  = (mid_date - datetime(1970, 1, 1)).total_seconds()*1000.0
+  day_offsets = [abs(float(millis) - mid_millis)/86400000.0 for millis in stats['millis']]
+  clear_fracs = [min(1.0, max(0.0, 1.0 - float(cloud)/100.0)) for cloud in stats['cloud']]
+
+  #==================================================================================================
+  # Determine the smallest window reaching the target number of clear observations
+  #==================================================================================================
+  half_days, expected = adaptive_half_days(day_offsets, clear_fracs, stats['groups'], target, min_half, max_half)
+
+  adapt_start = (mid_date - timedelta(days = half_days)).strftime('%Y-%m-%d')
+  adapt_stop  = (mid_date + timedelta(days = half_days)).strftime('%Y-%m-%d')
+  print('\n<adaptive_time_window> Window {} to {} ({} scenes, {:.1f} expected clear observations).'.format(
+        adapt_start, adapt_stop, sum(1 for offset in day_offsets if offset <= half_days), expected))
+
+  return adapt_start, adapt_stop, expected
+
+
+
+
+
+######################################################################################################
+# Description: This function drops the masked scenes whose clear fractions within a ROI are lower than a
+#              given threshold. The clear fraction of each scene is computed over the intersection of its
+#              footprint and the ROI at a coarse scale, and all the scenes are reduced in one batched map.
+#
+# Note:        The returned annotated collection contains all the given scenes with 'clear_frac' property
+#              attached, and can be passed to "prefilter_report" function to find out which scenes were
+#              dropped.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def clear_prefilter(MaskedColl, Region, MinClear, Scale = 300):
+  '''Returns a kept image collection with only the scenes whose clear fractions are not lower than a
+     threshold, and an annotated image collection containing all the given scenes.
+
+  Arg:
+     MaskedColl(ee.ImageCollection): A given image collection with cloud/shadow masks applied;
+     Region(ee.Geometry): A geospatial polygon of ROI;
+     MinClear(float): The minimum clear fraction (0 to 1) of a kept scene;
+     Scale(float): The spatial resolution (in metre) used to compute clear fractions.'''
+  region = ee.Geometry(Region)
+
+  def attach_clear_frac(image):
+    foot  = image.geometry().intersection(region, Scale)
+    clear = image.select([0]).mask().gt(0).rename(['clear'])
+    frac  = clear.reduceRegion(reducer = ee.Reducer.mean(), geometry = foot, scale = Scale, maxPixels = 1e9, bestEffort = True).get('clear')
+
+    return image.set('clear_frac', ee.Algorithms.If(frac, frac, 0))
+
+  annotated_coll = MaskedColl.map(attach_clear_frac)
+  kept_coll      = annotated_coll.filter(ee.Filter.gte('clear_frac', float(MinClear)))
+
+  return kept_coll, annotated_coll
+
+
+
+
+
+######################################################################################################
+# Description: This function reports the scenes dropped by "clear_prefilter" function.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+######################################################################################################
+def prefilter_report(AnnotatedColl, KeptColl):
+  '''Returns a dictionary describing the scenes dropped by "clear_prefilter" function.
+
+  Arg:
+     AnnotatedColl(ee.ImageCollection): The annotated collection returned by "clear_prefilter";
+     KeptColl(ee.ImageCollection): The kept collection returned by "clear_prefilter".'''
+  kept_IDs = KeptColl.aggregate_array('system:index')
+  dropped  = AnnotatedColl.filter(ee.Filter.inList('system:index', kept_IDs).Not())
+
+  info = ee.Dictionary({'total':       AnnotatedColl.size(),
+                        'kept':        KeptColl.size(),
+                        'dropped_IDs': dropped.aggregate_array('system:index'),
+                        'dropped_frac':dropped.aggregate_array('clear_frac')}).getInfo()
+
+  total  = int(info['total'])
+  report = {'total':   total,
+            'kept':    int(info['kept']),
+            'dropped': dict(zip(info['dropped_IDs'], info['dropped_frac'])),
+            'avoided_scene_fraction': len(info['dropped_IDs'])/total if total > 0 else 0.0}
+
+  print('\n<prefilter_report> {} of {} scenes kept, {:.1%} of scenes avoided scoring.'.format(
+        report['kept'], total, report['avoided_scene_fraction']))
+  print('<prefilter_report> dropped scenes (clear fractions):', report['dropped'])
+
+  return report
+
+
+
+
+
 ######################################################################################################
 # Description: This function Applies mask to each image in a given image collection 
 #
@@ -399,8 +1034,9 @@ def get_ImgColl_Angles(SsrData, Region, StartDate, EndDate, CloudRate = -100):
 #
 # Revision history:  2023-Nov-09  Lixin Sun  Initial creation 
 #                    2023-Nov-20  Lixin Sun  Added CloudScore input parameter.
+#                    2026-Oct-19             Added optional ModisRefer input parameter.
 ######################################################################################################
-def mask_collection(ImgColl, Year, SsrData, CloudScore, CS_thresh):  
+def mask_collection(ImgColl, Year, SsrData, CloudScore, CS_thresh, ModisRefer = None):  
   '''Returns a image collection with cloud/shadow masks applied to each image in the collection.  
 
   Arg: 
@@ -408,12 +1044,13 @@ def mask_collection(ImgColl, Year, SsrData, CloudScore, CS_thresh):
      Year(int): An integer representing a targeted year;
      SsrData(Dictionary): a Dictionary containing metadata associated with a sensor and data unit;     
      CloudScore(Boolean): a boolean variable indicating if to apply CloudScore+ mask to S2 image;
-     CS_thresh(float): a given threshold for CS+, will be applied when CloudScore == True.'''
+     CS_thresh(float): a given threshold for CS+, will be applied when CloudScore == True;
+     ModisRefer(ee.Image): an optional MODIS reference mosaic for detecting extra cloudy pixels.'''
   
   ssr_code = dict(SsrData)['SSR_CODE']
 
   def apply_mask(image, Year):
-      mask = IM.Img_VenderMask(image, Year, SsrData, IM.CLEAR_MASK)
+      mask = IM.Img_VenderMask(image, Year, SsrData, IM.CLEAR_MASK, ModisRefer)
       return image.updateMask(mask.Not()) 
   
   if ssr_code == Img.MOD_sensor: # for MODIS data
@@ -450,7 +1087,7 @@ def peak_collection(SsrData, Year, Region, CloudRate):
      Region(ee.Geometry): The geospatial polygon of ROI;
      CloudRate(float): A specified cloud coverage rate.'''  
   region      = ee.Geometry(Region)
-  start, stop = summer_range(Year)
+  start, stop = eoDW.summer_range(Year)
 
   return ee.ImageCollection(getCollection(SsrData, region, start, stop, Img.EXTRA_NONE, CloudRate))
 
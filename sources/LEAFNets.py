@@ -7,7 +7,8 @@ import ImgSet as IS
 import eoTileGrids as eoTG
 import eoParams as eoPM
 import Mosaic
-import eoAuxData as eoAD
+import eoFingerprint as eoFP
+import eoStaticMask as eoSM
 import LEAF_LSv1 as LFLS
 
 
@@ -841,9 +842,12 @@ def wrapperNNets(networks, partition, prod_options, coll_options, suffix_name, i
 #
 # Revision history:  2022-Jun-22  Lixin Sun  Initial creation 
 #                    2022-Nov-16  Lixin Sun  Added water mask from a given classification map.
+#                    2026-Oct-19             Used the bit-packed mask band created by "Img_MaskBits" function,
+#                                            so that shared bands and indices are computed only once.
+#                    2026-Oct-19             Read the class-based water test from a cached static layer.
 #
 #############################################################################################################
-def LEAF_valid_mask(Image, Year, SsrData, MaxRef, ClassMap):
+def LEAF_valid_mask(Image, Year, SsrData, MaxRef, ClassMap, StaticLayer = None):
   '''Exports three ancillary maps associated with one set of LEAF products
 
   Args:
@@ -851,18 +855,21 @@ def LEAF_valid_mask(Image, Year, SsrData, MaxRef, ClassMap):
     Year(int): A integer representing target year;
     SsrData(Dictionary): a Dictionary containing metadata associated with a sensor and data unit;
     MaxRef(int): the maximum reflectance value in the given Image;
-    ClassMap(ee.Image): a given classification map.'''
+    ClassMap(ee.Image): a given classification map;
+    StaticLayer(ee.Image): an optional static layer (see eoStaticMask.py) providing the class-based water test.'''
 
   #==========================================================================================================
   # Invoke the functions to generate various masks. 
   # Note the value range in "Image" is [0, 1] since it is used for LEAF calculation 
   #==========================================================================================================
-  snow_mask   = IM.Img_SnowMask (Image, Year, SsrData, MaxRef)
-  #water_mask  = IM.Img_WaterMask(Image, SsrData, MaxRef)
-  valid_mask  = IM.Img_ValidMask(Image, Year, SsrData, MaxRef)  
-  class_water = ClassMap.eq(0).Or(ClassMap.eq(18))  
-  #return snow_mask.Or(water_mask).Or(valid_mask).Or(class_water)
-  return snow_mask.Or(valid_mask).Or(class_water)
+  mask_bits   = IM.Img_MaskBits(Image, Year, SsrData, MaxRef)
+  invalid     = IM.BIT_CLOUD | IM.BIT_SHADOW | IM.BIT_SNOW | IM.BIT_SATU | IM.BIT_RANGE   #| IM.BIT_WATER
+  if StaticLayer != None:
+    class_water = eoSM.test_static_bits(StaticLayer, eoSM.BIT_CLASS_WATER)
+  else:
+    class_water = ClassMap.eq(0).Or(ClassMap.eq(18))  
+
+  return IM.test_MaskBits(mask_bits, invalid).Or(class_water)
 
 
 
@@ -881,7 +888,7 @@ def LEAF_valid_mask(Image, Year, SsrData, MaxRef, ClassMap):
 #                    2021-Oct-15  Lixin Sun  Modified so that peak season ("month" argument is outside of 
 #                                            1 and 12) product can also be generated. 
 #############################################################################################################
-def SL2P_separate_params(inParams, inMosaic, Region, SsrData, ClassImg, task_list = None):
+def SL2P_separate_params(inParams, inMosaic, Region, SsrData, ClassImg, task_list = None, StaticLayer = None):
   '''Produces a full set of LEAF products for a specific region and time period and export them in separate files.
 
     Args:
@@ -890,7 +897,8 @@ def SL2P_separate_params(inParams, inMosaic, Region, SsrData, ClassImg, task_lis
        Region(ee.Geometry): A ROI;     
        SsrData(Dictionary): A Dictionary containing metadata associated with a sensor and data unit;
        ClassImg(ee.Image): A given classification image;
-       task_list([]): a list for storing the links to exporting tasks.'''
+       task_list([]): a list for storing the links to exporting tasks;
+       StaticLayer(ee.Image): an optional static layer used by "LEAF_valid_mask" function.'''
   
   mosaic = ee.Image(inMosaic)
   #==========================================================================================================
@@ -971,7 +979,7 @@ def SL2P_separate_params(inParams, inMosaic, Region, SsrData, ClassImg, task_lis
     # water, saturated or out of range) 
     #==========================================================================================================  
     Year = inParams['year']
-    invalid_mask = LEAF_valid_mask(inMosaic, Year, SsrData, 1, ClassImg).multiply(ee.Image(4)).uint8()
+    invalid_mask = LEAF_valid_mask(inMosaic, Year, SsrData, 1, ClassImg, StaticLayer).multiply(ee.Image(4)).uint8()
     QC_map       = QC_img.unmask().bitwiseOr(invalid_mask)
 
     Img.export_one_map(inParams, Region, QC_map, 'QC', task_list)
@@ -1111,7 +1119,7 @@ def Is_export_required(InquireStr, ProductList):
 #       (3) A time window is provided as the values corresponding to "start_date" and "end_date" keys
 #
 # Revision history:  2023-Nov-26  Lixin Sun  Initial creation 
-#
+#                    2026-Oct-19             Looked up the land cover map from cached static layers.
 #############################################################################################################
 def apply_SL2P(inParams, task_list, ExportMosaic=False):
   '''Produces LEAF products for one or multiple tiles in CANADA
@@ -1141,7 +1149,10 @@ def apply_SL2P(inParams, task_list, ExportMosaic=False):
   #==========================================================================================================
   # Obtain a global Land cover classification map and export it as needed 
   #==========================================================================================================
-  ClassImg = eoAD.get_GlobLC(year, False).uint8().clip(region)
+  # The land cover map is looked up from the cached static layer of the tile, when it is available 
+  asset_root = inParams['static_asset_root'] if 'static_asset_root' in inParams else ''
+  static_img = eoSM.get_static_layer(asset_root, region_name, year, inParams['resolution']).clip(region)
+  ClassImg   = static_img.select([eoSM.PARTITION]).uint8()
   if Is_export_required('parti', ProductList):
     Img.export_one_map(inParams, region, ClassImg, 'Partition', task_list)
 
@@ -1158,14 +1169,15 @@ def apply_SL2P(inParams, task_list, ExportMosaic=False):
       image  = Img.attach_AngleBands(image, SsrData)         # attach three imaging angle bands
       region = ee.Image(image).geometry()
       
-      SL2P_separate_params(inParams, image, region, SsrData, ClassImg, task_list)
+      SL2P_separate_params(inParams, image, region, SsrData, ClassImg, task_list, static_img)
 
   else: 
     ScoreWs = inParams['score_weights'] if 'score_weights' in inParams else None
-    mosaic = Mosaic.LEAF_Mosaic(SsrData, region, start, stop, True, ScoreWs)   
+    budget  = inParams['scene_budget']  if 'scene_budget'  in inParams else None
+    mosaic = Mosaic.LEAF_Mosaic(SsrData, region, start, stop, True, ScoreWs, budget)   
     print("\n<apply_SL2P> The band names in mosiac image = ", mosaic.bandNames().getInfo())
 
-    SL2P_separate_params(inParams, mosaic, region, SsrData, ClassImg, task_list)
+    SL2P_separate_params(inParams, mosaic, region, SsrData, ClassImg, task_list, static_img)
      
     if ExportMosaic:      
       Mosaic.export_mosaic(inParams, mosaic, SsrData, region, True, task_list)
@@ -1224,6 +1236,7 @@ def LEAF_production(inParams, ExportMosaic=False):
   # Standardize the given execution parameters
   #==========================================================================================================
   params = eoPM.get_LEAF_params(inParams)
+  IS.clear_collection_cache()   # The collections are shared within one job only
   
   #==========================================================================================================
   # Produce vegetation parameter porducts for eath region and each time window
@@ -1232,6 +1245,11 @@ def LEAF_production(inParams, ExportMosaic=False):
   region_names = params['regions'].keys()
   nTimes = len(params['start_dates'])
 
+  # Load the registry of the fingerprints of previously produced units, as required
+  skip_same = params['skip_unchanged'] if 'skip_unchanged' in params else False
+  registry  = eoFP.refresh_registry(eoFP.load_registry(params)) if skip_same else {}
+  SsrData   = Img.SSR_META_DICT[params['sensor']]
+
   # Produce vegetation parameter products for each spatial region
   for reg_name in region_names:
     eoPM.set_spatial_region(params, reg_name)
@@ -1240,10 +1258,33 @@ def LEAF_production(inParams, ExportMosaic=False):
     for TIndex in range(nTimes):
       eoPM.set_current_time(params, TIndex)
 
+      # Skip the unit if none of its inputs has changed since a previous successful run
+      if skip_same:
+        unit_key = eoFP.unit_key(params, 'LEAF')
+        if len(params['scene_ID']) > 5:
+          scene_IDs = [params['scene_ID']]
+        else:
+          start, stop = eoPM.get_time_window(params, False)
+          region      = eoPM.get_spatial_region(params)
+          region      = eoTG.expandSquare(region, 0.02) if 'tile' in reg_name else region
+          scene_IDs   = eoFP.unit_scene_IDs(SsrData, region, [int(params['year'])], start, stop)
+
+        unit_fp = eoFP.unit_fingerprint(params, scene_IDs, 'LEAF')
+        if eoFP.is_unchanged(registry, unit_key, unit_fp):
+          print('\n<LEAF_production> Skip {} since its inputs have not changed.'.format(unit_key))
+          continue
+
+        submit_time = eoFP.utc_now()
+        nb_tasks    = len(task_list)
+
       # Produce and export products in a specified way (a compact image or separate images)      
       print('\n<LEAF_production> Generate and export separate biophysical maps for {}th time period and {} region......'.format(TIndex, reg_name))        
       apply_SL2P(params, task_list, ExportMosaic)
 
+      if skip_same:
+        eoFP.record_unit(registry, unit_key, unit_fp, params, submit_time, 'LEAF', task_list[nb_tasks:])
+        eoFP.save_registry(params, registry)
+
       # out_style = str(params['export_style']).lower()
       # if out_style.find('comp') > -1:
       #   print('\n<LEAF_production> Generate and export biophysical maps in one file .......')
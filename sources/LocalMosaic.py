@@ -0,0 +1,814 @@
+#############################################################################################################
+# Description: This module contains the local (NumPy based) counterparts of the hybrid compositing functions
+#              in "Mosaic.py", so that compositing experiments can be conducted on downloaded image stacks.
+#
+# Note:        (1) This module does not depend on GEE;
+#              (2) The spectral bands of a scene are always stored in the order of 'SIX_BANDS' (blue, green,
+#                  red, NIR, SWIR1 and SWIR2) with values rescaled to the range between 0 and 100, as the
+#                  images used in "attach_Hybrid_score" function.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Added haze detection for exported mosaics.
+#                    2026-Oct-19  Added a fused score-and-select compositing kernel (compiled with Numba
+#                                 when it is available).
+#                    2026-Oct-19  Added parallel multi-sensor compositing and blockwise mosaic merging.
+#                    2026-Oct-19  Added the MODIS-based cloud test for local scenes.
+#                    2026-Oct-19  Added blockwise CVA_SAM change detection between exported mosaics.
+#
+#############################################################################################################
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import eoLocalIO as eoIO
+
+try:
+  import numba
+except ImportError:
+  numba = None
+
+
+
+MAX_LS_CODE = 20   # The same as 'MAX_LS_CODE' in Image.py
+
+BLU, GRN, RED, NIR, SW1, SW2 = 0, 1, 2, 3, 4, 5   # The band indices in a SIX_BANDS array
+
+
+
+
+#############################################################################################################
+# Description: This function calculates spectral scores with the same algorithm as "get_spec_score" function
+#              in Mosaic.py.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def spec_score(Scene, Refer, Class3):
+  '''Returns a spectral score array for a given scene.
+
+     Args:
+       Scene(ndarray): A (6, ...) array of SIX_BANDS values ranging from 0 to 100;
+       Refer(ndarray): A (6, ...) array of the reference mosaic (SIX_BANDS values ranging from 0 to 100);
+       Class3(ndarray): A 3-class map (0, 1 and 2 for water, non-vegetated and vegetated, respectively).'''
+  blu, nir = Scene[BLU].astype(np.float32), Scene[NIR].astype(np.float32)
+  blu_med, nir_med, sw2_med = Refer[BLU], Refer[NIR], Refer[SW2]
+
+  #==================================================================================================
+  # Prepare arrays for calculating spectral score
+  # Note: the maximum spectral value in "get_spec_score" is never below 0.01, so its penalty (-10) is
+  #       never applied and is omitted here.
+  #==================================================================================================
+  used_blu = np.maximum(blu, 0.01)
+
+  blu_refer = np.where(Class3 == 2, sw2_med*0.25, blu_med)
+  blu_pen   = np.exp(np.abs(blu_refer - blu))
+  nir_pen   = np.abs(nir_med - nir)
+
+  #==================================================================================================
+  # Calculate water and land scores, and then combine them according to 3-class map
+  #==================================================================================================
+  water_score = (blu_med + nir_med)/(blu_pen + nir_pen)
+  land_score  = nir/(used_blu + nir_pen + blu_pen)
+
+  return np.where(Class3 == 0, water_score, land_score).astype(np.float32)
+
+
+
+
+#############################################################################################################
+# Description: This function calculates time scores with the same Gaussian function as "get_time_score"
+#              function in Mosaic.py.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def time_score(DOY_diff, SsrCode, WinSize):
+  '''Returns time score(s) for given date difference(s).
+
+     Args:
+       DOY_diff(float or ndarray): The difference(s) in days between acquisition date(s) and window centre;
+       SsrCode(int): The sensor type code;
+       WinSize(int): The size (in days) of a compositing time window, given in the same way as the
+                     'WinSize' used in "coll_Hybrid_mosaic" function.'''
+  ssr_code = int(SsrCode)
+  STD = 6 if ssr_code > MAX_LS_CODE else 8
+  if WinSize > 31:
+    STD = 12 if ssr_code > MAX_LS_CODE else 16
+
+  factor = np.asarray(DOY_diff, dtype = np.float32)/STD
+
+  return np.exp(-0.5*factor*factor).astype(np.float32)
+
+
+
+
+#############################################################################################################
+# Description: This function calculates cloud coverage score(s) in the same way as "get_CCover_score"
+#              function in Mosaic.py.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def cover_score(CloudRate):
+  return (1.0 - np.asarray(CloudRate, dtype = np.float32)/100.0).astype(np.float32)
+
+
+
+
+#############################################################################################################
+# Description: This function returns all the combinations of given spectral, temporal and spatial weighting
+#              factors as a (K, 3) array.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def weight_grid(SpecWs, TimeWs, SpatWs):
+  return np.array(list(itertools.product(SpecWs, TimeWs, SpatWs)), dtype = np.float32)
+
+
+
+
+#############################################################################################################
+# Description: This function evaluates a whole grid of score weighting factors on the candidate scenes of
+#              one or more sample areas. The three score components are computed only once for each sample,
+#              and then the total scores for a chunk of weight combinations are obtained with one broadcast
+#              operation, followed by a per-pixel selection of the best scene (as "qualityMosaic" does).
+#
+# Note:        As in "attach_Hybrid_score" function, the spectral score is normalized (score/(score+1)) only
+#              when temporal or spatial weight is larger than zero, otherwise the raw spectral score is used.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def sweep_score_weights(Samples, Weights, Chunk = 8):
+  '''Returns a list of dictionaries, each containing composite quality metrics for one combination of
+     weighting factors.
+
+     Args:
+       Samples(list): A list of dictionaries, one for each sample area, with the following keys:
+                      'scenes'(ndarray): A (S, 6, H, W) array of candidate scenes;
+                      'valid'(ndarray): A (S, H, W) boolean array of clear-sky pixels;
+                      'refer'(ndarray): A (6, H, W) reference mosaic;
+                      'class3'(ndarray): A (H, W) 3-class map;
+                      'doy_diff'(ndarray): A (S,) array of date differences to the window centre;
+                      'cloud'(ndarray): A (S,) array of scene cloud coverage percentages;
+                      'ssr_code'(int): The sensor type code;
+                      'win_size'(int): The size (in days) of compositing window;
+       Weights(ndarray): A (K, 3) array of spectral, temporal and spatial weighting factors;
+       Chunk(int): The number of weight combinations evaluated in one broadcast operation.'''
+  weights = np.asarray(Weights, dtype = np.float32).reshape(-1, 3)
+  nCombos = weights.shape[0]
+  sums    = np.zeros((nCombos, 5), dtype = np.float64)   # date gap, cloud, spectral score, refer diff, clear
+  used    = [set() for _ in range(nCombos)]
+  nPixels = 0
+
+  for index, sample in enumerate(Samples):
+    scenes = np.asarray(sample['scenes'], dtype = np.float32)
+    valid  = np.asarray(sample['valid'], dtype = bool)
+    refer  = np.asarray(sample['refer'], dtype = np.float32)
+    class3 = np.asarray(sample['class3'])
+    nScenes, _, H, W = scenes.shape
+
+    #================================================================================================
+    # Compute the three score components only once for the sample
+    #================================================================================================
+    raw_spec  = np.stack([spec_score(scenes[s], refer, class3) for s in range(nScenes)])   # (S, H, W)
+    norm_spec = raw_spec/(raw_spec + 1.0)
+    t_score   = time_score(sample['doy_diff'], sample['ssr_code'], sample['win_size'])     # (S,)
+    c_score   = cover_score(sample['cloud'])                                               # (S,)
+
+    doy_gap   = np.abs(np.asarray(sample['doy_diff'], dtype = np.float32))
+    cloud     = np.asarray(sample['cloud'], dtype = np.float32)
+    refer_dif = np.abs(scenes[:, [BLU, NIR, SW2]] - refer[None, [BLU, NIR, SW2]]).mean(axis = 1) # (S, H, W)
+    any_valid  = valid.any(axis = 0)
+    nClear     = int(any_valid.sum())
+    rows, cols = np.nonzero(any_valid)
+    nPixels  += H*W
+
+    #================================================================================================
+    # Evaluate the weight combinations chunk by chunk as batched tensor operations
+    #================================================================================================
+    for c0 in range(0, nCombos, int(Chunk)):
+      w = weights[c0:c0 + int(Chunk)]
+      spec_w, time_w, spat_w = w[:, 0], w[:, 1], w[:, 2]
+      use_norm = (time_w > 0) | (spat_w > 0)
+
+      spec   = np.where(use_norm[:, None, None, None], norm_spec[None]*spec_w[:, None, None, None], raw_spec[None])
+      totals = spec + (time_w[:, None]*t_score[None, :] + spat_w[:, None]*c_score[None, :])[:, :, None, None]
+      totals = np.where(valid[None], totals, -np.inf)                                     # (k, S, H, W)
+
+      best = np.argmax(totals, axis = 1)                                                  # (k, H, W)
+      for k in range(w.shape[0]):
+        sel = best[k][any_valid]
+        sums[c0 + k, 0] += doy_gap[sel].sum()
+        sums[c0 + k, 1] += cloud[sel].sum()
+        sums[c0 + k, 2] += raw_spec[sel, rows, cols].sum()
+        sums[c0 + k, 3] += refer_dif[sel, rows, cols].sum()
+        sums[c0 + k, 4] += nClear
+        used[c0 + k].update((index, int(s)) for s in np.unique(sel))
+
+  #==========================================================================================================
+  # Summarize the metrics for each weight combination
+  #==========================================================================================================
+  results = []
+  for k in range(nCombos):
+    clear = max(sums[k, 4], 1.0)
+    results.append({'spectral':        float(weights[k, 0]),
+                    'temporal':        float(weights[k, 1]),
+                    'spatial':         float(weights[k, 2]),
+                    'clear_fraction':  float(sums[k, 4]/max(nPixels, 1)),
+                    'date_gap_mean':   float(sums[k, 0]/clear),
+                    'cloud_mean':      float(sums[k, 1]/clear),
+                    'spec_score_mean': float(sums[k, 2]/clear),
+                    'refer_diff_mean': float(sums[k, 3]/clear),
+                    'nb_scenes_used':  len(used[k])})
+
+  return results
+
+
+
+
+
+#############################################################################################################
+# Description: This function computes the HOT (haze optimized transformation) values of a block of mosaic
+#              with the same logic as "Mosaic_Haze_Detection" function in Mosaic.py. All the indices are
+#              computed within one block, so no full-size temporary array is created.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def haze_HOT_block(Block, ValScale = 100.0):
+  '''Returns a (1, h, w) array of HOT values for a block of mosaic.
+
+     Args:
+       Block(ndarray): A (6, h, w) array of SIX_BANDS values of an exported mosaic;
+       ValScale(float): The factor used to convert the values in Block to the range between 0 and 100.'''
+  blu, grn, red, nir, sw1, sw2 = [Block[i]/np.float32(ValScale) for i in range(6)]
+
+  maxSW   = np.maximum(sw1, sw2)
+  maxSV   = np.maximum(blu, grn)
+  maxVIS  = np.maximum(maxSV, red)
+  maxIR   = np.maximum(maxSW, nir)
+  maxSpec = np.maximum(maxSW, maxVIS); np.maximum(maxSpec, nir, out = maxSpec)
+
+  with np.errstate(divide = 'ignore', invalid = 'ignore'):
+    NDVI = (nir - red)/(nir + red)
+    NDWI = (maxSV - maxSW)/(maxSW + maxSV)
+    NDSI = (maxIR - maxVIS)/(maxIR + maxVIS)
+
+  HOT     = blu - (red*0.5 + 2.0)
+  wat_thd = maxSW/10.0
+  no_wat  = (maxSpec > 1.0) & (NDWI < wat_thd)
+  no_veg  = (NDVI < 0.4) | (red > maxSV + 1) | (maxSW > nir + 1.0)
+
+  HOT[no_veg | (NDWI > wat_thd) | (HOT < 0)] = 0.0
+
+  shadow = (NDSI > 0.1) | (np.maximum(blu, red) < 1.0)
+  HOT[no_wat & (red < 4.0) & (maxIR < 15) & shadow] = 10.0
+
+  # Pixels without any valid value in exported mosaic are set to NaN
+  HOT[maxSpec <= 0] = np.nan
+
+  return HOT[None]
+
+
+
+
+#############################################################################################################
+# Description: This function detects haze for an exported mosaic by streaming its blocks, and saves either
+#              HOT values or a haze mask (1 for haze, 0 otherwise and 255 for no data) into a GeoTIFF file.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def mosaic_haze_detection(BandFiles, OutFile, ValScale = 100.0, AsMask = False, BlockSize = 1024, NbThreads = None):
+  '''Detects haze for an exported mosaic and returns the full path of resultant file.
+
+     Args:
+       BandFiles(list): Six (file path, band index) tuples of an exported mosaic in the order of SIX_BANDS;
+       OutFile(string): The full path name of resultant GeoTIFF file;
+       ValScale(float): The factor used to convert exported values to the range between 0 and 100;
+       AsMask(Boolean): A flag indicating if to save a haze mask rather than HOT values;
+       BlockSize(int): The size (in pixels) of processing blocks;
+       NbThreads(int): The number of parallel threads for processing blocks.'''
+  if len(BandFiles) != 6:
+    print('\n<mosaic_haze_detection> Six bands (blue, green, red, NIR, SWIR1 and SWIR2) are required!')
+    return None
+
+  if AsMask:
+    def haze_mask(block):
+      HOT  = haze_HOT_block(block, ValScale)
+      mask = (HOT > 0).astype(np.uint8)
+      mask[np.isnan(HOT)] = 255
+      return mask
+
+    return eoIO.run_blockwise(BandFiles, OutFile, haze_mask, 1, 'uint8', 255, BlockSize, NbThreads)
+  
+  return eoIO.run_blockwise(BandFiles, OutFile, lambda block: haze_HOT_block(block, ValScale), 1, 'float32', np.nan, BlockSize, NbThreads)
+
+
+
+
+def _haze_one_tile(Job):
+  return mosaic_haze_detection(**Job)
+
+
+
+#############################################################################################################
+# Description: This function detects haze for a number of exported mosaics (e.g., tiles) in parallel
+#              processes, while the blocks of each mosaic are processed in parallel threads.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def haze_detection_tiles(Jobs, NbWorkers = 2):
+  '''Detects haze for a number of exported mosaics and returns a list of resultant files.
+
+     Args:
+       Jobs(list): A list of dictionaries, each containing the input parameters of "mosaic_haze_detection";
+       NbWorkers(int): The number of parallel processes.'''
+  with ProcessPoolExecutor(max_workers = int(NbWorkers)) as executor:
+    return list(executor.map(_haze_one_tile, Jobs))
+
+
+
+
+
+#############################################################################################################
+# Description: This function returns the spectral, temporal and spatial weighting factors in the same way as
+#              "attach_Hybrid_score" function, together with a flag indicating if spectral scores have to be
+#              normalized.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def score_weights(ScoreWs):
+  spec_w = 1.0
+  time_w = spat_w = 0.0
+  if ScoreWs is not None:
+    spec_w = ScoreWs['spectral'] if 'spectral' in ScoreWs else 1.0
+    time_w = ScoreWs['temporal'] if 'temporal' in ScoreWs else 0.0
+    spat_w = ScoreWs['spatial']  if 'spatial'  in ScoreWs else 0.0  
+
+  use_norm = time_w > 0.0 or spat_w > 0.0
+  if not use_norm:
+    spec_w = 1.0   # The raw spectral score is used without weighting
+
+  return float(spec_w), float(time_w), float(spat_w), bool(use_norm)
+
+
+
+
+#############################################################################################################
+# Description: These two functions score one scene and update the running best candidate of each pixel. The
+#              first one is a per-pixel loop, which computes the water and land branches of spectral score
+#              and the total score without creating any intermediate array (compiled with Numba if it is
+#              available). The second one is its NumPy equivalent, used when Numba is not available.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def _score_select_loop(Scene, Valid, Refer, Class3, ConstScore, SpecW, UseNorm, SceneIndex, BestScore, BestIndex, BestBands):
+  nBands, H, W = Scene.shape
+  for r in range(H):
+    for c in range(W):
+      if not Valid[r, c]:
+        continue
+
+      blu = Scene[0, r, c]
+      nir = Scene[3, r, c]
+      blu_med = Refer[0, r, c]
+      nir_med = Refer[3, r, c]
+      cls = Class3[r, c]
+
+      blu_refer = Refer[5, r, c]*0.25 if cls == 2 else blu_med
+      blu_pen   = np.exp(abs(blu_refer - blu))
+      nir_pen   = abs(nir_med - nir)
+
+      if cls == 0:
+        score = (blu_med + nir_med)/(blu_pen + nir_pen)
+      else:
+        score = nir/(max(blu, 0.01) + nir_pen + blu_pen)
+
+      if UseNorm:
+        score = SpecW*score/(score + 1.0) + ConstScore
+
+      if score > BestScore[r, c]:
+        BestScore[r, c] = score
+        BestIndex[r, c] = SceneIndex
+        for b in range(nBands):
+          BestBands[b, r, c] = Scene[b, r, c]
+
+
+
+def _score_select_numpy(Scene, Valid, Refer, Class3, ConstScore, SpecW, UseNorm, SceneIndex, BestScore, BestIndex, BestBands):
+  score = spec_score(Scene, Refer, Class3)
+  if UseNorm:
+    score = SpecW*score/(score + 1.0) + ConstScore
+
+  better = Valid & (score > BestScore)
+  BestScore[better]    = score[better]
+  BestIndex[better]    = SceneIndex
+  BestBands[:, better] = Scene[:, better]
+
+
+
+if numba is not None:
+  _score_select = numba.njit(cache = True, nogil = True)(_score_select_loop)
+else:
+  _score_select = _score_select_numpy
+
+
+
+
+#############################################################################################################
+# Description: This function creates a composite from a sequence of scenes with the same scoring as the
+#              hybrid compositing in Mosaic.py. The scenes are visited only once, and each pixel keeps only
+#              its running best candidate, so no per-scene score array has to be kept.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def fused_composite(Scenes, Valids, Refer, Class3, DOY_diffs, CloudRates, SsrCode, WinSize, ScoreWs = None):
+  '''Returns a composite (6, H, W), its score (H, W) and the index (H, W) of selected scene for each pixel
+     (-1 for the pixels without any valid observation).
+
+     Args:
+       Scenes(iterable): A sequence of (6, H, W) arrays of SIX_BANDS values ranging from 0 to 100;
+       Valids(iterable): A sequence of (H, W) boolean arrays of clear-sky pixels;
+       Refer(ndarray): A (6, H, W) reference mosaic;
+       Class3(ndarray): A (H, W) 3-class map;
+       DOY_diffs(list): The date differences between the scenes and window centre;
+       CloudRates(list): The cloud coverage percentages of the scenes;
+       SsrCode(int): The sensor type code;
+       WinSize(int): The size (in days) of compositing window;
+       ScoreWs(Dictionary): A dictionary containing weighting factors for three scoring components.'''
+  spec_w, time_w, spat_w, use_norm = score_weights(ScoreWs)
+
+  refer  = np.ascontiguousarray(Refer, dtype = np.float32)
+  class3 = np.ascontiguousarray(Class3, dtype = np.uint8)
+  H, W   = class3.shape
+
+  best_score = np.full((H, W), -np.inf, dtype = np.float32)
+  best_index = np.full((H, W), -1, dtype = np.int16)
+  best_bands = np.zeros((6, H, W), dtype = np.float32)
+
+  t_scores = time_score(DOY_diffs, SsrCode, WinSize)
+  c_scores = cover_score(CloudRates)
+
+  for index, (scene, valid) in enumerate(zip(Scenes, Valids)):
+    const_score = time_w*float(t_scores[index]) + spat_w*float(c_scores[index])   # Uniform over a scene
+    _score_select(np.ascontiguousarray(scene, dtype = np.float32), np.ascontiguousarray(valid, dtype = np.bool_),
+                  refer, class3, np.float32(const_score), np.float32(spec_w), use_norm, index, 
+                  best_score, best_index, best_bands)
+
+  return best_bands, best_score, best_index
+
+
+
+
+
+#############################################################################################################
+# Description: This function merges a block of base mosaic with the same block of backup mosaic with the
+#              same rules as "MergeMosaics" function in Mosaic.py: (1) the gaps in base mosaic are filled with
+#              backup pixels; (2) base pixels are replaced with backup ones whose scores minus 'ScoreThresh'
+#              are still larger than base scores.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def merge_mosaics_block(Base, BkUp, BaseValid, BkUpValid, ScoreBand, ScoreThresh):
+  '''Returns the merged block and a boolean array indicating where backup pixels are used.
+
+     Args:
+       Base(ndarray): A (nBands, h, w) block of base mosaic;
+       BkUp(ndarray): A (nBands, h, w) block of backup mosaic;
+       BaseValid(ndarray): A (h, w) boolean array of valid pixels in base block;
+       BkUpValid(ndarray): A (h, w) boolean array of valid pixels in backup block;
+       ScoreBand(int): The index of score band in the blocks;
+       ScoreThresh(float): The score threshold for replacing base pixels with backup ones.'''
+  use_bkup = BkUpValid & (~BaseValid | (BkUp[ScoreBand] - float(ScoreThresh) > Base[ScoreBand]))
+
+  merged = Base.copy()
+  merged[:, use_bkup] = BkUp[:, use_bkup]
+
+  return merged, use_bkup
+
+
+
+
+#############################################################################################################
+# Description: This function merges two exported mosaic files block by block with "merge_mosaics_block"
+#              function. The pixels with all band values equal to 'NoData' are regarded as gaps.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def merge_mosaic_files(BaseBands, BkUpBands, OutFile, ScoreBand, ScoreThresh, NoData = 0, OutDtype = 'uint16', BlockSize = 1024, NbThreads = None):
+  '''Merges two exported mosaics and returns the full path of resultant file.
+
+     Args:
+       BaseBands(list): The (file path, band index) tuples of base mosaic;
+       BkUpBands(list): The (file path, band index) tuples of backup mosaic in the same band order;
+       OutFile(string): The full path name of resultant GeoTIFF file;
+       ScoreBand(int): The index of score band in 'BaseBands';
+       ScoreThresh(float): The score threshold (in the unit of exported score values);
+       NoData(float): The value of the pixels without valid observation;
+       OutDtype(string): The data type of resultant file;
+       BlockSize(int): The size (in pixels) of processing blocks;
+       NbThreads(int): The number of parallel threads.'''
+  nBands = len(BaseBands)
+  if nBands != len(BkUpBands):
+    print('\n<merge_mosaic_files> The two mosaics must have the same bands!')
+    return None
+
+  def merge_block(block):
+    base, bkup = block[:nBands], block[nBands:]
+    merged, _  = merge_mosaics_block(base, bkup, (base != NoData).any(axis = 0), (bkup != NoData).any(axis = 0), ScoreBand, ScoreThresh)
+    return merged
+
+  return eoIO.run_blockwise(list(BaseBands) + list(BkUpBands), OutFile, merge_block, nBands, OutDtype, NoData, BlockSize, NbThreads)
+
+
+
+
+#############################################################################################################
+# Description: This function creates the composites of multiple sensors (e.g., Landsat 8 and 9) concurrently
+#              in a thread pool, where the reference mosaic and 3-class map are shared read-only, and then
+#              merges them one after another, in a row-block streaming way, with the same rules as
+#              "MergeMosaics" function. The first sensor is used as the base.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def multi_sensor_composite(SensorJobs, Refer, Class3, ScoreThresh = 3.0, NbWorkers = None, RowBlock = 512):
+  '''Returns a merged composite (6, H, W), its score (H, W) and the sensor code (H, W) of each pixel (0 for
+     the pixels without any valid observation).
+
+     Args:
+       SensorJobs(list): A list of dictionaries, one for each sensor, with 'scenes', 'valids', 'doy_diffs',
+                         'cloud_rates', 'ssr_code', 'win_size' and optional 'score_weights' keys, which are
+                         passed to "fused_composite" function;
+       Refer(ndarray): A (6, H, W) reference mosaic shared by all the sensors;
+       Class3(ndarray): A (H, W) 3-class map shared by all the sensors;
+       ScoreThresh(float): The score threshold for replacing base pixels with backup ones;
+       NbWorkers(int): The number of parallel threads (the number of sensors if None);
+       RowBlock(int): The number of rows merged in one block.'''
+  refer  = np.ascontiguousarray(Refer, dtype = np.float32)
+  class3 = np.ascontiguousarray(Class3, dtype = np.uint8)
+  refer.setflags(write = False)
+  class3.setflags(write = False)
+
+  def one_sensor(job):
+    return fused_composite(job['scenes'], job['valids'], refer, class3, job['doy_diffs'], job['cloud_rates'], 
+                           job['ssr_code'], job['win_size'], job.get('score_weights', None))
+
+  #==========================================================================================================
+  # Create the composites of all the sensors concurrently
+  #==========================================================================================================
+  nb_workers = int(NbWorkers) if NbWorkers != None else len(SensorJobs)
+  with ThreadPoolExecutor(max_workers = max(1, nb_workers)) as executor:
+    composites = list(executor.map(one_sensor, SensorJobs))
+
+  #==========================================================================================================
+  # Merge the composites one after another, block by block
+  #==========================================================================================================
+  bands, score, index = composites[0]
+  H, W     = score.shape
+  mosaic   = np.concatenate([bands, score[None]])
+  ssr_code = np.where(index >= 0, int(SensorJobs[0]['ssr_code']), 0).astype(np.int16)
+
+  for job, (bk_bands, bk_score, bk_index) in zip(SensorJobs[1:], composites[1:]):
+    for r0 in range(0, H, int(RowBlock)):
+      rows = slice(r0, min(H, r0 + int(RowBlock)))
+      base = mosaic[:, rows]
+      bkup = np.concatenate([bk_bands[:, rows], bk_score[None, rows]])
+
+      merged, use_bkup = merge_mosaics_block(base, bkup, ssr_code[rows] > 0, bk_index[rows] >= 0, 6, ScoreThresh)
+      mosaic[:, rows] = merged
+      ssr_code[rows][use_bkup] = int(job['ssr_code'])
+
+  return mosaic[:6], mosaic[6], ssr_code
+
+
+
+
+
+#############################################################################################################
+# Description: This function detects cloudy pixels in a block of a scene by comparing it with the same block
+#              of a MODIS reference mosaic, with the same algorithm as "mask_from_MODIS" function in
+#              ImgMask.py.
+#
+# Note:        (1) Both the scene and the MODIS mosaic must be in the order of 'SIX_BANDS' with values rescaled
+#                  to the range between 0 and 100, and the MODIS mosaic must have been resampled to the grid
+#                  of the scene;
+#              (2) As in "mask_from_MODIS" function, the blue band is used in place of the red band for NDVI.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def MODIS_cloud_block(Scene, Modis):
+  '''Returns a boolean array (h, w) with True representing cloudy pixels.
+
+     Args:
+       Scene(ndarray): A (6, h, w) block of a Sentinel-2 or Landsat scene;
+       Modis(ndarray): A (6, h, w) block of a MODIS reference mosaic.'''
+  blu, nir = Scene[BLU].astype(np.float32), Scene[NIR].astype(np.float32)
+
+  with np.errstate(divide = 'ignore', invalid = 'ignore'):
+    ndvi = (nir - blu)/(nir + blu)
+
+  non_veg    = ndvi < 0.4
+  blu_adjust = np.where(non_veg, 5.0, 2.0)
+  nir_adjust = np.where(non_veg, 2.0, 5.0)
+
+  return (blu > Modis[BLU] + blu_adjust) | (nir < Modis[NIR] - nir_adjust)
+
+
+
+
+#############################################################################################################
+# Description: This function applies the MODIS-based cloud test to a downloaded scene block by block and
+#              saves the resultant cloud mask (1 => cloudy) into a GeoTIFF file.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def MODIS_cloud_mask(SceneBands, ModisBands, OutFile, ValScale = 100.0, BlockSize = 1024, NbThreads = None):
+  '''Returns the full path of resultant cloud mask file.
+
+     Args:
+       SceneBands(list): The (file path, band index) tuples of six bands (SIX_BANDS order) of a scene;
+       ModisBands(list): The (file path, band index) tuples of six bands of a MODIS reference mosaic on the
+                         same grid as the scene;
+       OutFile(string): The full path name of resultant GeoTIFF file;
+       ValScale(float): The value scale of both inputs relative to the range between 0 and 100;
+       BlockSize(int): The size (in pixels) of processing blocks;
+       NbThreads(int): The number of parallel threads.'''
+  if len(SceneBands) != 6 or len(ModisBands) != 6:
+    print('\n<MODIS_cloud_mask> Six bands are required for both the scene and the MODIS mosaic!')
+    return None
+
+  scale = 100.0/float(ValScale)
+
+  def cloud_block(block):
+    return MODIS_cloud_block(block[:6]*scale, block[6:]*scale)[None].astype(np.uint8)
+
+  return eoIO.run_blockwise(list(SceneBands) + list(ModisBands), OutFile, cloud_block, 1, 'uint8', None, BlockSize, NbThreads)
+
+
+
+
+
+#############################################################################################################
+# Description: These two functions compute the spectral angles between two blocks of mosaics with the same
+#              algorithm as "CVA_SAM" function in Image.py. The first one is a per-pixel loop, which fuses the
+#              normalization, the dot products and the arc cosine into one pass over the bands without any
+#              intermediate array (compiled with Numba if it is available). The second one is its NumPy
+#              equivalent, used when Numba is not available.
+#
+# Note:        (1) The normalization in "normalize_pixValues" function scales the spectrum of a pixel with
+#                  'ValScale' over the sum of its values, which cancels in the cosine except for its sign;
+#              (2) The cosine is clamped to [-1, 1] to avoid NaN caused by rounding errors;
+#              (3) The pixels without valid value in either block or with a zero denominator are set to NaN.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def _CVA_SAM_loop(Block1, Block2, UseNorm, Thresh, NoData, Out):
+  nBands, H, W = Block1.shape
+  for r in range(H):
+    for c in range(W):
+      dot, sq1, sq2, sum1, sum2 = 0.0, 0.0, 0.0, 0.0, 0.0
+      valid1, valid2 = False, False
+      for b in range(nBands):
+        v1 = Block1[b, r, c]
+        v2 = Block2[b, r, c]
+        valid1 = valid1 or v1 != NoData
+        valid2 = valid2 or v2 != NoData
+        dot  += v1*v2
+        sq1  += v1*v1
+        sq2  += v2*v2
+        sum1 += v1
+        sum2 += v2
+
+      denom = np.sqrt(sq1*sq2)
+      if not (valid1 and valid2) or denom == 0.0 or (UseNorm and sum1*sum2 == 0.0):
+        Out[r, c] = np.nan
+        continue
+
+      cosine = dot/denom
+      if UseNorm and sum1*sum2 < 0.0:
+        cosine = -cosine
+
+      angle = np.arccos(min(max(cosine, -1.0), 1.0))
+      Out[r, c] = 0.0 if angle < Thresh else angle
+
+
+
+def _CVA_SAM_numpy(Block1, Block2, UseNorm, Thresh, NoData, Out):
+  dot = np.einsum('bij,bij->ij', Block1, Block2)
+  sq1 = np.einsum('bij,bij->ij', Block1, Block1)
+  sq2 = np.einsum('bij,bij->ij', Block2, Block2)
+
+  with np.errstate(divide = 'ignore', invalid = 'ignore'):
+    cosine = dot/np.sqrt(sq1*sq2)
+    if UseNorm:
+      sign = np.sign(Block1.sum(axis = 0)*Block2.sum(axis = 0))
+      cosine *= np.where(sign == 0, np.nan, sign)
+
+  angle = np.arccos(np.clip(cosine, -1.0, 1.0))
+  angle[angle < Thresh] = 0.0
+  angle[~((Block1 != NoData).any(axis = 0) & (Block2 != NoData).any(axis = 0))] = np.nan
+  Out[...] = angle
+
+
+
+if numba is not None:
+  _CVA_SAM_kernel = numba.njit(cache = True, nogil = True)(_CVA_SAM_loop)
+else:
+  _CVA_SAM_kernel = _CVA_SAM_numpy
+
+
+
+
+#############################################################################################################
+# Description: This function returns a (1, h, w) float32 array of spectral angles between two blocks of
+#              mosaics covering the same ground area.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def CVA_SAM_block(Block1, Block2, ValScale, Thresh = 0.35, NoData = 0):
+  '''Returns a (1, h, w) array of spectral angles (radians), where the angles below 'Thresh' are set to 0.
+
+     Args:
+       Block1(ndarray): A (nBands, h, w) block of the first mosaic;
+       Block2(ndarray): A (nBands, h, w) block of the second mosaic with the same bands;
+       ValScale(float): The value scaling factor applied to normalized values (no normalization if <= 1);
+       Thresh(float): The angle threshold, below which no change is reported;
+       NoData(float): The value of the pixels without valid observation.'''
+  block1 = np.ascontiguousarray(Block1, dtype = np.float32)
+  block2 = np.ascontiguousarray(Block2, dtype = np.float32)
+  angles = np.empty(block1.shape[1:], dtype = np.float32)
+
+  _CVA_SAM_kernel(block1, block2, float(ValScale) > 1, np.float32(Thresh), np.float32(NoData), angles)
+
+  return angles[None]
+
+
+
+
+#############################################################################################################
+# Description: This function creates a spectral angle (change) map between two exported mosaics (e.g., the
+#              mosaics of a tile in two years) by streaming their blocks in parallel threads.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def CVA_SAM_files(Bands1, Bands2, OutFile, ValScale, Thresh = 0.35, NoData = 0, BlockSize = 1024, NbThreads = None):
+  '''Creates a spectral angle map and returns the full path of resultant file.
+
+     Args:
+       Bands1(list): The (file path, band index) tuples of the first mosaic;
+       Bands2(list): The (file path, band index) tuples of the second mosaic in the same band order and grid;
+       OutFile(string): The full path name of resultant GeoTIFF file;
+       ValScale(float): The value scaling factor applied to normalized values (no normalization if <= 1);
+       Thresh(float): The angle threshold, below which no change is reported;
+       NoData(float): The value of the pixels without valid observation in the two mosaics;
+       BlockSize(int): The size (in pixels) of processing blocks;
+       NbThreads(int): The number of parallel threads.'''
+  nBands = len(Bands1)
+  if nBands != len(Bands2) or nBands < 2:
+    print('\n<CVA_SAM_files> The two mosaics must have the same bands (at least two)!')
+    return None
+
+  def angle_block(block):
+    return CVA_SAM_block(block[:nBands], block[nBands:], ValScale, Thresh, NoData)
+
+  return eoIO.run_blockwise(list(Bands1) + list(Bands2), OutFile, angle_block, 1, 'float32', np.nan, BlockSize, NbThreads)
+
+
+
+
+def _CVA_SAM_one_tile(Job):
+  return CVA_SAM_files(**Job)
+
+
+
+#############################################################################################################
+# Description: This function creates spectral angle maps for a number of mosaic pairs (e.g., the tiles of a
+#              national tile set) in parallel processes, while the blocks of each pair are processed in
+#              parallel threads.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def CVA_SAM_tiles(Jobs, NbWorkers = 2):
+  '''Creates spectral angle maps for a number of mosaic pairs and returns a list of resultant files.
+
+     Args:
+       Jobs(list): A list of dictionaries, each containing the input parameters of "CVA_SAM_files";
+       NbWorkers(int): The number of parallel processes.'''
+  with ProcessPoolExecutor(max_workers = int(NbWorkers)) as executor:
+    return list(executor.map(_CVA_SAM_one_tile, Jobs))
@@ -0,0 +1,308 @@
+#############################################################################################################
+# Description: This module contains a local counterpart of "superpixel_img" function in Image.py, which
+#              segments exported mosaics into superpixels with the SNIC (Simple Non-Iterative Clustering)
+#              algorithm, so that the segmentation of whole tiles can be conducted on local machines.
+#
+# Note:        (1) This module does not depend on GEE. Rasterio is only required for processing raster files;
+#              (2) As "ee.Algorithms.Image.Segmentation.SNIC", the seeds are placed on a regular grid with a
+#                  spacing of 'Size' pixels, the pixels are assigned through a priority queue sorted by the
+#                  distance (the squared spectral distance plus 'Compactness' times the squared spatial
+#                  distance over 'Size' squared) to the running centroids of clusters, and the output bands
+#                  are named as '<band>_mean';
+#              (3) Large mosaics are processed in blocks read with a halo of 'NeighborhoodSize' pixels (2 *
+#                  'Size' by default, as in GEE). The cluster labels are the indices of the seeds on the global
+#                  seed grid, so a superpixel crossing a block seam keeps the same label in the neighbouring
+#                  blocks, and its mean values are computed from all of its pixels in a second pass;
+#              (4) The pixels with all band values equal to 'NoData' are not segmented (label -1 and NaN means).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+import heapq
+import threading
+import numpy as np
+
+import eoLocalIO as eoIO
+
+try:
+  import numba
+except ImportError:
+  numba = None
+
+
+
+
+#############################################################################################################
+# Description: This function is the inner loop of SNIC algorithm (compiled with Numba if it is available).
+#              It assigns the pixels connected to the seeds to clusters in the order of their distances and
+#              updates the centroids (spectral values and positions) of clusters on the fly.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def _SNIC_loop(Image, Valid, SeedRows, SeedCols, NbrRows, NbrCols, Compactness, SpatialNorm, Labels):
+  nBands, H, W = Image.shape
+  nSeeds = SeedRows.shape[0]
+  sums   = np.zeros((nSeeds, nBands + 2), dtype = np.float64)   # Spectral sums, row sum and column sum
+  counts = np.zeros(nSeeds, dtype = np.int64)
+
+  heap = [(0.0, 0, 0, 0)]   # (distance, sequence number, pixel position, cluster index)
+  heap.pop()
+  seq = 0
+  for k in range(nSeeds):
+    if Valid[SeedRows[k], SeedCols[k]]:
+      heapq.heappush(heap, (0.0, seq, SeedRows[k]*W + SeedCols[k], k))
+      seq += 1
+
+  while len(heap) > 0:
+    _, _, pos, k = heapq.heappop(heap)
+    r = pos//W
+    c = pos - r*W
+    if Labels[r, c] >= 0:
+      continue
+
+    #--------------------------------------------------------------------------------------------------------
+    # Assign the pixel to the cluster and update the centroid of the cluster
+    #--------------------------------------------------------------------------------------------------------
+    Labels[r, c] = k
+    counts[k] += 1
+    for b in range(nBands):
+      sums[k, b] += Image[b, r, c]
+    sums[k, nBands]     += r
+    sums[k, nBands + 1] += c
+
+    #--------------------------------------------------------------------------------------------------------
+    # Push the unlabelled neighbours with their distances to the updated centroid
+    #--------------------------------------------------------------------------------------------------------
+    n = float(counts[k])
+    for i in range(NbrRows.shape[0]):
+      rr = r + NbrRows[i]
+      cc = c + NbrCols[i]
+      if rr < 0 or rr >= H or cc < 0 or cc >= W or not Valid[rr, cc] or Labels[rr, cc] >= 0:
+        continue
+
+      spec_dist = 0.0
+      for b in range(nBands):
+        diff = Image[b, rr, cc] - sums[k, b]/n
+        spec_dist += diff*diff
+
+      dr = rr - sums[k, nBands]/n
+      dc = cc - sums[k, nBands + 1]/n
+      dist = spec_dist + Compactness*(dr*dr + dc*dc)/SpatialNorm
+
+      heapq.heappush(heap, (float(dist), seq, rr*W + cc, k))
+      seq += 1
+
+
+
+if numba is not None:
+  _SNIC_kernel = numba.njit(cache = True, nogil = True)(_SNIC_loop)
+else:
+  _SNIC_kernel = _SNIC_loop
+
+
+
+
+#############################################################################################################
+# Description: This function returns the row (or column) coordinates of the seeds of the global seed grid
+#              within a range of rows (or columns). The seeds are located at Size//2 + i*Size.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def seed_coords(Offset, Length, Size):
+  first = Offset + (Size//2 - Offset) % Size
+
+  return np.arange(first, Offset + Length, Size, dtype = np.int64)
+
+
+
+
+#############################################################################################################
+# Description: This function segments a block of mosaic (which is a part of a larger image) with SNIC
+#              algorithm and labels its pixels with the indices of the seeds on the global seed grid.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def SNIC_block(Block, RowOff, ColOff, GridCols, Size = 3, Compactness = 0.01, Connectivity = 8, NoData = 0):
+  '''Returns a (h, w) int64 array of global cluster labels (-1 for the pixels not segmented).
+
+     Args:
+       Block(ndarray): A (nBands, h, w) block of mosaic;
+       RowOff(int): The row offset of the block in the whole image;
+       ColOff(int): The column offset of the block in the whole image;
+       GridCols(int): The number of columns of the global seed grid;
+       Size(int): The spacing (in pixels) of seeds;
+       Compactness(float): The weight of spatial distance (0 disables spatial distance weighting);
+       Connectivity(int): The connectivity of pixels (4 or 8);
+       NoData(float): The value of the pixels without valid observation.'''
+  image = np.ascontiguousarray(Block, dtype = np.float32)
+  _, h, w = image.shape
+  size    = int(Size)
+  valid   = (image != NoData).any(axis = 0) & np.isfinite(image).all(axis = 0)
+
+  rows = seed_coords(int(RowOff), h, size)
+  cols = seed_coords(int(ColOff), w, size)
+  seed_rows = np.repeat(rows - int(RowOff), len(cols))
+  seed_cols = np.tile(cols - int(ColOff), len(rows))
+  seed_ids  = (np.repeat(rows//size, len(cols))*int(GridCols) + np.tile(cols//size, len(rows))).astype(np.int64)
+
+  if int(Connectivity) == 4:
+    nbr_rows, nbr_cols = np.array([-1, 1, 0, 0], dtype = np.int64), np.array([0, 0, -1, 1], dtype = np.int64)
+  else:
+    nbr_rows = np.array([-1, -1, -1, 0, 0, 1, 1, 1], dtype = np.int64)
+    nbr_cols = np.array([-1, 0, 1, -1, 1, -1, 0, 1], dtype = np.int64)
+
+  labels = np.full((h, w), -1, dtype = np.int64)
+  if len(seed_ids) == 0:
+    return labels
+
+  _SNIC_kernel(image, valid, seed_rows, seed_cols, nbr_rows, nbr_cols, float(Compactness), float(size*size), labels)
+
+  return np.where(labels >= 0, seed_ids[np.maximum(labels, 0)], -1)
+
+
+
+
+#############################################################################################################
+# Description: This function segments an in-memory mosaic with SNIC algorithm.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def SNIC_array(Image, Size = 3, Compactness = 0.01, Connectivity = 8, NoData = 0):
+  '''Returns the cluster labels (H, W) and the mean values (nBands, H, W) of the superpixels.
+
+     Args:
+       Image(ndarray): A (nBands, H, W) mosaic;
+       Size(int): The spacing (in pixels) of seeds;
+       Compactness(float): The weight of spatial distance (0 disables spatial distance weighting);
+       Connectivity(int): The connectivity of pixels (4 or 8);
+       NoData(float): The value of the pixels without valid observation.'''
+  image     = np.asarray(Image, dtype = np.float32)
+  nBands, H, W = image.shape
+  grid_cols = -(-W//int(Size))
+  n_labels  = -(-H//int(Size))*grid_cols
+
+  labels = SNIC_block(image, 0, 0, grid_cols, Size, Compactness, Connectivity, NoData)
+  sums, counts = np.zeros((nBands, n_labels), dtype = np.float64), np.zeros(n_labels, dtype = np.int64)
+  ids, block_sums, block_counts = label_sums(image, labels)
+  sums[:, ids], counts[ids] = block_sums, block_counts
+
+  return labels, label_means(cluster_means(sums, counts), labels)
+
+
+
+
+#############################################################################################################
+# Description: These functions accumulate the band sums and pixel counts of the clusters present in a block,
+#              compute the mean values of all the clusters, and map the mean values back onto a block of
+#              labels.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def label_sums(Block, Labels):
+  '''Returns the unique labels (n,), band sums (nBands, n) and pixel counts (n,) of the clusters in a block.'''
+  used = Labels >= 0
+  ids, inverse = np.unique(Labels[used], return_inverse = True)
+  counts = np.bincount(inverse, minlength = len(ids)).astype(np.int64)
+  sums   = np.stack([np.bincount(inverse, weights = band[used], minlength = len(ids)) for band in Block])
+
+  return ids, sums, counts
+
+
+
+def cluster_means(Sums, Counts):
+  with np.errstate(divide = 'ignore', invalid = 'ignore'):
+    return (Sums/Counts[None]).astype(np.float32)
+
+
+
+def label_means(Means, Labels):
+  out = Means[:, np.maximum(Labels, 0)]
+  out[:, Labels < 0] = np.nan
+
+  return out
+
+
+
+
+#############################################################################################################
+# Description: This function segments an exported mosaic file with SNIC algorithm in two passes. The first
+#              pass segments the blocks (with halos) in parallel threads, saves the cluster labels and
+#              accumulates the band sums of clusters; the second pass writes the mean values of clusters into
+#              '<band>_mean' bands, so the superpixels crossing block seams are stitched into one.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def SNIC_files(SrcBands, BandNames, OutFile, Size = 3, Compactness = 0.01, Connectivity = 8, NeighborhoodSize = None, NoData = 0, ClusterFile = None, BlockSize = 1024, NbThreads = None):
+  '''Segments an exported mosaic and returns the full paths of resultant mean and cluster files.
+
+     Args:
+       SrcBands(list): The (file path, band index) tuples of the bands of a mosaic;
+       BandNames(list): The names of the bands in 'SrcBands';
+       OutFile(string): The full path name of resultant GeoTIFF file of '<band>_mean' bands;
+       Size(int): The spacing (in pixels) of seeds;
+       Compactness(float): The weight of spatial distance (0 disables spatial distance weighting);
+       Connectivity(int): The connectivity of pixels (4 or 8);
+       NeighborhoodSize(int): The halo (in pixels, at least 1) of processing blocks (2 * Size if None);
+       NoData(float): The value of the pixels without valid observation;
+       ClusterFile(string): The full path name of resultant cluster label file ('<OutFile>_clusters.tif' if None);
+       BlockSize(int): The size (in pixels) of processing blocks;
+       NbThreads(int): The number of parallel threads.'''
+  if len(SrcBands) != len(BandNames):
+    print('\n<SNIC_files> The number of band names must be the same as the number of bands!')
+    return None
+
+  raster_size = eoIO.raster_size(SrcBands[0][0])
+  if raster_size == None:
+    return None
+
+  width, height = raster_size
+  size      = int(Size)
+  halo      = max(1, int(NeighborhoodSize) if NeighborhoodSize != None else 2*size)  # Block windows are needed for global labels
+  grid_cols = -(-width//size)
+  n_labels  = -(-height//size)*grid_cols
+  nBands    = len(SrcBands)
+
+  if ClusterFile == None:
+    ClusterFile = OutFile[:-4] + '_clusters.tif' if OutFile.lower().endswith('.tif') else OutFile + '_clusters.tif'
+
+  #==========================================================================================================
+  # Pass 1: segment the blocks with halos and accumulate the band sums over core blocks
+  #==========================================================================================================
+  sums   = np.zeros((nBands, n_labels), dtype = np.float64)
+  counts = np.zeros(n_labels, dtype = np.int64)
+  lock   = threading.Lock()
+
+  def segment_block(block, window, core):
+    labels = SNIC_block(block, window[1], window[0], grid_cols, size, Compactness, Connectivity, NoData)
+    r0, c0 = core[1] - window[1], core[0] - window[0]
+    rows, cols = slice(r0, r0 + core[3]), slice(c0, c0 + core[2])
+
+    labels = labels[rows, cols]
+    ids, block_sums, block_counts = label_sums(block[:, rows, cols], labels)
+    with lock:
+      sums[:, ids] += block_sums
+      counts[ids]  += block_counts
+
+    return labels[None]
+
+  if eoIO.run_blockwise(SrcBands, ClusterFile, segment_block, 1, 'int32', -1, BlockSize, NbThreads, halo, 'float32', ['clusters']) == None:
+    return None
+
+  #==========================================================================================================
+  # Pass 2: write the mean values of clusters
+  #==========================================================================================================
+  mean_names = [str(name) + '_mean' for name in BandNames]
+  means      = cluster_means(sums, counts)
+
+  def mean_block(block):
+    return label_means(means, block[0])
+
+  eoIO.run_blockwise([(ClusterFile, 1)], OutFile, mean_block, nBands, 'float32', np.nan, BlockSize, NbThreads, 0, 'int64', mean_names)
+
+  return OutFile, ClusterFile
@@ -16,10 +16,18 @@ import ImgSet as IS
 import eoTileGrids as eoTG
 import eoAuxData as eoAD
 import eoParams as eoPM
+import eoFingerprint as eoFP
+import eoModisRefer as eoMR
+import eoDateWin as eoDW
+import eoStaticMask as eoSM
+import eoCatalog as eoCat
 
 
 #veg_NDVI_thresh = 0.4
 
+# The 3-class maps created or loaded in current session (see "get_class3_map" function)
+_CLASS3_MAPS = {}
+
 
 
 ######################################################################################################
@@ -182,6 +190,141 @@ def ImgColl_refer_mosaic(masked_ImgColl_target, masked_ImgColl_before, SsrData,
   class3_map = create_3_class_map_SCL(UsedImgColl, median, SsrData, True)
   
   return median, class3_map
+
+
+
+
+#############################################################################################################
+# Description: This function returns the key of the 3-class map of a sensor, a region and the season
+#              containing a given time window.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def class3_key(RegionName, SsrData, StartD, StopD):
+  year, season = eoDW.season_of(eoDW.period_centre(StartD, StopD))
+
+  return 'class3_{}_{}_{}_{}'.format(str(RegionName).lower(), str(SsrData['NAME']).lower(), year, season)
+
+
+
+
+#############################################################################################################
+# Description: This function creates the 3-class map (water, non-vegetated and vegetated) of a region from
+#              all the images acquired in the season containing a given time window.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def season_class3_map(SsrData, Region, StartD, StopD, CS_plus = False):
+  '''Returns a 3-class map for the season containing a given time window.
+
+  Args:
+     SsrData(dictionary): A given dictionary containing some meta data about a sensor;
+     Region(ee.Geometry): A spatial region;
+     StartD(string): The start date string of a compositing window;
+     StopD(string): The stop date string of a compositing window;
+     CS_plus(Boolean): A flag indicating if to apply CloudScore+ mask.'''
+  year, season = eoDW.season_of(eoDW.period_centre(StartD, StopD))
+  start, stop  = eoDW.season_range(year, season)
+
+  season_coll = IS.getCollection(SsrData, Region, start, stop, Img.EXTRA_NONE, AttachCS = CS_plus)
+  masked_coll = IS.mask_collection(season_coll, eoDW.year_of(start), SsrData, CS_plus, 0.6)
+  _, class3_map = ImgColl_refer_mosaic(masked_coll, None, SsrData, True)
+
+  return class3_map.uint8()
+
+
+
+
+#############################################################################################################
+# Description: This function looks up the 3-class map of a region and the season containing a given time
+#              window, first in the memory cache, then in the given asset folder. A new map is created (and
+#              kept in memory) only when it has not been cached, so that all the monthly composites within
+#              a season share one map.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def get_class3_map(RegionName, Region, SsrData, StartD, StopD, CS_plus = False, AssetRoot = ''):
+  '''Returns a 3-class map (0, 1 and 2 for water, non-vegetated and vegetated, respectively).
+
+  Args:
+     RegionName(string): The name of a spatial region (e.g., 'tile42');
+     Region(ee.Geometry): The spatial region;
+     SsrData(dictionary): A given dictionary containing some meta data about a sensor;
+     StartD(string): The start date string of a compositing window;
+     StopD(string): The stop date string of a compositing window;
+     CS_plus(Boolean): A flag indicating if to apply CloudScore+ mask;
+     AssetRoot(string): An optional GEE asset folder storing cached 3-class maps.'''
+  key = class3_key(RegionName, SsrData, StartD, StopD)
+  if key in _CLASS3_MAPS:
+    return _CLASS3_MAPS[key]
+
+  asset_id = '{}/{}'.format(str(AssetRoot).rstrip('/'), key)
+  if len(str(AssetRoot)) > 0 and eoSM.asset_exists(asset_id):
+    class3_map = ee.Image(asset_id)
+  else:
+    class3_map = season_class3_map(SsrData, Region, StartD, StopD, CS_plus)
+
+  _CLASS3_MAPS[key] = class3_map
+  return class3_map
+
+
+
+
+#############################################################################################################
+# Description: This function exports the 3-class map of a region and the season containing a given time
+#              window to a GEE asset (to be reused by GEE compositing) or to Google Drive (as a GeoTIFF file
+#              to be used by local compositing, see "LocalMosaic.py").
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def export_class3_map(RegionName, Region, SsrData, StartD, StopD, Destination = 'asset', Target = '', CS_plus = False, Projection = 'EPSG:3979', Scale = 30):
+  '''Submits a task exporting a 3-class map, and returns the task (None if it has been cached as an asset).
+
+  Args:
+     RegionName(string): The name of a spatial region (e.g., 'tile42');
+     Region(ee.Geometry): The spatial region;
+     SsrData(dictionary): A given dictionary containing some meta data about a sensor;
+     StartD(string): The start date string of a compositing window;
+     StopD(string): The stop date string of a compositing window;
+     Destination(string): 'asset' or 'drive';
+     Target(string): The GEE asset folder (for 'asset') or the Google Drive folder (for 'drive');
+     CS_plus(Boolean): A flag indicating if to apply CloudScore+ mask;
+     Projection(string): The projection of the exported map;
+     Scale(int): The spatial resolution of the exported map.'''
+  key = class3_key(RegionName, SsrData, StartD, StopD)
+
+  if str(Destination).lower() == 'asset':
+    asset_id = '{}/{}'.format(str(Target).rstrip('/'), key)
+    if eoSM.asset_exists(asset_id):
+      print('\n<export_class3_map> {} has been cached.'.format(asset_id))
+      return None
+
+    class3_map = season_class3_map(SsrData, Region, StartD, StopD, CS_plus).clip(Region)
+    task = ee.batch.Export.image.toAsset(image       = class3_map,
+                                         description = key,
+                                         assetId     = asset_id,
+                                         region      = Region,
+                                         scale       = Scale,
+                                         crs         = Projection,
+                                         maxPixels   = 1e11,
+                                         pyramidingPolicy = {'.default': 'mode'})
+  else:
+    class3_map = get_class3_map(RegionName, Region, SsrData, StartD, StopD, CS_plus).uint8().clip(Region)
+    task = ee.batch.Export.image.toDrive(image          = class3_map,
+                                         description    = key,
+                                         folder         = str(Target),
+                                         fileNamePrefix = key,
+                                         region         = Region,
+                                         scale          = Scale,
+                                         crs            = Projection,
+                                         maxPixels      = 1e11)
+  task.start()
+
+  return task
   
 
 
@@ -195,6 +338,7 @@ def ImgColl_refer_mosaic(masked_ImgColl_target, masked_ImgColl_before, SsrData,
 #                    2025-Mar-25  Lixin Sun  Modified so that this function can also return a 3-class land 
 #                                            cover map: differentiating water, vegetated and non-vegetated
 #                                            surfaces.
+#                    2026-Oct-19             Computed the time windows on client side.
 #############################################################################################################
 def get_refer_mosaic(masked_ImgColl_target, SsrData, Region, Start, Stop, CS_plus, CS_thresh, enhancedRefer, SixBands):
   '''Returns a reference mosaic image and 3-class map to be used in HybridTC. 
@@ -214,13 +358,13 @@ def get_refer_mosaic(masked_ImgColl_target, SsrData, Region, Start, Stop, CS_plu
   #==========================================================================================================
   ImgColl_before = None
   if enhancedRefer:
-    year_target = int(Start.get('year').getInfo())
+    year_target = eoDW.year_of(Start)
     PrevYear = year_target - 1
-    start    = Start.update(PrevYear)
-    stop     = Stop.update(PrevYear)
+    start    = eoDW.update_year(Start, PrevYear)
+    stop     = eoDW.update_year(Stop, PrevYear)
     
     # Prepare an image collection and then apply masks to each image in the collection 
-    ImgColl_before = IS.getCollection(SsrData, Region, start, stop, Img.EXTRA_NONE)
+    ImgColl_before = IS.getCollection(SsrData, Region, start, stop, Img.EXTRA_NONE, AttachCS = CS_plus)
     ImgColl_before = IS.mask_collection(ImgColl_before, PrevYear, SsrData, CS_plus, CS_thresh) 
 
   #==========================================================================================================
@@ -228,7 +372,7 @@ def get_refer_mosaic(masked_ImgColl_target, SsrData, Region, Start, Stop, CS_plu
   #==========================================================================================================  
   MosaicRefers, class3_map = ImgColl_refer_mosaic(masked_ImgColl_target, ImgColl_before, SsrData, SixBands)
   
-  WinSize = IS.time_window_size(Start, Stop).getInfo()  
+  WinSize = eoDW.window_days(Start, Stop)
 
   if WinSize < 1000:
     return MosaicRefers, class3_map
@@ -238,8 +382,8 @@ def get_refer_mosaic(masked_ImgColl_target, SsrData, Region, Start, Stop, CS_plu
     # When a compositing period is longer than one month, the 'refer_mosaic' created above is for whole
     # compositing period. So a monthly referance mosaic needs to be created. 
     #--------------------------------------------------------------------------------------------------------
-    midDate = IS.period_centre(Start, Stop)              # Determine the central date of a time window 
-    month_start, month_stop = IS.time_range(midDate, 31) # Determine the start and stop dates of a month
+    midDate = eoDW.period_centre(Start, Stop)              # Determine the central date of a time window 
+    month_start, month_stop = eoDW.time_range(midDate, 31) # Determine the start and stop dates of a month
   
     month_ImgColl = masked_ImgColl_target.filterDate(month_start, month_stop) # get a subset of image collection
 
@@ -823,8 +967,15 @@ def coll_CS_mosaic(maskedImgColl, SsrData, MidTime):
 #                    2025-Mar-25  Lixin Sun  Modified "get_refer_mosaic" function so that it can 
 #                                            return a classification map containing only 3 classes,
 #                                            water, vegetated and non-vegetated cover types.
+#                    2026-Oct-19             Added an optional scene budget applied before masking.
+#                    2026-Oct-19             Added an optional observation count band.
+#                    2026-Oct-19             Added an optional MODIS reference mosaic for masking.
+#                    2026-Oct-19             Added an optional clear-fraction prefilter before scoring.
+#                    2026-Oct-19             Computed the target year and window size on client side.
+#                    2026-Oct-19             Added an optional (cached) 3-class map.
+#                    2026-Oct-19             Fell back to all the scenes when the prefilter keeps none.
 ######################################################################################################
-def coll_Hybrid_mosaic(inImgColl_target, SsrData, Region, StartD, StopD, ExtraBandCode, CS_plus, CS_thresh, enhenceRefer, ScoreWs):
+def coll_Hybrid_mosaic(inImgColl_target, SsrData, Region, StartD, StopD, ExtraBandCode, CS_plus, CS_thresh, enhenceRefer, ScoreWs, SceneBudget=None, ObsCount=False, ModisRefer=None, Class3Map=None):
   '''Create a composite image based on a given image collection.
   
   Args:   
@@ -837,20 +988,37 @@ def coll_Hybrid_mosaic(inImgColl_target, SsrData, Region, StartD, StopD, ExtraBa
     CS_plus(Boolean): A flag indicating if to apply CloudScore+ mask to image collection;
     CS_thresh(float): A given threshold for CS+ mask generation;
     enhenceRefer(boolean): A flag to indicate if to use an enhenced reference image;
-    ScoreWs(Dictionary): A dictionary containing weighting factors for three scoring components.'''
+    ScoreWs(Dictionary): A dictionary containing weighting factors for three scoring components;
+    SceneBudget(Dictionary): An optional dictionary limiting the number of scenes per path/row or granule
+                             and the minimum clear fraction ('min_clear') of the scenes to be scored;
+    ObsCount(Boolean): A flag indicating if to attach a band with the number of valid observations per pixel;
+    ModisRefer(ee.Image): An optional MODIS reference mosaic for detecting extra cloudy pixels;
+    Class3Map(ee.Image): An optional 3-class map (see "get_class3_map") used in place of the one derived
+                         from the given image collection.'''
   
+  #==================================================================================================
+  # Keep only the best N scenes per path/row or granule before masking and scoring, as required
+  #==================================================================================================  
+  if SceneBudget is not None:
+    inImgColl_target, ranked_ImgColl = IS.budget_collection(inImgColl_target, SsrData, Region, StartD, StopD, SceneBudget)
+
+    if SceneBudget.get('report', False):
+      IS.budget_report(ranked_ImgColl, inImgColl_target)
+
   #==================================================================================================
   # Apply default (OR CloudScore) masks to each image in the image collection
   #==================================================================================================  
-  year_target = int(StartD.get('year').getInfo())
+  year_target = eoDW.year_of(StartD)
   #print('\n<coll_Hybrid_mosaic> targeted year = ', year)
-  masked_ImgColl_target = IS.mask_collection(inImgColl_target, year_target, SsrData, CS_plus, CS_thresh) 
+  masked_ImgColl_target = IS.mask_collection(inImgColl_target, year_target, SsrData, CS_plus, CS_thresh, ModisRefer) 
   #print('<coll_mosaic> Bands in the first masked image:', masked_ImgColl.first().bandNames().getInfo()) 
 
   #==================================================================================================
   # Create a reference mosaic image and a three-class (water, vegetated and non-vegetated) map
   #==================================================================================================  
   MosaicRefers, class3_map = get_refer_mosaic(masked_ImgColl_target, SsrData, Region, StartD, StopD, CS_plus, CS_thresh, enhenceRefer, True)
+  if Class3Map is not None:
+    class3_map = Class3Map   # A seasonal 3-class map shared by the composites within a season
   #print('<coll_mosaic> Bands in refer median image:', MosaicRefers.bandNames().getInfo()) 
   
   #region = MosaicRefers.geometry()
@@ -858,15 +1026,39 @@ def coll_Hybrid_mosaic(inImgColl_target, SsrData, Region, StartD, StopD, ExtraBa
   #==================================================================================================
   # Create a scored image collection (attach a score image for each image in the given collection)
   #==================================================================================================
-  midDate = IS.period_centre(StartD, StopD)        # Determine the central date of a time window 
-  WinSize = ee.Number(ee.Date(StartD).difference(ee.Date(StopD), 'day')).getInfo()
+  midDate = ee.Date(eoDW.period_centre(StartD, StopD))  # Determine the central date of a time window 
+  WinSize = eoDW.day_difference(StartD, StopD)
+
+  # Drop the scenes that are (nearly) fully obscured within the ROI before scoring, as required
+  min_clear = float(SceneBudget.get('min_clear', 0)) if SceneBudget is not None else 0.0
+  if min_clear > 0:
+    kept_ImgColl, annotated_ImgColl = IS.clear_prefilter(masked_ImgColl_target, Region, min_clear)
+    dropped_IDs = annotated_ImgColl.filter(ee.Filter.lt('clear_frac', min_clear)).aggregate_array('system:index')
+
+    if SceneBudget.get('report', False):
+      IS.prefilter_report(annotated_ImgColl, kept_ImgColl)
+
+    # Keep all the scenes when none of them passes the prefilter, so that the mosaic still has bands
+    any_kept              = kept_ImgColl.size().gt(0)
+    dropped_IDs           = ee.List(ee.Algorithms.If(any_kept, dropped_IDs, ee.List([])))
+    masked_ImgColl_target = ee.ImageCollection(ee.Algorithms.If(any_kept, kept_ImgColl, masked_ImgColl_target))
 
   scored_collection = score_collection(masked_ImgColl_target, SsrData, midDate, WinSize, ExtraBandCode, MosaicRefers, ScoreWs, class3_map)
 
   #==================================================================================================
   # Create and return a mosaic based on associated score maps
   #==================================================================================================  
-  return scored_collection.qualityMosaic(Img.pix_score), class3_map #.set('system:time_start', midDate.millis())
+  mosaic = scored_collection.qualityMosaic(Img.pix_score) #.set('system:time_start', midDate.millis())
+
+  if ObsCount == True:
+    # The number of valid (unmasked) observations of each pixel, counted from the same scored collection
+    obs_count = scored_collection.select([Img.pix_score]).count().rename([Img.pix_obs_count]).toUint16()
+    mosaic    = mosaic.addBands(obs_count)
+
+  if min_clear > 0:
+    mosaic = mosaic.set('clear_dropped', dropped_IDs)   # Record the scenes dropped by the prefilter
+
+  return mosaic, class3_map
 
 
 
@@ -916,7 +1108,7 @@ def median_refer_HLS_SR(CollName, inRegion, StartData, StopData, StartYear, Stop
 #                    2023-Sep-07  Lixin Sun  Added the third input parameetr to indicate if SL2P algorithm 
 #                                            will be applied.
 #############################################################################################################
-def LEAF_Mosaic(inSsrData, region, inStart, inStop, SL2P_algo, ScoreWs = None):
+def LEAF_Mosaic(inSsrData, region, inStart, inStop, SL2P_algo, ScoreWs = None, SceneBudget = None):
   '''Creates a mosaic image specially for vegetation parameter extraction with LEAF tool.
      
      Args:
@@ -925,7 +1117,8 @@ def LEAF_Mosaic(inSsrData, region, inStart, inStop, SL2P_algo, ScoreWs = None):
        inStart(string or ee.Date): The start date of a time period;
        inStop(string or ee.Date): The stop date of a time period;
        SL2P_algo(Boolean): a flag indicating if SL2P algorithm will be applied;
-       ScoreWs(Dictionary): A dictionary containing weighting factors fro three scoring components.'''
+       ScoreWs(Dictionary): A dictionary containing weighting factors fro three scoring components;
+       SceneBudget(Dictionary): An optional dictionary limiting the number of scenes per path/row or granule.'''
   
   #==========================================================================================================
   # Create a mosaic image including imaging geometry angles required by vegetation parameter extraction.
@@ -935,9 +1128,9 @@ def LEAF_Mosaic(inSsrData, region, inStart, inStop, SL2P_algo, ScoreWs = None):
   #           for "HomoPeriodMosaic" function should be "False" for now (Feb. 10, 2024) 
   #==========================================================================================================
   ssr_code = inSsrData['SSR_CODE']  
-  year     = ee.Date(inStart).get('year').getInfo()
+  year     = eoDW.year_of(inStart)
 
-  mosaic = HomoPeriodMosaic(inSsrData, region, year, -1, inStart, inStop, Img.EXTRA_ANGLE, False, False, ScoreWs)
+  mosaic = HomoPeriodMosaic(inSsrData, region, year, -1, inStart, inStop, Img.EXTRA_ANGLE, False, False, ScoreWs, SceneBudget)
 
   if (ssr_code < Img.MAX_LS_CODE and SL2P_algo == True) or (ssr_code >= Img.MAX_LS_CODE and ssr_code < Img.MOD_sensor):
     # The value range for applying SL2P algorithm must be within 0 and 1 
@@ -1025,8 +1218,18 @@ def MergeMosaics(MosaicBase, MosaicBkUp, SensorBase, SensorBkUp, ScroeThresh):
 #                                            weighting factors for spectral, temporal and spatial 
 #                                            scores, respectively. 
 #                    2026-May-28  Lixin Sun  Modified to support the use of an enhenced reference
+#                    2026-Oct-19             Added 'SceneBudget(dictionary)' input parameter to keep
+#                                            only the best N scenes per path/row or granule.
+#                    2026-Oct-19             Added 'GapFill(boolean)' input parameter to fill only 
+#                                            the gaps of target year composite with earlier years.
+#                    2026-Oct-19             Added 'ObsCount(boolean)' input parameter.
+#                    2026-Oct-19             Added 'ModisRefer(ee.Image)' input parameter, which is
+#                                            applied to the images of target year only.
+#                    2026-Oct-19             Shifted the time windows between years on client side.
+#                    2026-Oct-19             Added 'Class3Map(ee.Image)' input parameter, which is applied
+#                                            to the images of target year only.
 ###################################################################################################
-def HomoPeriodMosaic(SsrData, Region, TargetY, NbYs, StartD, StopD, ExtraBandCode, CS_plus, enhenceRefer, ScoreWs=None):
+def HomoPeriodMosaic(SsrData, Region, TargetY, NbYs, StartD, StopD, ExtraBandCode, CS_plus, enhenceRefer, ScoreWs=None, SceneBudget=None, GapFill=False, ObsCount=False, ModisRefer=None, Class3Map=None):
   '''Creates a mosaic image for a region using the images acquired during a period of time. 
      
   Args:
@@ -1039,28 +1242,36 @@ def HomoPeriodMosaic(SsrData, Region, TargetY, NbYs, StartD, StopD, ExtraBandCod
       ExtraBandCode(int): An integr representing additional band type to be attached;
       CS_plus(Boolean): A flag indicating if to apply CloudScore+ mask;
       enhenceRefer(boolean): A flag to indicate if to use an enhenced reference image;
-      ScoreWs(Dictionary): A dictionary containing weighting factors for three scoring components.'''  
+      ScoreWs(Dictionary): A dictionary containing weighting factors for three scoring components;
+      SceneBudget(Dictionary): An optional dictionary limiting the number of scenes per path/row or granule;
+      GapFill(Boolean): A flag indicating if to query earlier years only for the gaps of target composite;
+      ObsCount(Boolean): A flag indicating if to attach a band with the number of valid observations per pixel;
+      ModisRefer(ee.Image): An optional MODIS reference mosaic of target year for detecting extra cloudy pixels;
+      Class3Map(ee.Image): An optional 3-class map of target season (see "get_class3_map").'''  
   
   # Cast some input parameters 
   nb_years = int(NbYs)
   ssr_code = SsrData['SSR_CODE'] 
 
+  if GapFill == True and nb_years > 1:
+    return GapFill_PeriodMosaic(SsrData, Region, TargetY, nb_years, StartD, StopD, ExtraBandCode, CS_plus, enhenceRefer, ScoreWs, SceneBudget, ObsCount = ObsCount, ModisRefer = ModisRefer, Class3Map = Class3Map)
+
   #==========================================================================================================
   # Modify 'StartD' and 'StopD' using 'targetY' to create a time window in targeted year
   #==========================================================================================================  
-  start = ee.Date(StartD).update(TargetY)
-  stop  = ee.Date(StopD).update(TargetY)
+  start = eoDW.update_year(StartD, TargetY)
+  stop  = eoDW.update_year(StopD, TargetY)
   
   #==========================================================================================================
   # Obtain an image collection based on the given time window (start and stop) and spatial region (Region)
   #==========================================================================================================
-  ImgColl_target = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode)
+  ImgColl_target = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode, AttachCS = CS_plus)
   #masked_ImgColl_target = IS.mask_collection(ImgColl_target, SsrData, CS_plus)
  
   #==========================================================================================================
   # Create a composite image using HybridTC 
   #==========================================================================================================
-  mosaic_target, class3_map = coll_Hybrid_mosaic(ImgColl_target, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs)  
+  mosaic_target, class3_map = coll_Hybrid_mosaic(ImgColl_target, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs, SceneBudget, ObsCount, ModisRefer, Class3Map)  
   
   #print('bands in mosaic = ', mosaic_target.bandNames().getInfo())
   if nb_years <= 1:
@@ -1070,14 +1281,14 @@ def HomoPeriodMosaic(SsrData, Region, TargetY, NbYs, StartD, StopD, ExtraBandCod
   elif nb_years == 2: 
     # Create a mosaic image for the year before the target
     PrevYear = TargetY - 1
-    start    = start.update(PrevYear)
-    stop     = stop.update(PrevYear)
+    start    = eoDW.update_year(start, PrevYear)
+    stop     = eoDW.update_year(stop, PrevYear)
     
     # Prepare an image collection and then apply masks to each image in the collection 
-    ImgColl_before = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode)
+    ImgColl_before = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode, AttachCS = CS_plus)
     #masked_ImgColl_before = IS.mask_collection(ImgColl_before, SsrData, CS_plus)
 
-    mosaic_before = coll_Hybrid_mosaic(ImgColl_before, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs)
+    mosaic_before = coll_Hybrid_mosaic(ImgColl_before, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs, SceneBudget, ObsCount)
 
     # Merge the two mosaic images into one and return it  
     mosaic = MergeMosaics(mosaic_target, mosaic_before, SsrData, SsrData, 3.0)
@@ -1086,27 +1297,27 @@ def HomoPeriodMosaic(SsrData, Region, TargetY, NbYs, StartD, StopD, ExtraBandCod
   else: 
     # Create mosaic image for the year after the target
     AfterYear = TargetY + 1
-    start     = start.update(AfterYear)
-    stop      = stop.update(AfterYear)   
+    start     = eoDW.update_year(start, AfterYear)
+    stop      = eoDW.update_year(stop, AfterYear)   
     
     # Prepare an image collection and then apply masks to each image in the collection 
-    ImgColl_after        = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode)
+    ImgColl_after        = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode, AttachCS = CS_plus)
     #masked_ImgColl_after = IS.mask_collection(ImgColl_after, SsrData, CS_plus)
 
-    mosaic_after = coll_Hybrid_mosaic(ImgColl_after, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs)
+    mosaic_after = coll_Hybrid_mosaic(ImgColl_after, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs, SceneBudget, ObsCount)
 
     mosaic = MergeMosaics(mosaic_target, mosaic_after, SsrData, SsrData, 3.0)
 
     # Create mosaic image for the year before the target
     PrevYear = TargetY - 1
-    start    = start.update(PrevYear)
-    stop     = stop.update(PrevYear)
+    start    = eoDW.update_year(start, PrevYear)
+    stop     = eoDW.update_year(stop, PrevYear)
     
     # Prepare an image collection and then apply masks to each image in the collection 
-    ImgColl_before        = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode)
+    ImgColl_before        = IS.getCollection(SsrData, Region, start, stop, ExtraBandCode, AttachCS = CS_plus)
     #masked_ImgColl_before = IS.mask_collection(ImgColl_before, SsrData, CS_plus)
 
-    mosaic_before = coll_Hybrid_mosaic(ImgColl_before, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs)
+    mosaic_before = coll_Hybrid_mosaic(ImgColl_before, SsrData, Region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs, SceneBudget, ObsCount)
     
     mosaic = MergeMosaics(mosaic, mosaic_before, SsrData, SsrData, 3.0)
     return mosaic.addBands(ssr_code_img)
@@ -1116,6 +1327,117 @@ def HomoPeriodMosaic(SsrData, Region, TargetY, NbYs, StartD, StopD, ExtraBandCod
 
 
 
+###################################################################################################
+# Description: This function returns the footprint of the gaps (masked pixels) in a given mosaic 
+#              image as a coarse geometry.
+#
+# Note:        The gap mask is vectorized at a coarse scale and then buffered by the same distance,
+#              so that small gaps missed by the coarse sampling are still covered.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+###################################################################################################
+def gap_footprint(Mosaic, Region, Scale = 300):
+  '''Returns the footprint of the gaps in a given mosaic image.
+
+  Args:
+    Mosaic(ee.Image): A given mosaic image containing a 'pix_score' band;
+    Region(ee.Geometry): The spatial polygon of a ROI;
+    Scale(float): The spatial resolution (in metre) used to vectorize the gap mask.'''
+
+  region = ee.Geometry(Region)
+
+  #================================================================================================
+  # Pixels without a valid score in the mosaic are regarded as gaps
+  #================================================================================================
+  valid = ee.Image(Mosaic).select([Img.pix_score]).mask().gt(0)
+  gaps  = valid.Not().selfMask().clip(region).rename(['gap'])
+
+  vectors = gaps.reduceToVectors(geometry = region, scale = Scale, geometryType = 'polygon', 
+                                 eightConnected = True, maxPixels = 1e10, bestEffort = True, tileScale = 4)
+
+  return vectors.geometry(Scale).buffer(Scale, Scale).intersection(region, Scale)
+
+
+
+
+###################################################################################################
+# Description: This function creates a mosaic image for a region in a staged way. The composite for
+#              the target year is created first, and then the images acquired in earlier years are
+#              queried and scored only over the gap footprint of the current composite. 
+#
+# Note:        Compared with compositing whole multi-year collections, most tiles need very little
+#              fill, so the number of scenes to be scored is reduced substantially.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Added 'Class3Map(ee.Image)' input parameter.
+###################################################################################################
+def GapFill_PeriodMosaic(SsrData, Region, TargetY, NbYs, StartD, StopD, ExtraBandCode, CS_plus, enhenceRefer, ScoreWs=None, SceneBudget=None, MinGapRate=0.001, GapScale=300, ObsCount=False, ModisRefer=None, Class3Map=None):
+  '''Creates a mosaic image for a region by filling the gaps of target year composite with earlier years. 
+     
+  Args:
+      SsrData(Dictionary): A Dictionary containing metadata associated with a sensor;
+      Region(ee.Geometry): The spatial polygon of a ROI;
+      TargetY(int): An integer representing a targeted year;
+      NbYs(int): The number of years, including the target year;
+      StartD(ee.Date or string): The start date (e.g., '2020-06-01');
+      StopD(ee.Date or string): The stop date (e.g., '2020-06-30');
+      ExtraBandCode(int): An integr representing additional band type to be attached;
+      CS_plus(Boolean): A flag indicating if to apply CloudScore+ mask;
+      enhenceRefer(boolean): A flag to indicate if to use an enhenced reference image;
+      ScoreWs(Dictionary): A dictionary containing weighting factors for three scoring components;
+      SceneBudget(Dictionary): An optional dictionary limiting the number of scenes per path/row or granule;
+      MinGapRate(float): The gap area rate (relative to ROI) below which no more filling is conducted;
+      GapScale(float): The spatial resolution (in metre) used to vectorize gap mask;
+      ObsCount(Boolean): A flag indicating if to attach a band with the number of valid observations per pixel;
+      ModisRefer(ee.Image): An optional MODIS reference mosaic of target year for detecting extra cloudy pixels;
+      Class3Map(ee.Image): An optional 3-class map of target season (see "get_class3_map").'''  
+  
+  nb_years = int(NbYs)
+  ssr_code = SsrData['SSR_CODE'] 
+  region   = ee.Geometry(Region)
+
+  #==========================================================================================================
+  # Create a composite image for the target year first 
+  #==========================================================================================================  
+  start = eoDW.update_year(StartD, TargetY)
+  stop  = eoDW.update_year(StopD, TargetY)
+  
+  ImgColl_target = IS.getCollection(SsrData, region, start, stop, ExtraBandCode, AttachCS = CS_plus)
+  mosaic, class3_map = coll_Hybrid_mosaic(ImgColl_target, SsrData, region, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs, SceneBudget, ObsCount, ModisRefer, Class3Map)
+
+  #==========================================================================================================
+  # Fill the gaps of current composite with the images acquired in earlier years, one year at a time
+  #==========================================================================================================  
+  region_area = region.area(GapScale)
+
+  for i in range(1, nb_years):
+    gap_geom = gap_footprint(mosaic, region, GapScale)
+    gap_rate = gap_geom.area(GapScale).divide(region_area).getInfo()
+    print('\n<GapFill_PeriodMosaic> Gap rate before filling with year {} = {:.4f}'.format(TargetY - i, gap_rate))
+
+    if gap_rate <= MinGapRate:
+      break
+
+    fill_year = TargetY - i
+    start     = eoDW.update_year(start, fill_year)
+    stop      = eoDW.update_year(stop, fill_year)
+
+    # Query and score only the scenes intersecting with the gap footprint 
+    ImgColl_fill  = IS.getCollection(SsrData, gap_geom, start, stop, ExtraBandCode, AttachCS = CS_plus)
+    mosaic_fill,_ = coll_Hybrid_mosaic(ImgColl_fill, SsrData, gap_geom, start, stop, ExtraBandCode, CS_plus, 0.6, enhenceRefer, ScoreWs, SceneBudget, ObsCount)
+
+    mosaic = MergeMosaics(mosaic, mosaic_fill.clip(gap_geom), SsrData, SsrData, 3.0)
+
+  ssr_code_img = mosaic.select([0]).multiply(0).add(ssr_code).rename([Img.mosaic_ssr_code])
+
+  return mosaic.addBands(ssr_code_img), class3_map
+
+
+
+
+
+
 ###################################################################################################
 # Description: This function returns a primary or secondary landsat sensor code based on a given
 #              year.
@@ -1174,6 +1496,29 @@ def LS_Dict_from_year(Year, Unit, prim_2nd_code):
 
 
 
+###################################################################################################
+# Description: This function returns the Landsat sensor dictionaries that may have acquired images in
+#              a given year, according to the operation periods of Landsat missions.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+###################################################################################################
+LS_MISSION_YEARS = {Img.LS5_sensor: (1984, 2012), Img.LS7_sensor: (1999, 2023), Img.LS8_sensor: (2013, 9999), Img.LS9_sensor: (2021, 9999)}
+
+def LS_candidates(Year, Unit):
+  year     = int(Year)
+  unit_str = '_SR' if int(Unit) > 1 else '_TOA'
+
+  candidates = []
+  for ssr_code, (first, last) in sorted(LS_MISSION_YEARS.items()):
+    ssr_str = 'L' + str(ssr_code) + unit_str
+    if first <= year <= last and ssr_str in Img.SSR_META_DICT:
+      candidates.append(Img.SSR_META_DICT[ssr_str])
+
+  return candidates
+
+
+
 
 ###################################################################################################
 # Description: This function creates a mosaic image for a specified region using all the LANDSAT
@@ -1198,8 +1543,8 @@ def LSMix_PeriodMosaic(SsrData, Region, Year, StartDate, StopDate, ExtraBandCode
   # Determine a proper time period based on a given target year and an initial period 
   #================================================================================================
   year  = int(Year)
-  start = ee.Date(StartDate).update(Year)
-  stop  = ee.Date(StopDate).update(Year)
+  start = eoDW.update_year(StartDate, Year)
+  stop  = eoDW.update_year(StopDate, Year)
   unit  = SsrData['DATA_UNIT']
 
   #================================================================================================
@@ -1317,13 +1662,121 @@ def attach_LSAngleBands(LS_sr_img, LS_toa_img_coll):
 
 
 
+#############################################################################################################
+# Description: This function summarizes the quality of a composite image over a region. All the metrics are
+#              derived from the bands created together with the composite (pix_score, date, ssr_code and
+#              obs_count), so neither a second compositing pass nor a raster download is needed.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def mosaic_quality_metrics(Mosaic, Region, MidDate, Scale = 300):
+  '''Returns an ee.Feature containing the quality metrics of a composite image over a region.
+
+     Args:
+       Mosaic(ee.Image): A composite image containing 'pix_score', 'date' and 'ssr_code' bands;
+       Region(ee.Geometry): the spatial region of interest;
+       MidDate(ee.Date or string): The centre date of the compositing time window;
+       Scale(float): The spatial resolution (in metre) used to compute the metrics.'''
+  mosaic  = ee.Image(Mosaic)
+  region  = ee.Geometry(Region)
+  mid     = ee.Date(MidDate)
+  mid_doy = mid.difference(ee.Date.fromYMD(mid.get('year'), 1, 1), 'day')
+
+  #==========================================================================================================
+  # Prepare per-pixel quality layers 
+  #==========================================================================================================
+  score     = mosaic.select([Img.pix_score])
+  clear     = score.mask().gt(0).unmask(0).rename(['clear'])
+  date_gap  = mosaic.select([Img.pix_date]).subtract(ee.Image.constant(mid_doy)).abs().rename(['date_gap'])
+  obs_count = ee.Image(ee.Algorithms.If(mosaic.bandNames().contains(Img.pix_obs_count), 
+                                        mosaic.select([Img.pix_obs_count]), 
+                                        ee.Image.constant(0).selfMask().rename([Img.pix_obs_count])))
+
+  reduce_params = {'geometry': region, 'scale': Scale, 'maxPixels': 1e10, 'bestEffort': True, 'tileScale': 4}
+
+  #==========================================================================================================
+  # Compute clear pixel fraction, mean date gap, observation count and score distributions in one pass
+  #==========================================================================================================
+  stat_reducer = ee.Reducer.mean().combine(ee.Reducer.percentiles([10, 25, 50, 75, 90]), sharedInputs = True)
+  stats = clear.addBands(date_gap).addBands(obs_count).addBands(score.rename(['score'])) \
+               .reduceRegion(reducer = stat_reducer, **reduce_params)
+  
+  ssr_mix = mosaic.select([Img.mosaic_ssr_code]).reduceRegion(reducer = ee.Reducer.frequencyHistogram(), **reduce_params) \
+                  .get(Img.mosaic_ssr_code)
+  
+  metrics = ee.Dictionary({'clear_fraction':  stats.get('clear_mean'),
+                           'date_gap_mean':   stats.get('date_gap_mean'),
+                           'date_gap_p90':    stats.get('date_gap_p90'),
+                           'obs_count_mean':  stats.get(Img.pix_obs_count + '_mean'),
+                           'obs_count_p10':   stats.get(Img.pix_obs_count + '_p10'),
+                           'obs_count_p50':   stats.get(Img.pix_obs_count + '_p50'),
+                           'score_mean':      stats.get('score_mean'),
+                           'score_p10':       stats.get('score_p10'),
+                           'score_p25':       stats.get('score_p25'),
+                           'score_p50':       stats.get('score_p50'),
+                           'score_p75':       stats.get('score_p75'),
+                           'score_p90':       stats.get('score_p90'),
+                           'sensor_mix':      ee.Algorithms.If(ssr_mix, ee.Dictionary(ssr_mix), ee.Dictionary({}))})
+
+  return ee.Feature(None, metrics)
+
+
+
+
+#############################################################################################################
+# Description: This function exports the quality metrics of a composite image as a small CSV table to the 
+#              same location (either Google Drive or Google Cloud Storage) as the composite itself.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def export_quality_metrics(exe_Params, Metrics, SsrData, task_list):
+  '''Exports the quality metrics of a composite image as a CSV table.
+
+     Args:
+       exe_Params(dictionary): a dictionary storing other required running parameters;
+       Metrics(ee.Feature): A feature containing the quality metrics of a composite image;
+       SsrData(Dictionary): A dictionary containing all info on a sensor type;
+       task_list([]): a list storing the links to exporting tasks.'''
+  year_str     = str(exe_Params['year'])     
+  given_folder = str(exe_Params['out_folder'])
+  out_location = str(exe_Params['out_location']).lower()
+  region_str   = str(exe_Params['current_region'])
+  period_str   = str(exe_Params['time_str'])
+
+  exportFolder = region_str + '_' + year_str if len(given_folder) < 2 else given_folder  
+  filename     = region_str + '_' + period_str + '_' + SsrData['NAME'] + '_quality'
+
+  metrics = ee.Feature(Metrics).set({'region': region_str, 'time_str': period_str, 'sensor': SsrData['NAME']})
+  export_dict = {'collection': ee.FeatureCollection([metrics]),
+                 'description': filename,
+                 'fileFormat': 'CSV'}
+
+  if out_location.find('drive') > -1:
+    print('<export_quality_metrics> Exporting quality metrics to Google Drive......')
+    export_dict['folder']         = exportFolder
+    export_dict['fileNamePrefix'] = filename
+    task_list.append(Img.start_task(ee.batch.Export.table.toDrive(**export_dict)))
+
+  elif out_location.find('storage') > -1:
+    print('<export_quality_metrics> Exporting quality metrics to Google Cloud Storage......')
+    export_dict['bucket']         = str(exe_Params['bucket'])
+    export_dict['fileNamePrefix'] = exportFolder + '/' + filename
+    task_list.append(Img.start_task(ee.batch.Export.table.toCloudStorage(**export_dict)))
+
+
+
+
 #############################################################################################################
 # Description: This function exports a given mosaic image to a specified location (either Google Drive or
 #              Google Cloud Storage). The filenames of the exported images will be automatically generated 
 #              based on tile name, image acquisition time and spatial resolution.
 #
 # Revision history:  2022-Mar-30  Lixin Sun  Initial creation 
-#
+#                    2026-Oct-19             Fanned out the export into subtile tasks as required, and saved
+#                                            a manifest of the pieces.
+#                    2026-Oct-19             Added Cloud Optimized GeoTIFF option.
 #############################################################################################################
 def export_mosaic(exe_Params, mosaic, SsrData, Region, for_LEAF, task_list):
   '''Exports one set of LEAF products to either Google Drive or Google Cloud Storage
@@ -1372,60 +1825,78 @@ def export_mosaic(exe_Params, mosaic, SsrData, Region, for_LEAF, task_list):
                  'maxPixels': 1e11,
                  'region': ee.Geometry(Region)}
   
+  Img.set_export_format(exe_Params, export_dict)
+
   # Determine the bands to be exported according to specified spatial resolution 
   out_band_names = SsrData['OUT_BANDS'] if Scale >=20 else SsrData['10M_BANDS']
   extra_bands = ['cosVZA', 'cosSZA', 'cosRAA', 'pix_score', 'date', 'ssr_code']
   if all(item in bands_in_mosaic for item in extra_bands):
     out_band_names = out_band_names + extra_bands
 
-  if out_location.find('drive') > -1:  # Export to Google Drive
-    print('<export_mosaic> Exporting to Google Drive......')
-    export_dict['folder'] = exportFolder
-    
-    if out_style.find('comp') > -1:      
-      filename  = filePrefix + '_' + str(Scale) + 'm'
-      export_dict['image']          = mosaic.select(out_band_names).multiply(ee.Image(value_scaler)).uint16()
-      export_dict['description']    = filename
-      export_dict['fileNamePrefix'] = filename
+  #==========================================================================================================
+  # Submit exporting tasks for each piece (the whole region or one of its subtiles)
+  #==========================================================================================================
+  pieces = []
+  for piece_name, piece_region in Img.get_export_pieces(exe_Params, Region):
+    piece_prefix = Img.get_piece_filename(exe_Params, filePrefix, piece_name)
+    export_dict['region'] = piece_region
+
+    if out_location.find('drive') > -1:  # Export to Google Drive
+      print('<export_mosaic> Exporting to Google Drive......')
+      export_dict['folder'] = exportFolder
+      
+      if out_style.find('comp') > -1:      
+        filename  = piece_prefix + '_' + str(Scale) + 'm'
+        export_dict['image']          = mosaic.select(out_band_names).multiply(ee.Image(value_scaler)).uint16()
+        export_dict['description']    = filename
+        export_dict['fileNamePrefix'] = filename
+
+        task_list.append(Img.start_task(ee.batch.Export.image.toDrive(**export_dict)))
+        pieces.append({'name': piece_name, 'description': filename, 'file_prefix': filename})
 
-      task_list.append(ee.batch.Export.image.toDrive(**export_dict).start())
+      else: 
+        for band in out_band_names:
+          filename  = piece_prefix + '_' + band + '_' + str(Scale) + 'm'
+          
+          export_dict['image']          = mosaic.select(band).multiply(ee.Image(value_scaler)).uint16()
+          export_dict['description']    = filename
+          export_dict['fileNamePrefix'] = filename
 
-    else: 
+          task_list.append(Img.start_task(ee.batch.Export.image.toDrive(**export_dict)))
+          pieces.append({'name': piece_name, 'band': band, 'description': filename, 'file_prefix': filename})
+      
+    elif out_location.find('storage') > -1:  # Exporting to Google Cloud Storage
+      print('<export_mosaic> Exporting to Google Cloud Storage......')  
+      export_dict['bucket'] = str(exe_Params['bucket'])    
       for band in out_band_names:
-        filename  = filePrefix + '_' + band + '_' + str(Scale) + 'm'
+        filename  = piece_prefix + '_' + band + '_' + str(Scale) + 'm'
         
         export_dict['image']          = mosaic.select(band).multiply(ee.Image(value_scaler)).uint16()
         export_dict['description']    = filename
         export_dict['fileNamePrefix'] = filename
 
-        task_list.append(ee.batch.Export.image.toDrive(**export_dict).start())
-    
-  elif out_location.find('storage') > -1:  # Exporting to Google Cloud Storage
-    print('<export_mosaic> Exporting to Google Cloud Storage......')  
-    export_dict['bucket'] = str(exe_Params['bucket'])    
-    for band in out_band_names:
-      filename  = filePrefix + '_' + band + '_' + str(Scale) + 'm'
-      
-      export_dict['image']          = mosaic.select(band).multiply(ee.Image(value_scaler)).uint16()
-      export_dict['description']    = filename
-      export_dict['fileNamePrefix'] = filename
+        task_list.append(Img.start_task(ee.batch.Export.image.toCloudStorage(**export_dict)))
+        pieces.append({'name': piece_name, 'band': band, 'description': filename, 'file_prefix': filename})
 
-      task_list.append(ee.batch.Export.image.toCloudStorage(**export_dict).start())
+  #==========================================================================================================
+  # Save a manifest for reassembling the pieces when the export was fanned out into subtiles
+  #==========================================================================================================
+  Img.write_export_manifest(exe_Params, SsrData['NAME'] + '_mosaic', exportFolder, pieces)
 
     
 
 
 
-
 ###################################################################################################
 # Description: This function creates a mosaic image within a defined region by using all accessible
 #              images acquired over a specified timeframe from the Landsat series and Sentinel-2 
 #              A/B satellites.
 #
 # Revision history:  2023-Jun-06  Lixin Sun  Initial creation
-#
+#                    2026-Oct-19             Selected the Landsat sensor and skipped the sensors that cannot
+#                                            contribute based on actual scene availability.
 ###################################################################################################
-def HLS_PeriodMosaic(DataUnit, Region, targetY, NbYs, StartD, StopD, ExtraBandCode, ScoreWs = None):
+def HLS_PeriodMosaic(DataUnit, Region, targetY, NbYs, StartD, StopD, ExtraBandCode, ScoreWs = None, Conn = None):
   '''Creates a mosaic image for a region using the images acquired during a period of time. 
      
   Args:
@@ -1436,7 +1907,8 @@ def HLS_PeriodMosaic(DataUnit, Region, targetY, NbYs, StartD, StopD, ExtraBandCo
       StartD(ee.Date or string): The start date string (e.g., '2020-06-01') or ee.Date object;
       StopD(ee.Date or string): The end date string (e.g., '2020-06-30') or ee.Date object;
       ExtraBandCode(int): A integer code representing band type to be attached additionaly;
-      ScoreWs(Dictionary): A dictionary containing weighting factors for three scoreing components.'''
+      ScoreWs(Dictionary): A dictionary containing weighting factors for three scoreing components;
+      Conn(sqlite3.Connection): An optional local scene catalog for checking scene availability.'''
   
   #================================================================================================
   # Determine a proper time period based on a given target year and an initial period 
@@ -1444,30 +1916,45 @@ def HLS_PeriodMosaic(DataUnit, Region, targetY, NbYs, StartD, StopD, ExtraBandCo
   year  = int(targetY)
   years = int(NbYs)
   unit  = int(DataUnit)
-  start = ee.Date(StartD).update(year)
-  stop  = ee.Date(StopD).update(year)
+  start = eoDW.update_year(StartD, year)
+  stop  = eoDW.update_year(StopD, year)
 
   #================================================================================================
-  # Create a mosaic image using available Sentinel-2 images
+  # Select the sensors that can contribute, so that empty or nearly empty collections are skipped
+  # before any masking or scoring 
   #================================================================================================
-  print('\n\n<<<<<<<<<<<<<<<<<< start to generate mosaic with S2 images...........\n')
   S2_type_str = 'S2_SR' if unit > 1 else 'S2_TOA'
   S2_ssrData  = Img.SSR_META_DICT[S2_type_str]
-  s2_mosaic   = HomoPeriodMosaic(S2_ssrData, Region, year, years, start, stop, ExtraBandCode, False, False, ScoreWs)
+  candidates  = ([S2_ssrData] if year >= 2015 else []) + LS_candidates(year, unit)
+  selected    = IS.select_sensors(candidates, Region, start, stop, Conn = Conn)   # One availability request
+  S2_usable   = S2_ssrData in selected
+  LS_ssrDatas = [ssr_data for ssr_data in selected if ssr_data['SSR_CODE'] < Img.MAX_LS_CODE]
+
+  if not S2_usable and len(LS_ssrDatas) < 1:
+    print('\n<HLS_PeriodMosaic> No sensor can contribute to the composite!')
+    return None
 
   #================================================================================================
-  # Create a mosaic image using available Landsat series images
+  # Create a mosaic image using available Sentinel-2 images
   #================================================================================================
-  print('\n<<<<<<<<<<<<<<<<<< start to generate mosaic with LS images...........\n')
-  L8_type_str = 'L8_SR' if unit > 1 else 'L8_TOA'
-  L8_ssrData  = Img.SSR_META_DICT[L8_type_str]  
-  ls_mosaic   = HomoPeriodMosaic(L8_ssrData, Region, year, years, start, stop, ExtraBandCode, False, False, ScoreWs)
+  if S2_usable:
+    print('\n\n<<<<<<<<<<<<<<<<<< start to generate mosaic with S2 images...........\n')
+    s2_mosaic = HomoPeriodMosaic(S2_ssrData, Region, year, years, start, stop, ExtraBandCode, False, False, ScoreWs)
+    s2_mosaic = Img.apply_gain_offset(ee.Image(s2_mosaic[0] if isinstance(s2_mosaic, tuple) else s2_mosaic), S2_ssrData, 100, 10)
 
   #================================================================================================
-  # Apply gain and offset to convert data to the same unit and use Sentinel-2 data as base mosaic 
+  # Create a mosaic image using the Landsat sensor with the most expected clear observations
   #================================================================================================
-  s2_mosaic = Img.apply_gain_offset(s2_mosaic, S2_ssrData, 100, 10)
-  ls_mosaic = Img.apply_gain_offset(ls_mosaic, L8_ssrData, 100, 10)
+  if len(LS_ssrDatas) > 0:
+    print('\n<<<<<<<<<<<<<<<<<< start to generate mosaic with LS images...........\n')
+    L8_ssrData = LS_ssrDatas[0]
+    ls_mosaic  = HomoPeriodMosaic(L8_ssrData, Region, year, years, start, stop, ExtraBandCode, False, False, ScoreWs)
+    ls_mosaic  = Img.apply_gain_offset(ee.Image(ls_mosaic[0] if isinstance(ls_mosaic, tuple) else ls_mosaic), L8_ssrData, 100, 10)
+
+  if not S2_usable:
+    return ls_mosaic
+  elif len(LS_ssrDatas) < 1:
+    return s2_mosaic
     
   #return s2_mosaic, ls_mosaic
   #================================================================================================
@@ -1510,6 +1997,8 @@ def Mosaic_production(inParams, MixSensor):
   if params == None:
     print('\n<Mosaic_production> Failed to generate input parameters for compositing!')
     return task_list
+
+  IS.clear_collection_cache()   # The collections are shared within one job only
   
   #==========================================================================================================
   # get some required parameters
@@ -1526,6 +2015,21 @@ def Mosaic_production(inParams, MixSensor):
   region_names = params['regions'].keys()
   nTimes       = len(params['start_dates'])
   scoreWs      = params['score_weights'] if 'score_weights' in params else {'spectral': 1.0, 'temporal': 0.4, 'spatial': 0.9}
+  budget       = params['scene_budget']  if 'scene_budget'  in params else None
+  gap_fill     = params['gap_fill']      if 'gap_fill'      in params else False
+  quality      = params['quality_metrics'] if 'quality_metrics' in params else False
+  skip_same    = params['skip_unchanged']  if 'skip_unchanged'  in params else False
+  adapt_win    = params['adaptive_window'] if 'adaptive_window' in params else None
+  modis_refer  = params['modis_refer']     if 'modis_refer'     in params else False
+  modis_root   = params['modis_asset_root'] if 'modis_asset_root' in params else ''
+  class3_cache = params['class3_cache']     if 'class3_cache'     in params else False
+  class3_root  = params['class3_asset_root'] if 'class3_asset_root' in params else ''
+  min_clear    = params['min_clear_obs']    if 'min_clear_obs'    in params else 0
+  catalog_file = params['catalog_file']     if 'catalog_file'     in params else ''
+  catalog      = eoCat.open_catalog(catalog_file) if len(catalog_file) > 0 else None
+
+  # Load the registry of the fingerprints of previously produced units, as required
+  registry = eoFP.refresh_registry(eoFP.load_registry(params)) if skip_same else {}
   
 
   # Produce mosaic images for each spatial region
@@ -1541,14 +2045,51 @@ def Mosaic_production(inParams, MixSensor):
       params = eoPM.set_current_time(params, TIndex)      
       start, stop = eoPM.get_time_window(params, False)
 
+      # Shrink or grow the time window to reach a target number of clear observations, as required
+      if adapt_win != None:
+        start, stop, _ = IS.adaptive_time_window(ssr_data, region, start, stop, adapt_win)
+
+      # Skip the unit if the sensor cannot contribute (too few scenes or clear observations) 
+      if min_clear > 0 and len(IS.select_sensors([ssr_data], region, start, stop, 1, min_clear, catalog)) < 1:
+        print('\n<Mosaic_production> Skip {}th time period of {} region since {} is not available.'.format(TIndex+1, reg_name, ssr_data['NAME']))
+        continue
+
+      # Skip the unit if none of its inputs has changed since a previous successful run
+      if skip_same:
+        unit_key  = eoFP.unit_key(params, 'mosaic')
+        scene_IDs = eoFP.unit_scene_IDs(ssr_data, region, eoFP.unit_years(year, nYears, gap_fill), start, stop)
+        unit_fp   = eoFP.unit_fingerprint(params, scene_IDs, 'mosaic')
+        if eoFP.is_unchanged(registry, unit_key, unit_fp):
+          print('\n<Mosaic_production> Skip {} since its inputs have not changed.'.format(unit_key))
+          continue
+
+        submit_time = eoFP.utc_now()
+        nb_tasks    = len(task_list)
+
       # Produce and export mosaic images for a time period and a region
       print('\n<Mosaic_production> Generate and export composite images for {}th time period and {} region......'.format(TIndex+1, reg_name))        
-      mosaic = HomoPeriodMosaic(ssr_data, region, year, nYears, start, stop, extra_bands, cloud_score, False, scoreWs)      
+      # The MODIS reference mosaic of a region and a period is shared by all the sensors and windows
+      refer  = eoMR.get_MODIS_refer(reg_name, region, start, stop, modis_root) if modis_refer else None
+      # The 3-class map of a region and a season is shared by all the windows within the season
+      class3 = get_class3_map(reg_name, region, ssr_data, start, stop, cloud_score, class3_root) if class3_cache else None
+      mosaic = HomoPeriodMosaic(ssr_data, region, year, nYears, start, stop, extra_bands, cloud_score, False, scoreWs, budget, gap_fill, quality, refer, class3)      
+      if isinstance(mosaic, tuple):
+        mosaic = mosaic[0]   # Single-year and gap-fill mosaics are returned together with a 3-class map
+
       mosaic = Img.apply_gain_offset(mosaic, ssr_data, 100, 10)
       #mosaic = LEAF_Mosaic(ssr_data, region, start, stop, True)
 
       # Export spectral mosaic images
       export_mosaic(params, mosaic, ssr_data, region, False, task_list)
+
+      # Export the quality metrics of the mosaic as a small table, as required
+      if quality == True:
+        metrics = mosaic_quality_metrics(mosaic, region, IS.period_centre(start, stop))
+        export_quality_metrics(params, metrics, ssr_data, task_list)
+
+      if skip_same:
+        eoFP.record_unit(registry, unit_key, unit_fp, params, submit_time, 'mosaic', task_list[nb_tasks:])
+        eoFP.save_registry(params, registry)
     
   return task_list
 
@@ -1572,6 +2113,8 @@ def count_scenes(inParams, start_year, end_year):
   if params == None:
     print('\n<Mosaic_production> Failed to generate input parameters for compositing!')
     return task_list
+
+  IS.clear_collection_cache()   # The collections are shared within one job only
   
   #==========================================================================================================
   # get some required parameters
@@ -1660,7 +2203,7 @@ def MixMosaic_production(exe_Param_dict, ExtraBandCode):
     
     for month in exe_Param_dict['months']:
       fun_Param_dict['month'] = month
-      start, stop = IS.month_range(year, month)
+      start, stop = eoDW.month_range(year, month)
       mosaic = FullMix_PeriodMosaic(2, region, year, nYears, StartD, StopD, ExtraBandCode)
       export_mosaic(fun_Param_dict, mosaic, ssr_data, region, False, task_list)
       
@@ -0,0 +1,313 @@
+#############################################################################################################
+# Description: This module contains the functions for a local SQLite catalog of scene metadata (scene IDs,
+#              acquisition times, cloud percentages, imaging angles and footprints), so that planning, scene
+#              counting and scene selection can be conducted offline.
+#
+# Note:        (1) This module does not depend on GEE. The catalog is filled with "ImgSet.ingest_catalog"
+#                  function, which is paginated and resumable;
+#              (2) The bounding boxes of scene footprints are indexed with an SQLite R*Tree table, and the
+#                  acquisition times are indexed with a regular B-tree index;
+#              (3) The angle columns store the values of the properties named by 'SZA', 'SAA', 'VZA' and
+#                  'VAA' keys of a sensor dictionary (e.g., 'SUN_ELEVATION' for Landsat) without conversion.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+
+
+SCHEMA = ['''CREATE TABLE IF NOT EXISTS scenes (
+               id          INTEGER PRIMARY KEY,
+               coll_name   TEXT NOT NULL,
+               scene_id    TEXT NOT NULL,
+               millis      INTEGER NOT NULL,
+               cloud       REAL,
+               sza         REAL,
+               saa         REAL,
+               vza         REAL,
+               vaa         REAL,
+               asset_size  INTEGER,
+               grid_key    TEXT,
+               footprint   TEXT,
+               UNIQUE (coll_name, scene_id))''',
+          'CREATE INDEX IF NOT EXISTS scenes_time ON scenes (coll_name, millis)',
+          'CREATE VIRTUAL TABLE IF NOT EXISTS scenes_bbox USING rtree (id, min_x, max_x, min_y, max_y)',
+          '''CREATE TABLE IF NOT EXISTS ingest_jobs (
+               job_key     TEXT PRIMARY KEY,
+               total       INTEGER,
+               next_offset INTEGER,
+               updated     TEXT)''']
+
+SCENE_COLUMNS = ['coll_name', 'scene_id', 'millis', 'cloud', 'sza', 'saa', 'vza', 'vaa', 'asset_size', 'grid_key', 'footprint']
+
+
+
+
+#############################################################################################################
+# Description: This function opens (and creates if necessary) a local scene catalog.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def open_catalog(FilePath):
+  conn = sqlite3.connect(FilePath)
+  conn.row_factory = sqlite3.Row
+  for statement in SCHEMA:
+    conn.execute(statement)
+
+  conn.commit()
+  return conn
+
+
+
+
+#############################################################################################################
+# Description: These functions compute the bounding box of a GeoJSON polygon (or multi-polygon) and test if
+#              two polygons intersect.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def geojson_rings(Geometry):
+  '''Returns the outer rings of a GeoJSON Polygon or MultiPolygon as lists of (x, y) tuples.'''
+  geom_type = Geometry['type']
+  coords    = Geometry['coordinates']
+
+  if geom_type == 'Polygon':
+    return [[tuple(pt[:2]) for pt in coords[0]]]
+  elif geom_type == 'MultiPolygon':
+    return [[tuple(pt[:2]) for pt in poly[0]] for poly in coords]
+  elif geom_type == 'GeometryCollection':
+    return [ring for geom in Geometry['geometries'] for ring in geojson_rings(geom)]
+  else:
+    return []
+
+
+
+def rings_bbox(Rings):
+  xs = [pt[0] for ring in Rings for pt in ring]
+  ys = [pt[1] for ring in Rings for pt in ring]
+
+  return min(xs), max(xs), min(ys), max(ys)
+
+
+
+def point_in_ring(Point, Ring):
+  x, y   = Point
+  inside = False
+  for (x1, y1), (x2, y2) in zip(Ring, Ring[1:] + Ring[:1]):
+    if (y1 > y) != (y2 > y) and x < (x2 - x1)*(y - y1)/(y2 - y1) + x1:
+      inside = not inside
+
+  return inside
+
+
+
+def segments_cross(A1, A2, B1, B2):
+  def orient(p, q, r):
+    return (q[0] - p[0])*(r[1] - p[1]) - (q[1] - p[1])*(r[0] - p[0])
+
+  d1, d2 = orient(B1, B2, A1), orient(B1, B2, A2)
+  d3, d4 = orient(A1, A2, B1), orient(A1, A2, B2)
+
+  return ((d1 > 0) != (d2 > 0)) and ((d3 > 0) != (d4 > 0))
+
+
+
+def rings_intersect(RingsA, RingsB):
+  for ring_a in RingsA:
+    for ring_b in RingsB:
+      if point_in_ring(ring_a[0], ring_b) or point_in_ring(ring_b[0], ring_a):
+        return True
+
+      edges_b = list(zip(ring_b, ring_b[1:] + ring_b[:1]))
+      for a1, a2 in zip(ring_a, ring_a[1:] + ring_a[:1]):
+        if any(segments_cross(a1, a2, b1, b2) for b1, b2 in edges_b):
+          return True
+
+  return False
+
+
+
+
+#############################################################################################################
+# Description: This function inserts (or updates) a list of scene records into a catalog.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def insert_scenes(Conn, Records):
+  '''Inserts scene records into a catalog and returns the number of inserted records.
+
+     Args:
+       Conn(sqlite3.Connection): An opened catalog;
+       Records(list): A list of dictionaries with the keys in 'SCENE_COLUMNS', where 'footprint' is a GeoJSON
+                      geometry dictionary.'''
+  count = 0
+  for record in Records:
+    values = [record.get(col) for col in SCENE_COLUMNS]
+    values[-1] = json.dumps(record['footprint']) if record.get('footprint') else None
+
+    cursor = Conn.execute('INSERT INTO scenes ({}) VALUES ({}) ON CONFLICT (coll_name, scene_id) DO UPDATE SET {}'.format(
+                          ', '.join(SCENE_COLUMNS), ', '.join(['?']*len(SCENE_COLUMNS)),
+                          ', '.join('{0} = excluded.{0}'.format(col) for col in SCENE_COLUMNS[2:])), values)
+    row_id = Conn.execute('SELECT id FROM scenes WHERE coll_name = ? AND scene_id = ?', (record['coll_name'], record['scene_id'])).fetchone()[0]
+
+    rings = geojson_rings(record['footprint']) if record.get('footprint') else []
+    if len(rings) > 0:
+      Conn.execute('INSERT OR REPLACE INTO scenes_bbox VALUES (?, ?, ?, ?, ?)', (row_id,) + rings_bbox(rings))
+    count += cursor.rowcount
+
+  return count
+
+
+
+
+#############################################################################################################
+# Description: These functions record and look up the progress of a paginated ingestion job, so that an
+#              interrupted ingestion can be resumed from the last committed page.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def get_job(Conn, JobKey):
+  row = Conn.execute('SELECT total, next_offset FROM ingest_jobs WHERE job_key = ?', (JobKey,)).fetchone()
+
+  return (row['total'], row['next_offset']) if row else (None, 0)
+
+
+
+def set_job(Conn, JobKey, Total, NextOffset):
+  updated = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+  Conn.execute('INSERT OR REPLACE INTO ingest_jobs VALUES (?, ?, ?, ?)', (JobKey, int(Total), int(NextOffset), updated))
+
+
+
+
+#############################################################################################################
+# Description: This function returns the UTC milliseconds of a date string ('YYYY-MM-DD').
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def date_millis(DateStr):
+  date = datetime.strptime(str(DateStr)[:10], '%Y-%m-%d').replace(tzinfo = timezone.utc)
+
+  return int(date.timestamp()*1000)
+
+
+
+
+#############################################################################################################
+# Description: This function returns the default cloud coverage rate used by "ImgSet.getCollection" function,
+#              with the same rules as "Image.get_cloud_rate" function.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def default_cloud_rate(SsrCode, Latitude):
+  if int(SsrCode) > 20:                  # The same as 'MAX_LS_CODE' in Image.py
+    return 80 if Latitude < 55 else 65
+  else:
+    return 90
+
+
+
+
+#############################################################################################################
+# Description: This function queries the scenes in a catalog with the same filters as "ImgSet.getCollection"
+#              function (collection names, region, time window and cloud coverage rate).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def query_scenes(Conn, CollNames, Region, StartDate, EndDate, CloudRate = -100, SsrCode = 21):
+  '''Returns a list of scene records (dictionaries) sorted by acquisition time.
+
+     Args:
+       Conn(sqlite3.Connection): An opened catalog;
+       CollNames(list): The GEE names of the image collections (e.g., ['COPERNICUS/S2_SR_HARMONIZED']);
+       Region(dictionary): A GeoJSON Polygon or MultiPolygon geometry of ROI;
+       StartDate(string): The start date string ('YYYY-MM-DD', inclusive);
+       EndDate(string): The end date string ('YYYY-MM-DD', exclusive);
+       CloudRate(float): A cloud coverage rate (the default rate of the sensor if out of 0 to 99.99);
+       SsrCode(int): The sensor code used to determine the default cloud coverage rate.'''
+  rings = geojson_rings(Region)
+  min_x, max_x, min_y, max_y = rings_bbox(rings)
+
+  if CloudRate < 0 or CloudRate > 99.99:
+    CloudRate = default_cloud_rate(SsrCode, (min_y + max_y)/2.0)
+
+  #==========================================================================================================
+  # Filter with the spatial (R*Tree) and temporal indices first, then test footprints exactly
+  #==========================================================================================================
+  sql = '''SELECT s.* FROM scenes s JOIN scenes_bbox b ON s.id = b.id
+           WHERE b.max_x >= ? AND b.min_x <= ? AND b.max_y >= ? AND b.min_y <= ?
+             AND s.coll_name IN ({}) AND s.millis >= ? AND s.millis < ? AND (s.cloud IS NULL OR s.cloud < ?)
+           ORDER BY s.millis'''.format(', '.join(['?']*len(CollNames)))
+  params = [min_x, max_x, min_y, max_y] + list(CollNames) + [date_millis(StartDate), date_millis(EndDate), float(CloudRate)]
+
+  scenes = []
+  for row in Conn.execute(sql, params):
+    record = dict(row)
+    record['footprint'] = json.loads(record['footprint']) if record['footprint'] else None
+    if record['footprint'] is None or rings_intersect(geojson_rings(record['footprint']), rings):
+      scenes.append(record)
+
+  return scenes
+
+
+
+
+#############################################################################################################
+# Description: This function counts the scenes returned by "query_scenes" function per path/row or granule.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def count_by_grid(Scenes):
+  counts = {}
+  for scene in Scenes:
+    counts[scene['grid_key']] = counts.get(scene['grid_key'], 0) + 1
+
+  return counts
+
+
+
+
+#############################################################################################################
+# Description: This function summarizes the availability of the scenes returned by "query_scenes" function,
+#              as the number of scenes and the expected number of clear observations (the sum of the clear
+#              fractions of the scenes, where a scene without cloud coverage is regarded as fully clear).
+#
+# Note:        The clear fractions of Landsat 7 scenes acquired after the failure of its Scan Line Corrector
+#              (SLC) are scaled by the fraction of valid pixels in SLC-off scenes ('SLC_OFF_VALID').
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Penalized Landsat 7 SLC-off scenes
+#
+#############################################################################################################
+LS7_SSR_CODE  = 7                 # The same as 'LS7_sensor' in Image.py
+SLC_OFF_DATE  = '2003-05-31'
+SLC_OFF_VALID = 0.78              # The approximate fraction of valid pixels in an SLC-off scene
+
+def valid_fraction(SsrCode, Millis):
+  if SsrCode != None and int(SsrCode) == LS7_SSR_CODE and int(Millis) >= date_millis(SLC_OFF_DATE):
+    return SLC_OFF_VALID
+  else:
+    return 1.0
+
+
+
+def coverage_stats(Scenes, SsrCode = None):
+  '''Returns the number of scenes and the expected number of clear observations.
+
+     Args:
+       Scenes(list): A list of scene records returned by "query_scenes" function;
+       SsrCode(int): The sensor code of the scenes (used to penalize Landsat 7 SLC-off scenes).'''
+  clear_obs = sum((1.0 - min(max(float(scene['cloud'] or 0.0), 0.0), 100.0)/100.0)*valid_fraction(SsrCode, scene['millis']) for scene in Scenes)
+
+  return len(Scenes), clear_obs
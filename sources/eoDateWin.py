@@ -0,0 +1,207 @@
+#############################################################################################################
+# Description: This module contains the functions for computing the boundaries, centres and sizes of
+#              compositing time windows on client side, so that no "ee.Date" object needs to be created
+#              (and no "getInfo" call needs to be made) before filtering an image collection.
+#
+# Note:        (1) This module does not depend on GEE. All the dates are in UTC, the same as "ee.Date";
+#              (2) The dates returned by the functions in this module are strings ('YYYY-MM-DD', or
+#                  'YYYY-MM-DDTHH:MM:SS' when a time of day is involved), which can be directly passed to
+#                  "ee.Date" or "ee.ImageCollection.filterDate" at the filter boundary;
+#              (3) The given dates can be strings (e.g., '2020-7-1' or '2020-07-01T12:00:00'), "datetime"
+#                  or "date" objects. An "ee.Date" object is also accepted, but it costs a "getInfo" call.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+import calendar
+from datetime import date, datetime, timedelta
+
+
+
+MILLIS_PER_DAY = 86400000
+
+
+
+
+#############################################################################################################
+# Description: This function converts a given date into a "datetime" object.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def to_datetime(Date):
+  '''Returns a "datetime" object of a given date.
+
+     Args:
+       Date(string, datetime, date or ee.Date): A given date.'''
+  if isinstance(Date, datetime):
+    return Date.replace(tzinfo = None)
+  elif isinstance(Date, date):
+    return datetime(Date.year, Date.month, Date.day)
+  elif hasattr(Date, 'getInfo'):
+    Date = Date.format('YYYY-MM-dd\'T\'HH:mm:ss').getInfo()   # An "ee.Date" object (a blocking call)
+
+  date_str, _, time_str = str(Date).strip().replace(' ', 'T').partition('T')
+  year, month, day      = [int(item) for item in date_str.split('-')[:3]]
+  hms = [int(float(item)) for item in time_str.rstrip('Z').split(':') if len(item) > 0][:3] if len(time_str) > 0 else []
+
+  return datetime(year, month, day, *hms)
+
+
+
+def date_str(Date):
+  '''Returns the string ('YYYY-MM-DD' or 'YYYY-MM-DDTHH:MM:SS') of a given date.'''
+  moment = to_datetime(Date)
+
+  if moment.hour == 0 and moment.minute == 0 and moment.second == 0:
+    return moment.strftime('%Y-%m-%d')
+  else:
+    return moment.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+
+def is_client_date(Date):
+  return not hasattr(Date, 'getInfo')
+
+
+
+def year_of(Date):
+  return to_datetime(Date).year
+
+
+
+def date_millis(Date):
+  return int((to_datetime(Date) - datetime(1970, 1, 1)).total_seconds()*1000)
+
+
+
+
+#############################################################################################################
+# Description: This function replaces the year of a given date, as "ee.Date.update" does. February 29 is
+#              moved to February 28 in a non-leap year.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def update_year(Date, Year):
+  moment = to_datetime(Date)
+  day    = min(moment.day, calendar.monthrange(int(Year), moment.month)[1])
+
+  return date_str(moment.replace(year = int(Year), day = day))
+
+
+
+def shift_days(Date, Days):
+  return date_str(to_datetime(Date) + timedelta(days = Days))
+
+
+
+
+#############################################################################################################
+# Description: These functions return the start and stop date strings of a peak season or a month, with the
+#              same rules as "summer_range" and "month_range" functions in ImgSet.py.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def summer_range(Year):
+  return '{}-06-15'.format(int(Year)), '{}-09-15'.format(int(Year))
+
+
+
+def summer_centre(Year):
+  return '{}-07-31'.format(int(Year))
+
+
+
+def month_range(Year, Month):
+  '''Returns the start and end date strings of a specified year and month.
+
+     Args:
+       Year(int): A specified year (limited to the range from 1970 to current year);
+       Month(int): A specified month. When the value of this argument is out of range (1 to 12), the time
+                   range of peak season is returned.'''
+  year = min(max(int(Year), 1970), datetime.now().year)
+
+  if Month < 1 or Month > 12:
+    return summer_range(year)
+  else:
+    last_day = calendar.monthrange(year, int(Month))[1]
+    return '{}-{:02d}-01'.format(year, int(Month)), '{}-{:02d}-{:02d}'.format(year, int(Month), last_day)
+
+
+
+
+#############################################################################################################
+# Description: These functions return the centre, the size and a centred sub-window of a given time window.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def period_centre(StartD, StopD):
+  '''Returns the middle date string of a given time period.
+
+     Args:
+       StartD(string or datetime): The start date of a time period;
+       StopD(string or datetime): The stop date of a time period.'''
+  start = to_datetime(StartD)
+
+  return date_str(start + (to_datetime(StopD) - start)/2)
+
+
+
+def day_difference(DateA, DateB):
+  '''Returns the number of days (float) from "DateB" to "DateA", as "ee.Date(DateA).difference(DateB, 'day')" does.'''
+  return (to_datetime(DateA) - to_datetime(DateB)).total_seconds()*1000.0/MILLIS_PER_DAY
+
+
+
+def window_days(StartD, StopD):
+  return abs(day_difference(StopD, StartD))
+
+
+
+def time_range(MidDate, WinSize):
+  '''Returns the start and stop date strings of a time window with a given centre date and size.
+
+     Args:
+       MidDate(string or datetime): The centre date of a time window;
+       WinSize(int or float): The size (days) of the time window.'''
+  centre = to_datetime(MidDate)
+  half   = timedelta(days = WinSize/2.0)
+
+  return date_str(centre - half), date_str(centre + half)
+
+
+
+
+#############################################################################################################
+# Description: These functions return the meteorological season (winter: Dec-Feb, spring: Mar-May, summer:
+#              Jun-Aug and fall: Sep-Nov) containing a given date, and the start and stop date strings of a
+#              season. A winter is labelled with the year of its January and February.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+SEASON_NAMES = ['winter', 'spring', 'summer', 'fall']
+
+def season_of(Date):
+  '''Returns the year and the name of the season containing a given date.'''
+  moment = to_datetime(Date)
+  year   = moment.year + 1 if moment.month == 12 else moment.year
+
+  return year, SEASON_NAMES[(moment.month % 12)//3]
+
+
+
+def season_range(Year, Season):
+  '''Returns the start (inclusive) and stop (exclusive) date strings of a season.
+
+     Args:
+       Year(int): The year of a season;
+       Season(string): A season name ('winter', 'spring', 'summer' or 'fall').'''
+  index = SEASON_NAMES.index(str(Season).lower())
+  start = datetime(int(Year) - 1, 12, 1) if index == 0 else datetime(int(Year), index*3, 1)
+  stop  = datetime(int(Year), index*3 + 3, 1) if index < 3 else datetime(int(Year), 12, 1)
+
+  return date_str(start), date_str(stop)
@@ -0,0 +1,284 @@
+#############################################################################################################
+# Description: This module contains the functions for skipping the production units (one region and one time
+#              window) whose inputs have not changed since a previous successful run.
+#
+# Note:        The fingerprint of a production unit is computed from the sorted IDs of all contributing scenes,
+#              normalized execution parameters (including score weights) and the version of the code. The
+#              fingerprints and the states of submitted units are recorded in a local JSON registry file.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+import ee
+import os
+import glob
+import json
+import hashlib
+from datetime import datetime, timezone
+
+import ImgSet as IS
+import eoDateWin as eoDW
+
+
+
+# The parameters that do not affect the products of a unit, or are represented by the unit itself
+VOLATILE_KEYS = ['current_time', 'current_region', 'time_str', 'regions', 'start_dates', 'end_dates', 'months',
+                 'tile_names', 'scene_ID', 'skip_unchanged', 'fingerprint_file', 'manifest_folder', 'monthly']
+
+DEFAULT_REGISTRY = 'LEAF_fingerprints.json'
+
+UNIT_SUBMITTED = 'SUBMITTED'
+UNIT_COMPLETED = 'COMPLETED'
+UNIT_FAILED    = 'FAILED'
+
+
+
+
+#############################################################################################################
+# Description: This function returns a version string of the code by hashing all the source files (*.py) in
+#              the folder of this module, so that a change in any module (e.g., QA lookup tables, static
+#              masks or time windows) invalidates the fingerprints of previously produced units.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Hashed all the source files instead of a fixed list
+#
+#############################################################################################################
+def code_version():
+  src_dir = os.path.dirname(os.path.abspath(__file__))
+  hasher  = hashlib.sha1()
+
+  for full_path in sorted(glob.glob(os.path.join(src_dir, '*.py'))):
+    hasher.update(os.path.basename(full_path).encode('utf-8'))
+    with open(full_path, 'rb') as src:
+      hasher.update(src.read())
+
+  return hasher.hexdigest()[:12]
+
+
+
+
+#############################################################################################################
+# Description: This function returns the years whose images can contribute to a production unit, according
+#              to the way that "HomoPeriodMosaic" function composites multiple years.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def unit_years(Year, NbYears, GapFill = False):
+  year     = int(Year)
+  nb_years = int(NbYears)
+
+  if nb_years <= 1:
+    return [year]
+  elif GapFill == True:
+    return list(range(year - nb_years + 1, year + 1))
+  elif nb_years == 2:
+    return [year - 1, year]
+  else:
+    return [year - 1, year, year + 1]
+
+
+
+
+#############################################################################################################
+# Description: This function returns the sorted IDs of all the scenes that can contribute to a production
+#              unit. Only one "getInfo" call is made for all the given years.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def unit_scene_IDs(SsrData, Region, Years, StartD, StopD):
+  '''Returns a sorted list of the IDs of all the scenes that can contribute to a production unit.
+
+     Args:
+       SsrData(Dictionary): A Dictionary containing metadata associated with a sensor;
+       Region(ee.Geometry): The spatial polygon of a ROI;
+       Years(list): A list of the years (integers) involved in the production unit;
+       StartD(ee.Date or string): The start date of a compositing period;
+       StopD(ee.Date or string): The stop date of a compositing period.'''
+  coll = None
+  for year in Years:
+    start = eoDW.update_year(StartD, int(year))
+    stop  = eoDW.update_year(StopD, int(year))
+    year_coll = IS.getCollection(SsrData, Region, start, stop, 0)
+    coll = year_coll if coll == None else coll.merge(year_coll)
+
+  if coll == None:
+    return []
+
+  return sorted(coll.aggregate_array('system:index').getInfo())
+
+
+
+
+#############################################################################################################
+# Description: This function returns a fingerprint string of a production unit.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def unit_fingerprint(inParams, SceneIDs, ProdType):
+  '''Returns a fingerprint string for a production unit.
+
+     Args:
+       inParams(Dictionary): A dictionary storing required input parameters;
+       SceneIDs(list): The sorted IDs of all the scenes that can contribute to the unit;
+       ProdType(string): The type of production (e.g., 'mosaic' or 'LEAF').'''
+  start = inParams['start_dates'][inParams['current_time']]
+  end   = inParams['end_dates'][inParams['current_time']]
+
+  norm_params = {key: inParams[key] for key in sorted(inParams.keys()) if key not in VOLATILE_KEYS}
+  content     = {'prod_type': ProdType,
+                 'region':    str(inParams['current_region']),
+                 'start':     str(start),
+                 'end':       str(end),
+                 'params':    norm_params,
+                 'code':      code_version(),
+                 'scenes':    sorted(SceneIDs)}
+
+  text = json.dumps(content, sort_keys = True, default = str)
+  return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+
+
+#############################################################################################################
+# Description: This function returns the key of a production unit in a fingerprint registry.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def unit_key(inParams, ProdType):
+  return '{}:{}:{}:{}'.format(ProdType, str(inParams['current_region']), str(inParams['year']), str(inParams['time_str']))
+
+
+
+
+#############################################################################################################
+# Description: This function returns the full path name of the fingerprint registry file.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def registry_path(inParams):
+  given = str(inParams['fingerprint_file']) if 'fingerprint_file' in inParams else ''
+
+  return given if len(given) > 0 else os.path.join(os.getcwd(), DEFAULT_REGISTRY)
+
+
+
+
+def load_registry(inParams):
+  full_path = registry_path(inParams)
+  if not os.path.isfile(full_path):
+    return {}
+
+  with open(full_path, 'r') as reg_file:
+    return json.load(reg_file)
+
+
+
+def save_registry(inParams, Registry):
+  full_path = registry_path(inParams)
+  tmp_path  = full_path + '.tmp'
+  with open(tmp_path, 'w') as reg_file:
+    json.dump(Registry, reg_file, indent = 2, sort_keys = True)
+
+  os.replace(tmp_path, full_path)   # Avoid a corrupted registry if the writing is interrupted
+
+
+
+
+#############################################################################################################
+# Description: This function updates the states of submitted production units in a registry based on the
+#              states of the exporting tasks on GEE. A unit is completed when all of its tasks have succeeded,
+#              and failed when any of them failed or was cancelled.
+#
+# Note:        The tasks of a unit are identified by the task IDs recorded with the unit, so the tasks of
+#              other units (e.g., sub-tiles of the same tile or other products of the same region and time)
+#              are never taken into account. The units recorded without task IDs are left as submitted, and
+#              thus will be produced again.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Matched operations with recorded task IDs instead of descriptions
+#
+#############################################################################################################
+def refresh_registry(Registry, Operations = None):
+  '''Updates the states of submitted production units in a registry and returns the registry.
+
+     Args:
+       Registry(Dictionary): A fingerprint registry;
+       Operations(list): An optional list of GEE operations (obtained with "ee.data.listOperations()").'''
+  pending = [key for key in Registry if Registry[key]['state'] == UNIT_SUBMITTED]
+  if len(pending) < 1:
+    return Registry
+
+  operations = ee.data.listOperations() if Operations == None else Operations
+  op_states  = {str(op.get('name', '')).split('/')[-1]: op.get('metadata', {}).get('state', '') for op in operations}
+
+  for key in pending:
+    unit     = Registry[key]
+    task_IDs = unit['task_ids'] if 'task_ids' in unit else []
+    states   = [op_states[task_ID] for task_ID in task_IDs if task_ID in op_states]
+
+    if len(task_IDs) < 1 or len(states) < len(task_IDs):
+      continue
+    elif any(state in ['FAILED', 'CANCELLED', 'CANCELLING'] for state in states):
+      unit['state'] = UNIT_FAILED
+    elif all(state == 'SUCCEEDED' for state in states):
+      unit['state'] = UNIT_COMPLETED
+
+  return Registry
+
+
+
+
+#############################################################################################################
+# Description: This function returns True if a production unit with the same fingerprint has been completed
+#              successfully before.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def is_unchanged(Registry, Key, Fingerprint):
+  if Key not in Registry:
+    return False
+
+  unit = Registry[Key]
+  return unit['state'] == UNIT_COMPLETED and unit['fingerprint'] == Fingerprint
+
+
+
+
+#############################################################################################################
+# Description: This function records a production unit whose exporting tasks have just been submitted.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Recorded the product type and the IDs of submitted tasks
+#
+#############################################################################################################
+def record_unit(Registry, Key, Fingerprint, inParams, SubmitTime, ProdType, Tasks):
+  '''Records a production unit as submitted in a registry and returns the registry.
+
+     Args:
+       Registry(Dictionary): A fingerprint registry;
+       Key(string): The key of the production unit;
+       Fingerprint(string): The fingerprint of the production unit;
+       inParams(Dictionary): A dictionary storing required input parameters;
+       SubmitTime(string): The UTC time (obtained with "utc_now()") right before submitting the tasks;
+       ProdType(string): The type of production (e.g., 'mosaic' or 'LEAF');
+       Tasks(list): The exporting tasks (ee.batch.Task objects) submitted for the production unit.'''
+  Registry[Key] = {'fingerprint': Fingerprint,
+                   'state':       UNIT_SUBMITTED,
+                   'prod_type':   str(ProdType),
+                   'region':      str(inParams['current_region']),
+                   'time_str':    str(inParams['time_str']),
+                   'submitted':   SubmitTime,
+                   'task_ids':    [str(task.id) for task in Tasks if task != None and task.id != None]}
+
+  return Registry
+
+
+
+def utc_now():
+  return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
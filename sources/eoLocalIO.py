@@ -0,0 +1,426 @@
+#############################################################################################################
+# Description: This module contains the functions for handling the image files exported from GEE and then
+#              downloaded to a local machine.
+#
+# Note:        This module does not depend on GEE. Rasterio (GDAL) is only required for reading and writing
+#              raster blocks, the validation of Cloud Optimized GeoTIFF (COG) layout is done by parsing TIFF
+#              headers.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Added block-streaming processing of raster files.
+#                    2026-Oct-19  Added a local bit-packed cache of static land/water layers.
+#                    2026-Oct-19  Removed the local cache of static layers, which had no readers.
+#                    2026-Oct-19  Added halo reading and band descriptions to block-streaming processing.
+#
+#############################################################################################################
+import os
+import glob
+import struct
+import shutil
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+  import rasterio
+  from rasterio import shutil as rio_shutil
+  from rasterio.windows import Window
+except ImportError:
+  rasterio = None
+
+
+
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 16: 8, 17: 8, 18: 8}
+TIFF_TYPE_FORMS = {1: 'B', 2: 'B', 3: 'H', 4: 'I', 6: 'b', 7: 'B', 8: 'h', 9: 'i', 11: 'f', 12: 'd', 16: 'Q', 17: 'q', 18: 'Q'}
+
+TAG_WIDTH        = 256
+TAG_HEIGHT       = 257
+TAG_COMPRESSION  = 259
+TAG_STRIP_OFFSET = 273
+TAG_PREDICTOR    = 317
+TAG_TILE_WIDTH   = 322
+TAG_TILE_HEIGHT  = 323
+TAG_TILE_OFFSET  = 324
+TAG_SUBFILE_TYPE = 254
+
+COMPRESSION_NAMES = {1: 'NONE', 5: 'LZW', 7: 'JPEG', 8: 'DEFLATE', 32946: 'DEFLATE', 50000: 'ZSTD', 34887: 'LERC'}
+
+COG_MIN_SIZE = 512    # Images smaller than this (in pixels) do not need overviews
+
+
+
+
+#############################################################################################################
+# Description: This function reads all the Image File Directories (IFDs) in a TIFF file. Only the tags
+#              needed for checking COG layout are decoded.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def read_TIFF_IFDs(FilePath):
+  '''Returns a list of dictionaries, each containing the offset and the decoded tags of one IFD.
+
+     Args:
+       FilePath(string): The full path name of a TIFF file.'''
+  wanted_tags = [TAG_WIDTH, TAG_HEIGHT, TAG_COMPRESSION, TAG_STRIP_OFFSET, TAG_PREDICTOR,
+                 TAG_TILE_WIDTH, TAG_TILE_HEIGHT, TAG_TILE_OFFSET, TAG_SUBFILE_TYPE]
+
+  with open(FilePath, 'rb') as tif:
+    header = tif.read(16)
+    if len(header) < 8 or header[:2] not in [b'II', b'MM']:
+      print('\n<read_TIFF_IFDs> {} is not a TIFF file!'.format(FilePath))
+      return None
+
+    order   = '<' if header[:2] == b'II' else '>'
+    version = struct.unpack(order + 'H', header[2:4])[0]
+    if version == 42:      # Classic TIFF
+      count_form, entry_form, entry_size, offset_form, inline_size = 'H', 'HHII', 12, 'I', 4
+      ifd_offset = struct.unpack(order + 'I', header[4:8])[0]
+    elif version == 43:    # BigTIFF
+      count_form, entry_form, entry_size, offset_form, inline_size = 'Q', 'HHQQ', 20, 'Q', 8
+      ifd_offset = struct.unpack(order + 'Q', header[8:16])[0]
+    else:
+      print('\n<read_TIFF_IFDs> Unknown TIFF version in {}!'.format(FilePath))
+      return None
+
+    IFDs = []
+    while ifd_offset > 0 and len(IFDs) < 64:
+      tif.seek(ifd_offset)
+      count_size = struct.calcsize(count_form)
+      nb_entries = struct.unpack(order + count_form, tif.read(count_size))[0]
+      entries    = tif.read(nb_entries*entry_size)
+      next_ifd   = struct.unpack(order + offset_form, tif.read(struct.calcsize(offset_form)))[0]
+
+      tags = {}
+      for i in range(nb_entries):
+        tag, typ, count, value = struct.unpack(order + entry_form, entries[i*entry_size:(i+1)*entry_size])
+        if tag not in wanted_tags or typ not in TIFF_TYPE_FORMS:
+          continue
+
+        data_size = TIFF_TYPE_SIZES[typ]*count
+        if data_size <= inline_size:
+          raw = entries[i*entry_size + entry_size - inline_size: i*entry_size + entry_size][:data_size]
+        else:
+          position = tif.tell()
+          tif.seek(value)
+          raw = tif.read(data_size)
+          tif.seek(position)
+
+        values    = struct.unpack(order + TIFF_TYPE_FORMS[typ]*count, raw)
+        tags[tag] = values if tag in [TAG_TILE_OFFSET, TAG_STRIP_OFFSET] else values[0]
+
+      IFDs.append({'offset': ifd_offset, 'tags': tags})
+      ifd_offset = next_ifd
+
+  return IFDs
+
+
+
+
+#############################################################################################################
+# Description: This function checks if a given GeoTIFF file has a valid Cloud Optimized GeoTIFF layout.
+#              The checks follow the rules used by GDAL's "validate_cloud_optimized_geotiff.py":
+#              (1) The main image is internally tiled;
+#              (2) An image larger than 512 pixels has overviews, which are tiled as well;
+#              (3) All IFDs are located at the beginning of the file, before any image data;
+#              (4) The data of smaller overviews are located before those of larger ones and main image.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def check_COG(FilePath):
+  '''Returns a dictionary describing the COG layout of a GeoTIFF file, including 'valid', 'errors' and
+     'warnings' keys.
+
+     Args:
+       FilePath(string): The full path name of a GeoTIFF file.'''
+  report = {'file': FilePath, 'valid': False, 'errors': [], 'warnings': [],
+            'tiled': False, 'overviews': 0, 'compression': 'NONE', 'predictor': 1}
+
+  IFDs = read_TIFF_IFDs(FilePath)
+  if IFDs == None or len(IFDs) < 1:
+    report['errors'].append('not a readable TIFF file')
+    return report
+
+  #==========================================================================================================
+  # Only full resolution image and reduced resolution images (overviews) are considered (masks are skipped)
+  #==========================================================================================================
+  main_tags = IFDs[0]['tags']
+  overviews = [ifd for ifd in IFDs[1:] if ifd['tags'].get(TAG_SUBFILE_TYPE, 0) & 0x1 and not ifd['tags'].get(TAG_SUBFILE_TYPE, 0) & 0x4]
+
+  width  = main_tags.get(TAG_WIDTH, 0)
+  height = main_tags.get(TAG_HEIGHT, 0)
+  report['tiled']       = TAG_TILE_WIDTH in main_tags
+  report['overviews']   = len(overviews)
+  report['compression'] = COMPRESSION_NAMES.get(main_tags.get(TAG_COMPRESSION, 1), str(main_tags.get(TAG_COMPRESSION)))
+  report['predictor']   = main_tags.get(TAG_PREDICTOR, 1)
+
+  #==========================================================================================================
+  # Check tiling and overviews
+  #==========================================================================================================
+  if not report['tiled'] and (width > COG_MIN_SIZE or height > COG_MIN_SIZE):
+    report['errors'].append('main image is not tiled')
+
+  if len(overviews) < 1 and (width > COG_MIN_SIZE or height > COG_MIN_SIZE):
+    report['errors'].append('main image has no overviews')
+
+  for ovr in overviews:
+    if TAG_TILE_WIDTH not in ovr['tags']:
+      report['errors'].append('overview at offset {} is not tiled'.format(ovr['offset']))
+
+  if report['compression'] == 'NONE':
+    report['warnings'].append('image data are not compressed')
+  elif report['predictor'] == 1 and report['compression'] in ['LZW', 'DEFLATE', 'ZSTD']:
+    report['warnings'].append('no predictor is used with {} compression'.format(report['compression']))
+
+  #==========================================================================================================
+  # Check if all IFDs are located before image data, and the data of smaller overviews come first
+  #==========================================================================================================
+  def first_data_offset(ifd):
+    offsets = ifd['tags'].get(TAG_TILE_OFFSET, ifd['tags'].get(TAG_STRIP_OFFSET, ()))
+    offsets = [o for o in offsets if o > 0]
+    return min(offsets) if len(offsets) > 0 else None
+
+  data_offsets = [first_data_offset(ifd) for ifd in [IFDs[0]] + overviews]
+  valid_data   = [o for o in data_offsets if o != None]
+  last_ifd     = max([ifd['offset'] for ifd in IFDs])
+
+  if len(valid_data) > 0 and last_ifd > min(valid_data):
+    report['errors'].append('IFDs are not located at the beginning of the file')
+
+  for i in range(len(data_offsets) - 1):
+    larger, smaller = data_offsets[i], data_offsets[i+1]
+    if larger != None and smaller != None and larger < smaller:
+      level = 'main image' if i == 0 else 'overview {}'.format(i)
+      report['errors'].append('data of {} are located before those of overview {}'.format(level, i+1))
+
+  report['valid'] = len(report['errors']) == 0
+
+  return report
+
+
+
+
+#############################################################################################################
+# Description: This function rewrites a GeoTIFF file as a COG with overviews, internal tiling and
+#              predictor-based compression, using the COG driver of GDAL through Rasterio. The data are
+#              processed block by block by GDAL, so the whole image is never loaded into memory.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def make_COG(InFile, OutFile = None, Compress = 'DEFLATE', BlockSize = 512, NbThreads = 'ALL_CPUS'):
+  '''Rewrites a GeoTIFF file as a COG and returns the full path of the resultant file.
+
+     Args:
+       InFile(string): The full path name of a given GeoTIFF file;
+       OutFile(string): The full path name of resultant COG file (None means replacing the given file);
+       Compress(string): The compression method (e.g., 'DEFLATE', 'LZW' or 'ZSTD');
+       BlockSize(int): The size (in pixels) of internal tiles;
+       NbThreads(int or string): The number of threads used by GDAL for compression and overviews.'''
+  if rasterio == None:
+    print('\n<make_COG> Rasterio is required for creating COG files!')
+    return None
+
+  out_file = InFile + '.cog.tif' if OutFile == None else OutFile
+
+  with rasterio.open(InFile) as src:
+    predictor = '3' if src.dtypes[0].startswith('float') else '2'
+
+  rio_shutil.copy(InFile, out_file, driver = 'COG', COMPRESS = Compress, PREDICTOR = predictor,
+                  BLOCKSIZE = int(BlockSize), OVERVIEWS = 'AUTO', NUM_THREADS = str(NbThreads), BIGTIFF = 'IF_SAFER')
+
+  if OutFile == None:
+    shutil.move(out_file, InFile)
+    out_file = InFile
+
+  return out_file
+
+
+
+
+#############################################################################################################
+# Description: This function validates the COG layout of the GeoTIFF files in a local folder, and rewrites
+#              the files lacking it as COGs in parallel.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def fix_COG_folder(Folder, Pattern = '*.tif', NbWorkers = None, Compress = 'DEFLATE', Overwrite = True):
+  '''Validates all the GeoTIFF files in a folder and rewrites those without valid COG layout. Returns a
+     dictionary with 'valid', 'fixed' and 'failed' file lists.
+
+     Args:
+       Folder(string): A local folder containing downloaded GeoTIFF files;
+       Pattern(string): A filename pattern for selecting files;
+       NbWorkers(int): The number of parallel processes (the number of CPUs if None);
+       Compress(string): The compression method used for the rewritten files;
+       Overwrite(Boolean): A flag indicating if to replace the original files.'''
+  result = {'valid': [], 'fixed': [], 'failed': []}
+
+  files = sorted(glob.glob(os.path.join(Folder, Pattern)))
+  if len(files) < 1:
+    print('\n<fix_COG_folder> No file matching {} was found in {}!'.format(Pattern, Folder))
+    return result
+
+  #==========================================================================================================
+  # Checking the layout is cheap (only TIFF headers are read), so it is done sequentially
+  #==========================================================================================================
+  to_fix = []
+  for f in files:
+    report = check_COG(f)
+    if report['valid'] and report['compression'] != 'NONE':
+      result['valid'].append(f)
+    else:
+      to_fix.append(f)
+
+  if len(to_fix) < 1:
+    return result
+
+  if rasterio == None:
+    print('\n<fix_COG_folder> Rasterio is required for rewriting {} files!'.format(len(to_fix)))
+    result['failed'] = to_fix
+    return result
+
+  #==========================================================================================================
+  # Rewrite the files in parallel processes, the CPU threads are shared among the processes
+  #==========================================================================================================
+  nb_cpus    = os.cpu_count() or 1
+  nb_workers = min(len(to_fix), int(NbWorkers) if NbWorkers != None else nb_cpus)
+  nb_threads = max(1, nb_cpus // nb_workers)
+  out_files  = [None if Overwrite else os.path.splitext(f)[0] + '_cog.tif' for f in to_fix]
+
+  with ProcessPoolExecutor(max_workers = nb_workers) as executor:
+    futures = [executor.submit(make_COG, f, o, Compress, 512, nb_threads) for f, o in zip(to_fix, out_files)]
+
+    for f, future in zip(to_fix, futures):
+      try:
+        out_file = future.result()
+        result['fixed' if out_file != None else 'failed'].append(f)
+      except Exception as e:
+        print('\n<fix_COG_folder> Failed to rewrite {}: {}'.format(f, e))
+        result['failed'].append(f)
+
+  print('\n<fix_COG_folder> {} valid, {} fixed and {} failed files.'.format(len(result['valid']), len(result['fixed']), len(result['failed'])))
+  return result
+
+
+
+
+
+#############################################################################################################
+# Description: This function returns a list of (column offset, row offset, width, height) tuples, which split
+#              an image of a given size into blocks.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def block_windows(Width, Height, BlockSize = 1024):
+  size = int(BlockSize)
+
+  return [(c, r, min(size, Width - c), min(size, Height - r)) for r in range(0, Height, size) for c in range(0, Width, size)]
+
+
+
+
+#############################################################################################################
+# Description: This function returns the width and height (in pixels) of a raster file.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def raster_size(FilePath):
+  if rasterio == None:
+    print('\n<raster_size> Rasterio is required for reading raster files!')
+    return None
+
+  with rasterio.open(FilePath) as src:
+    return src.width, src.height
+
+
+
+
+#############################################################################################################
+# Description: This function applies a given function to the blocks of a set of raster bands and writes the
+#              results to a new GeoTIFF file. Only the blocks being processed are kept in memory, and the 
+#              blocks are processed in parallel threads (NumPy releases the GIL for most array operations).
+#
+# Note:        When 'Halo' is larger than 0, each block is read with a margin of 'Halo' pixels (clipped at the
+#              image edges), and "BlockFunc" is called as BlockFunc(block, window, core), where 'window' and
+#              'core' are the (column offset, row offset, width, height) tuples of the extended block and the
+#              block itself. "BlockFunc" must then return the results for the core block only.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Added 'Halo', 'ReadDtype' and 'BandNames' parameters
+#
+#############################################################################################################
+def run_blockwise(SrcBands, OutFile, BlockFunc, NbOutBands = 1, OutDtype = 'float32', NoData = None, BlockSize = 1024, NbThreads = None, Halo = 0, ReadDtype = 'float32', BandNames = None):
+  '''Applies a function to the blocks of given raster bands and saves the results into a GeoTIFF file.
+     Returns the full path of the resultant file.
+
+     Args:
+       SrcBands(list): A list of (file path, band index) tuples, all the bands must have the same grid;
+       OutFile(string): The full path name of resultant GeoTIFF file;
+       BlockFunc(function): A function taking a (nBands, h, w) float32 array and returning a (NbOutBands, h, w)
+                            array for the same block;
+       NbOutBands(int): The number of bands in resultant file;
+       OutDtype(string): The data type of resultant file;
+       NoData(float): The no-data value of resultant file;
+       BlockSize(int): The size (in pixels) of processing blocks;
+       NbThreads(int): The number of parallel threads (the number of CPUs if None);
+       Halo(int): The number of extra pixels read around each block;
+       ReadDtype(string): The data type of the arrays passed to "BlockFunc";
+       BandNames(list): Optional descriptions of the bands in resultant file.'''
+  if rasterio == None:
+    print('\n<run_blockwise> Rasterio is required for processing raster blocks!')
+    return None
+
+  with rasterio.open(SrcBands[0][0]) as first:
+    profile = first.profile.copy()
+    width, height = first.width, first.height
+
+  profile.update(driver = 'GTiff', count = int(NbOutBands), dtype = OutDtype, nodata = NoData, tiled = True,
+                 blockxsize = 512, blockysize = 512, compress = 'DEFLATE', BIGTIFF = 'IF_SAFER')
+
+  #==========================================================================================================
+  # Each thread opens its own dataset handles, while writing to resultant file is serialized with a lock
+  #==========================================================================================================
+  local      = threading.local()
+  write_lock = threading.Lock()
+  opened     = []
+
+  def read_block(window):
+    if not hasattr(local, 'datasets'):
+      local.datasets = {path: rasterio.open(path) for path in set([src[0] for src in SrcBands])}
+      opened.extend(local.datasets.values())
+
+    return np.stack([local.datasets[path].read(int(band), window = window).astype(ReadDtype) for path, band in SrcBands])
+
+  halo = int(Halo)
+  with rasterio.open(OutFile, 'w', **profile) as dst:
+    if BandNames != None:
+      for index, name in enumerate(BandNames):
+        dst.set_band_description(index + 1, str(name))
+
+    def process(block):
+      window = Window(*block)
+      if halo > 0:
+        c0, r0 = max(0, block[0] - halo), max(0, block[1] - halo)
+        c1, r1 = min(width, block[0] + block[2] + halo), min(height, block[1] + block[3] + halo)
+        extent = (c0, r0, c1 - c0, r1 - r0)
+        result = BlockFunc(read_block(Window(*extent)), extent, block)
+      else:
+        result = BlockFunc(read_block(window))
+
+      result = np.asarray(result).astype(OutDtype, copy = False)
+      with write_lock:
+        dst.write(result.reshape(int(NbOutBands), block[3], block[2]), window = window)
+
+    nb_threads = int(NbThreads) if NbThreads != None else (os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers = nb_threads) as executor:
+      list(executor.map(process, block_windows(width, height, BlockSize)))
+
+  for dataset in opened:
+    dataset.close()
+
+  return OutFile
@@ -0,0 +1,139 @@
+#############################################################################################################
+# Description: This module contains the functions for creating and caching the MODIS reference mosaics used
+#              by "ImgMask.mask_from_MODIS" function.
+#
+# Note:        (1) A MODIS reference mosaic depends only on a region and a compositing period, so it is shared
+#                  by all the sensors and time windows with the same period over the same region;
+#              (2) The mosaics are cached in memory for current session and, optionally, as GEE assets that
+#                  can be reused across sessions;
+#              (3) A MODIS reference mosaic keeps the original MOD09A1 band names and values (without gain
+#                  and offset applied), as required by "ImgMask.mask_from_MODIS" function.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+import ee
+
+import Image as Img
+import ImgMask as IM
+import ImgSet as IS
+import eoStaticMask as eoSM
+
+
+
+MODIS_SSR_DATA = Img.SSR_META_DICT['MOD_SR']
+
+# The MODIS reference mosaics created or loaded in current session
+_MODIS_REFERS = {}
+
+
+
+
+#############################################################################################################
+# Description: This function returns the key of a MODIS reference mosaic for a region and a period.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def refer_key(RegionName, StartD, StopD):
+  start = str(StartD)[:10].replace('-', '')
+  stop  = str(StopD)[:10].replace('-', '')
+
+  return 'modis_{}_{}_{}'.format(str(RegionName).lower(), start, stop)
+
+
+
+
+#############################################################################################################
+# Description: This function creates a MODIS reference mosaic (the median of clear-sky MOD09A1 observations)
+#              for a region and a period.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def MODIS_refer_mosaic(Region, StartD, StopD):
+  '''Returns a MODIS reference mosaic.
+
+     Args:
+       Region(ee.Geometry): A spatial region;
+       StartD(string or ee.Date): The start date of a compositing period;
+       StopD(string or ee.Date): The stop date of a compositing period.'''
+  modis_coll = IS.getCollection(MODIS_SSR_DATA, Region, StartD, StopD, Img.EXTRA_NONE)
+
+  def clear_sky(image):
+    mask = IM.Img_VenderMask(image, 0, MODIS_SSR_DATA, IM.CLEAR_MASK)
+    return image.updateMask(mask.Not())
+
+  return modis_coll.map(clear_sky).select(MODIS_SSR_DATA['OUT_BANDS']).median()
+
+
+
+
+#############################################################################################################
+# Description: This function looks up the MODIS reference mosaic of a region and a period, first in the
+#              memory cache, then in the given asset folder. A new mosaic is created (and kept in memory)
+#              only when it has not been cached.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def get_MODIS_refer(RegionName, Region, StartD, StopD, AssetRoot = ''):
+  '''Returns a MODIS reference mosaic for a region and a period.
+
+     Args:
+       RegionName(string): The name of a spatial region (e.g., 'tile42');
+       Region(ee.Geometry): The spatial region;
+       StartD(string): The start date string ('YYYY-MM-DD') of a compositing period;
+       StopD(string): The stop date string ('YYYY-MM-DD') of a compositing period;
+       AssetRoot(string): An optional GEE asset folder storing cached MODIS reference mosaics.'''
+  key = refer_key(RegionName, StartD, StopD)
+  if key in _MODIS_REFERS:
+    return _MODIS_REFERS[key]
+
+  asset_id = '{}/{}'.format(str(AssetRoot).rstrip('/'), key)
+  if len(str(AssetRoot)) > 0 and eoSM.asset_exists(asset_id):
+    refer = ee.Image(asset_id)
+  else:
+    refer = MODIS_refer_mosaic(Region, StartD, StopD)
+
+  _MODIS_REFERS[key] = refer
+  return refer
+
+
+
+
+#############################################################################################################
+# Description: This function exports the MODIS reference mosaic of a region and a period to a GEE asset, if
+#              it has not been cached.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def export_MODIS_refer(RegionName, Region, StartD, StopD, AssetRoot, Projection = 'EPSG:3979', Scale = 500):
+  '''Submits a task exporting a MODIS reference mosaic, and returns the task (None if it has been cached).
+
+     Args:
+       RegionName(string): The name of a spatial region (e.g., 'tile42');
+       Region(ee.Geometry): The spatial region;
+       StartD(string): The start date string ('YYYY-MM-DD') of a compositing period;
+       StopD(string): The stop date string ('YYYY-MM-DD') of a compositing period;
+       AssetRoot(string): The GEE asset folder storing cached MODIS reference mosaics;
+       Projection(string): The projection of the exported mosaic;
+       Scale(int): The spatial resolution of the exported mosaic.'''
+  key      = refer_key(RegionName, StartD, StopD)
+  asset_id = '{}/{}'.format(str(AssetRoot).rstrip('/'), key)
+  if eoSM.asset_exists(asset_id):
+    print('\n<export_MODIS_refer> {} has been cached.'.format(asset_id))
+    return None
+
+  refer = MODIS_refer_mosaic(Region, StartD, StopD).int16().clip(Region)
+  task  = ee.batch.Export.image.toAsset(image       = refer,
+                                        description = key,
+                                        assetId     = asset_id,
+                                        region      = Region,
+                                        scale       = Scale,
+                                        crs         = Projection,
+                                        maxPixels   = 1e11)
+  task.start()
+
+  return task
@@ -3,7 +3,7 @@ import ee
 ee.Initialize()
 
 
-import ImgSet as IS
+import eoDateWin as eoDW
 import Image as Img
 import eoTileGrids as eoTG
 
@@ -32,10 +32,26 @@ DefaultParams = {
     'GCS_bucket': '',            # An unique bucket name on Google Cloud Storage
     'out_folder': '',            # the folder name for exporting
     'export_style': 'separate',  # Two values for this key: "separate" or "compact"   
+    'fan_out': 0,                # 4 or 9 to fan out the export of a full tile into subtile tasks (0 => no fan out)
+    'cloud_optimized': False,    # A flag indicating if to export images as Cloud Optimized GeoTIFFs
+    'manifest_folder': '',       # A local folder for saving the manifests of fanned out exports (current folder if empty)
     'projection': 'EPSG:3979',
     'CloudScore': False,
     'extra_bands': Img.EXTRA_NONE, 
     'score_weights': {'spectral': 1.0, 'temporal': 0.4, 'spatial': 0.9},   #or {'spectral': 1.0, 'temporal': 0.5, 'spatial': 0.9} for seasonal composite
+    'scene_budget': {'max_scenes': 0, 'cloud': 1.0, 'temporal': 0.5, 'footprint': 0.5, 'min_clear': 0.0, 'report': False},  # 'max_scenes' = 0 disables the scene budget and 'min_clear' = 0 disables the clear-fraction prefilter
+    'skip_unchanged': False,     # A flag indicating if to skip the units whose inputs have not changed since a previous successful run
+    'fingerprint_file': '',      # A local JSON file for recording the fingerprints of produced units ('LEAF_fingerprints.json' if empty)
+    'quality_metrics': False,    # A flag indicating if to export a table of quality metrics for each composite
+    'static_asset_root': '',     # A GEE asset folder storing per-tile static land/water layers (see eoStaticMask.py; empty to disable)
+    'modis_refer': False,        # A flag indicating if to detect extra cloudy pixels with a MODIS reference mosaic
+    'modis_asset_root': '',      # A GEE asset folder storing cached MODIS reference mosaics (see eoModisRefer.py)
+    'class3_cache': False,       # A flag indicating if to share one 3-class (water/non-veg/veg) map among the windows within a season
+    'class3_asset_root': '',     # A GEE asset folder storing cached seasonal 3-class maps (see "Mosaic.get_class3_map")
+    'min_clear_obs': 0,          # The minimum expected number of clear observations for producing a unit (0 => no availability check)
+    'catalog_file': '',          # An optional local scene catalog (see eoCatalog.py) used for availability checks
+    'gap_fill': False,           # A flag indicating if to fill only the gaps of target year composite with earlier years (nbYears > 1)
+    'adaptive_window': {'target_clear': 0, 'min_ratio': 0.5, 'max_ratio': 2.0},  # 'target_clear' = 0 disables density-adaptive compositing windows
 
     'monthly': True,             # A flag indicating if time windows are monthly. An user is not supposed to set this parameter
     'start_dates': [],
@@ -402,6 +418,54 @@ def form_full_params(inParams):
     if 'spatial' not in weights:
       outParams['score_weights']['spatial'] = 1
 
+  #==========================================================================================================
+  # Confirm 'scene_budget', which limits the number of scenes per path/row or granule used for compositing  
+  #==========================================================================================================  
+  budget = {'max_scenes': 0, 'cloud': 1.0, 'temporal': 0.5, 'footprint': 0.5, 'min_clear': 0.0, 'report': False}
+  if 'scene_budget' in inParams:
+    budget.update(inParams['scene_budget'])
+  
+  outParams['scene_budget'] = budget
+
+  #==========================================================================================================
+  # Confirm 'adaptive_window', which shrinks or grows each compositing window to reach a target number of
+  # clear observations
+  #==========================================================================================================  
+  adapt_win = {'target_clear': 0, 'min_ratio': 0.5, 'max_ratio': 2.0}
+  if 'adaptive_window' in inParams:
+    adapt_win.update(inParams['adaptive_window'])
+  
+  outParams['adaptive_window'] = adapt_win
+
+  outParams['gap_fill'] = bool(inParams['gap_fill']) if 'gap_fill' in inParams else False
+  outParams['quality_metrics'] = bool(inParams['quality_metrics']) if 'quality_metrics' in inParams else False
+
+  #==========================================================================================================
+  # Confirm 'skip_unchanged' and 'fingerprint_file' for skipping the units without any input change  
+  #==========================================================================================================  
+  outParams['skip_unchanged']   = bool(inParams['skip_unchanged']) if 'skip_unchanged' in inParams else False
+  outParams['fingerprint_file'] = str(inParams['fingerprint_file']) if 'fingerprint_file' in inParams else ''
+
+  #==========================================================================================================
+  # Confirm 'fan_out' and 'manifest_folder' for exporting a full tile as 4 or 9 subtile pieces  
+  #==========================================================================================================  
+  fan_out = int(inParams['fan_out']) if 'fan_out' in inParams else 0
+  outParams['fan_out']         = fan_out if fan_out in [4, 9] else 0
+  outParams['manifest_folder'] = str(inParams['manifest_folder']) if 'manifest_folder' in inParams else ''
+
+  outParams['cloud_optimized'] = bool(inParams['cloud_optimized']) if 'cloud_optimized' in inParams else False
+
+  outParams['static_asset_root'] = str(inParams['static_asset_root']) if 'static_asset_root' in inParams else ''
+
+  outParams['modis_refer']      = bool(inParams['modis_refer']) if 'modis_refer' in inParams else False
+  outParams['modis_asset_root'] = str(inParams['modis_asset_root']) if 'modis_asset_root' in inParams else ''
+
+  outParams['class3_cache']      = bool(inParams['class3_cache']) if 'class3_cache' in inParams else False
+  outParams['class3_asset_root'] = str(inParams['class3_asset_root']) if 'class3_asset_root' in inParams else ''
+
+  outParams['min_clear_obs'] = float(inParams['min_clear_obs']) if 'min_clear_obs' in inParams else 0
+  outParams['catalog_file']  = str(inParams['catalog_file']) if 'catalog_file' in inParams else ''
+
   return all_valid, outParams
 
 
@@ -426,7 +490,7 @@ def form_time_windows(inParams):
     inParams['end_dates']   = []
     for index in range(nMonths):
       month = STD_months[index]
-      start, end = IS.month_range(year, month, False)
+      start, end = eoDW.month_range(year, month)
 
       inParams['start_dates'].append(start)
       inParams['end_dates'].append(end) 
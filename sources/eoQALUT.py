@@ -0,0 +1,194 @@
+#############################################################################################################
+# Description: This module contains the lookup tables (LUTs) that map the codes of the quality assessment (QA)
+#              bands of Sentinel-2, Landsat and HLS images straight to bit-packed pixel classes (clear, cloud,
+#              shadow, snow, water and saturated).
+#
+# Note:        (1) This module does not depend on GEE. A LUT is applied locally with "decode_QA" function
+#                  (a vectorized "take") and on GEE with one "remap" call (see "LUT_class_img" in ImgMask.py);
+#              (2) Only the QA bits used by the masking functions in ImgMask.py are involved, so the code space
+#                  of each sensor is reduced as follows:
+#                    Sentinel-2: SCL + 16*opaque_cloud + 32*cirrus   (64 codes)
+#                    Landsat:    QA_PIXEL & 0xFF                       (256 codes)
+#                    HLS:        Fmask & 0xFF                          (256 codes).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+import numpy as np
+
+
+
+# The bit flags of pixel classes
+QA_CLEAR  = 1     # Neither cloud nor cloud shadow
+QA_CLOUD  = 2     # Cloud (including cirrus and dilated cloud for Landsat)
+QA_SHADOW = 4     # Cloud shadow
+QA_SNOW   = 8     # Snow/ice
+QA_WATER  = 16    # Water
+QA_SATU   = 32    # Radiometric saturation
+
+QA_CLOUD_SHADOW = QA_CLOUD | QA_SHADOW
+
+S2_NB_CODES  = 64
+LS_NB_CODES  = 256
+HLS_NB_CODES = 256
+
+
+
+
+#############################################################################################################
+# Description: This function sets 'QA_CLEAR' flag for all the codes without cloud and cloud shadow flags.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def set_clear_flag(LUT):
+  LUT[(LUT & QA_CLOUD_SHADOW) == 0] |= QA_CLEAR
+
+  return LUT
+
+
+
+
+#############################################################################################################
+# Description: This function builds the LUT for Sentinel-2 images, with the same rules as "S2_ClearMask" and
+#              "Img_VenderMask" functions.
+#
+# Note:        SCL classes: 1 = saturated, 3 = cloud shadow, 6 = water, 8/9 = medium/high probability cloud,
+#              10 = thin cirrus, 11 = snow/ice. SCL class 7 (unclassified) is not regarded as cloud since it
+#              causes the missing of boundary pixels between water and land.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def build_S2_LUT():
+  codes = np.arange(S2_NB_CODES)
+  scl   = codes & 15
+  lut   = np.zeros(S2_NB_CODES, dtype = np.uint8)
+
+  lut[np.isin(scl, [8, 9, 10]) | ((codes & 48) > 0)] |= QA_CLOUD
+  lut[scl == 3]  |= QA_SHADOW
+  lut[scl == 11] |= QA_SNOW
+  lut[scl == 6]  |= QA_WATER
+  lut[scl == 1]  |= QA_SATU
+
+  return set_clear_flag(lut)
+
+
+
+
+#############################################################################################################
+# Description: This function builds the LUT for Landsat images (the lower byte of 'QA_PIXEL' band), with the
+#              same rules as "LS_ClearMask" and "Img_VenderMask" functions.
+#
+# Note:        QA_PIXEL bits: 1 = dilated cloud, 2 = cirrus, 3 = cloud, 4 = cloud shadow, 5 = snow, 7 = water.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def build_LS_LUT():
+  codes = np.arange(LS_NB_CODES)
+  lut   = np.zeros(LS_NB_CODES, dtype = np.uint8)
+
+  lut[(codes & ((1 << 1) | (1 << 2) | (1 << 3))) > 0] |= QA_CLOUD
+  lut[(codes & (1 << 4)) > 0] |= QA_SHADOW
+  lut[(codes & (1 << 5)) > 0] |= QA_SNOW
+  lut[(codes & (1 << 7)) > 0] |= QA_WATER
+
+  return set_clear_flag(lut)
+
+
+
+
+#############################################################################################################
+# Description: This function builds the LUT for HLS images ('Fmask' band), with the same rules as
+#              "HLS_ClearMask" and "Img_VenderMask" functions.
+#
+# Note:        Fmask bits: 1 = cloud, 2 = adjacent to cloud/shadow, 3 = cloud shadow, 4 = snow/ice, 5 = water.
+#              As in "HLS_ClearMask" function, the pixels adjacent to cloud/shadow are not flagged.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def build_HLS_LUT():
+  codes = np.arange(HLS_NB_CODES)
+  lut   = np.zeros(HLS_NB_CODES, dtype = np.uint8)
+
+  lut[(codes & (1 << 1)) > 0] |= QA_CLOUD
+  lut[(codes & (1 << 3)) > 0] |= QA_SHADOW
+  lut[(codes & (1 << 4)) > 0] |= QA_SNOW
+  lut[(codes & (1 << 5)) > 0] |= QA_WATER
+
+  return set_clear_flag(lut)
+
+
+
+S2_LUT  = build_S2_LUT()
+LS_LUT  = build_LS_LUT()
+HLS_LUT = build_HLS_LUT()
+
+
+
+
+#############################################################################################################
+# Description: These functions reduce the raw QA band values of an image to the codes indexing a LUT.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def S2_codes(SCL, QA60 = None, Opaque = None, Cirrus = None):
+  '''Returns the LUT codes of Sentinel-2 pixels.
+
+     Args:
+       SCL(ndarray): The values of 'SCL' band (zeros for TOA reflectance images);
+       QA60(ndarray): The values of 'QA60' band (for the images acquired before 2024);
+       Opaque(ndarray): The values of 'MSK_CLASSI_OPAQUE' band (for the images acquired after 2023);
+       Cirrus(ndarray): The values of 'MSK_CLASSI_CIRRUS' band (for the images acquired after 2023).'''
+  codes = np.asarray(SCL).astype(np.uint8) & 15
+
+  if QA60 is not None:
+    codes = codes | (((np.asarray(QA60).astype(np.uint16) >> 10) & 3) << 4).astype(np.uint8)
+  else:
+    if Opaque is not None:
+      codes = codes | ((np.asarray(Opaque) == 1).astype(np.uint8) << 4)
+    if Cirrus is not None:
+      codes = codes | ((np.asarray(Cirrus) == 1).astype(np.uint8) << 5)
+
+  return codes
+
+
+
+def LS_codes(QA_PIXEL):
+  return (np.asarray(QA_PIXEL).astype(np.uint16) & 0xFF).astype(np.uint8)
+
+
+
+def HLS_codes(Fmask):
+  return (np.asarray(Fmask).astype(np.uint16) & 0xFF).astype(np.uint8)
+
+
+
+
+#############################################################################################################
+# Description: This function decodes the LUT codes of an image into bit-packed pixel classes.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def decode_QA(Codes, LUT):
+  '''Returns a uint8 array of bit-packed pixel classes (QA_CLEAR, QA_CLOUD, QA_SHADOW, QA_SNOW, QA_WATER
+     and QA_SATU).
+
+     Args:
+       Codes(ndarray): The LUT codes obtained with "S2_codes", "LS_codes" or "HLS_codes" function;
+       LUT(ndarray): The LUT of the sensor (S2_LUT, LS_LUT or HLS_LUT).'''
+  return LUT.take(Codes, mode = 'clip')
+
+
+
+def class_mask(Classes, Flags):
+  '''Returns a boolean array indicating the pixels with any of the given class flags.
+
+     Args:
+       Classes(ndarray): The bit-packed pixel classes returned by "decode_QA" function;
+       Flags(int): One or more class flags combined with "|" operator (e.g., QA_CLOUD | QA_SHADOW).'''
+  return (Classes & Flags) != 0
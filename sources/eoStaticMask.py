@@ -0,0 +1,196 @@
+#############################################################################################################
+# Description: This module contains the functions for materializing the static (nearly unchanged from year to
+#              year) land/water layers once per tile and year, and looking them up by tile name afterwards.
+#
+# Note:        (1) A cached static layer is a GEE asset with two uint8 bands: 'partition' (the land cover map
+#                  from "eoAuxData.get_GlobLC" function) and 'static_bits' (the bit-packed masks defined below,
+#                  read by "LEAF_valid_mask" function in LEAFNets.py);
+#              (2) The cached layers of the sub-tiles of a tile are the same as that of the tile;
+#              (3) A layer is cached at a given resolution (the exporting resolution of products), and is looked
+#                  up with the same resolution. When a layer has not been cached, the same layer is computed
+#                  from global datasets. A layer cached at a resolution different from that of the products
+#                  would be resampled and thus change the products, so it is never used.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Kept only the bits with readers and cached layers per resolution
+#
+#############################################################################################################
+import ee
+
+import eoAuxData as eoAD
+import eoTileGrids as eoTG
+
+
+
+# The bits in 'static_bits' band
+BIT_CLASS_WATER = 1 << 0   # Land cover class 0 or 18, as used in "LEAF_valid_mask" function
+
+STATIC_BITS = 'static_bits'
+PARTITION   = 'partition'
+
+# The asset IDs that have been confirmed to exist (True) or not (False) in current session
+_ASSET_EXISTS = {}
+
+
+
+
+#############################################################################################################
+# Description: This function creates the static layer of a given year from global datasets.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def static_layer_img(Year):
+  '''Returns an image with 'partition' and 'static_bits' bands.
+
+     Args:
+       Year(int): A target year.'''
+  year      = int(Year)
+  partition = eoAD.get_GlobLC(year, False).uint8()
+
+  bits = partition.eq(0).Or(partition.eq(18)).multiply(BIT_CLASS_WATER)
+
+  return partition.rename([PARTITION]).addBands(bits.uint8().rename([STATIC_BITS]))
+
+
+
+
+#############################################################################################################
+# Description: This function returns the asset ID of the static layer of a tile (or the parent tile of a
+#              sub-tile), a year and a resolution.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def static_asset_id(AssetRoot, TileName, Year, Scale):
+  tile_name = str(TileName).lower().split('_')[0]
+
+  return '{}/static_{}_{}_{}m'.format(str(AssetRoot).rstrip('/'), tile_name, int(Year), int(Scale))
+
+
+
+
+def asset_exists(AssetID):
+  if AssetID not in _ASSET_EXISTS:
+    try:
+      ee.data.getAsset(AssetID)
+      _ASSET_EXISTS[AssetID] = True
+    except ee.EEException:
+      _ASSET_EXISTS[AssetID] = False
+
+  return _ASSET_EXISTS[AssetID]
+
+
+
+
+#############################################################################################################
+# Description: This function looks up the cached static layer of a given tile and year. The layer created
+#              from global datasets is returned if it has not been cached.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def get_static_layer(AssetRoot, TileName, Year, Scale = 30):
+  '''Returns an image with 'partition' and 'static_bits' bands for a tile and a year.
+
+     Args:
+       AssetRoot(string): The GEE asset folder storing cached static layers (empty to disable the cache);
+       TileName(string): A (sub-)tile name (e.g., 'tile42' or 'tile42_411');
+       Year(int): A target year;
+       Scale(int): The spatial resolution of the products using the layer.'''
+  if len(str(AssetRoot)) > 0 and 'tile' in str(TileName).lower():
+    asset_id = static_asset_id(AssetRoot, TileName, Year, Scale)
+    if asset_exists(asset_id):
+      return ee.Image(asset_id)
+
+  return static_layer_img(Year)
+
+
+
+
+#############################################################################################################
+# Description: This function tests the given bits in 'static_bits' band of a static layer.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def test_static_bits(StaticLayer, Bits):
+  '''Returns a 0/1 image with 1 representing the pixels with any of the given bits set.
+
+     Args:
+       StaticLayer(ee.Image): A static layer returned by "get_static_layer" function;
+       Bits(int): One or more bits combined with "|" operator (e.g., BIT_CLASS_WATER).'''
+  return ee.Image(StaticLayer).select([STATIC_BITS]).bitwiseAnd(int(Bits)).neq(0)
+
+
+
+
+#############################################################################################################
+# Description: This function exports the static layer of a tile and a year to a GEE asset, if it has not
+#              been cached.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def export_static_layer(AssetRoot, TileName, Year, Projection = 'EPSG:3979', Scale = 30):
+  '''Submits a task exporting the static layer of a tile and a year, and returns the task (None if the layer
+     has been cached).
+
+     Args:
+       AssetRoot(string): The GEE asset folder storing cached static layers;
+       TileName(string): A full tile name (e.g., 'tile42');
+       Year(int): A target year;
+       Projection(string): The projection of the exported layer;
+       Scale(int): The spatial resolution of the exported layer (the same as that of the products).'''
+  asset_id = static_asset_id(AssetRoot, TileName, Year, Scale)
+  if asset_exists(asset_id):
+    print('\n<export_static_layer> {} has been cached.'.format(asset_id))
+    return None
+
+  tile_name = str(TileName).lower().split('_')[0]
+  region    = eoTG.expandSquare(eoTG.PolygonDict.get(tile_name), 0.02)
+  layer     = static_layer_img(Year).clip(region)
+
+  task = ee.batch.Export.image.toAsset(image       = layer,
+                                       description = 'static_{}_{}_{}m'.format(tile_name, int(Year), int(Scale)),
+                                       assetId     = asset_id,
+                                       region      = region,
+                                       scale       = Scale,
+                                       crs         = Projection,
+                                       maxPixels   = 1e11,
+                                       pyramidingPolicy = {PARTITION: 'mode', STATIC_BITS: 'sample'})
+  task.start()
+
+  return task
+
+
+
+
+#############################################################################################################
+# Description: This function exports the static layers of all the tiles and the year specified in a given
+#              parameter dictionary.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def Static_production(inParams):
+  '''Submits the tasks exporting the static layers that have not been cached and returns the tasks.
+
+     Args:
+       inParams(Dictionary): A dictionary storing required input parameters.'''
+  asset_root = str(inParams['static_asset_root']) if 'static_asset_root' in inParams else ''
+  if len(asset_root) < 1:
+    print('\n<Static_production> \'static_asset_root\' must be provided!')
+    return None
+
+  projection = str(inParams['projection']) if 'projection' in inParams else 'EPSG:3979'
+  resolution = int(inParams['resolution']) if 'resolution' in inParams else 30
+  tile_names = sorted(set(str(name).lower().split('_')[0] for name in inParams['tile_names']))
+
+  task_list = []
+  for tile_name in tile_names:
+    task = export_static_layer(asset_root, tile_name, inParams['year'], projection, resolution)
+    if task != None:
+      task_list.append(task)
+
+  return task_list
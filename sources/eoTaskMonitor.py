@@ -0,0 +1,260 @@
+#############################################################################################################
+# Description: This module contains the functions for monitoring the exporting tasks submitted to GEE. The
+#              states of the tasks are cached in a monitor (a dictionary) keyed by task descriptions, so
+#              that the throughput, the estimated time of arrival (ETA), stalled tasks and failed tasks of a
+#              job can be reported without going through all the operations every time.
+#
+# Note:        (1) This module does not import GEE. The operations are obtained with a "list operations"
+#                  function stored in a monitor, which is "ee.data.listOperations" by default and can be
+#                  replaced with a local stand-in (e.g., "replay_endpoint") for testing or dry runs;
+#              (2) Polling is incremental. The endpoint is not called again within 'min_interval' seconds,
+#                  the operations created before 'since' time or not matching 'filter' string are ignored,
+#                  and only the operations with a new 'updateTime' are parsed again;
+#              (3) When a task was resubmitted with the same description, the latest operation is kept.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+import time
+from datetime import datetime, timezone
+
+
+
+ACTIVE_STATES   = ['PENDING', 'RUNNING', 'CANCELLING']
+TERMINAL_STATES = ['SUCCEEDED', 'FAILED', 'CANCELLED']
+FAILED_STATES   = ['FAILED', 'CANCELLED']
+
+
+
+
+#############################################################################################################
+# Description: These functions provide the default operations endpoint (GEE) and a local stand-in that
+#              replays a sequence of operation snapshots (the last snapshot is repeated once exhausted).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def gee_list_operations():
+  import ee
+
+  return ee.data.listOperations()
+
+
+
+def replay_endpoint(Snapshots):
+  snapshots = list(Snapshots)
+  calls     = {'count': 0}
+
+  def list_operations():
+    index = min(calls['count'], len(snapshots) - 1)
+    calls['count'] += 1
+    return snapshots[index] if index >= 0 else []
+
+  return list_operations
+
+
+
+
+#############################################################################################################
+# Description: This function converts an RFC 3339 time string (e.g., '2026-10-19T15:04:05.123Z') of an
+#              operation into UTC seconds (None for an empty string).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def time_seconds(TimeStr):
+  if not TimeStr:
+    return None
+
+  moment = datetime.strptime(str(TimeStr)[:19], '%Y-%m-%dT%H:%M:%S').replace(tzinfo = timezone.utc)
+
+  return moment.timestamp()
+
+
+
+
+#############################################################################################################
+# Description: This function creates a task monitor.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def new_monitor(Filter = '', Since = '', ListOps = None, MinInterval = 30, StallSecs = 1800, Clock = None):
+  '''Returns a task monitor (a dictionary).
+
+     Args:
+       Filter(string): A string that the descriptions of monitored tasks contain (all tasks if empty);
+       Since(string): An optional RFC 3339 time string, before which the created tasks are ignored;
+       ListOps(function): A function returning a list of operations ("ee.data.listOperations" by default);
+       MinInterval(float): The minimum interval (seconds) between two calls of the endpoint;
+       StallSecs(float): The time (seconds) without any update, after which an active task is stalled;
+       Clock(function): A function returning current UTC seconds ("time.time" by default).'''
+  return {'filter':       str(Filter),
+          'since':        time_seconds(Since) if Since else None,
+          'list_ops':     ListOps if ListOps != None else gee_list_operations,
+          'min_interval': float(MinInterval),
+          'stall_secs':   float(StallSecs),
+          'clock':        Clock if Clock != None else time.time,
+          'last_poll':    None,
+          'nb_polls':     0,
+          'tasks':        {}}
+
+
+
+
+#############################################################################################################
+# Description: This function polls the operations endpoint of a monitor and updates the cached states of
+#              the monitored tasks.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def poll_tasks(Monitor, Force = False):
+  '''Returns the list of the descriptions of the tasks whose states have changed since last poll.
+
+     Args:
+       Monitor(Dictionary): A task monitor created with "new_monitor" function;
+       Force(Boolean): A flag indicating if to call the endpoint regardless of 'min_interval'.'''
+  now = Monitor['clock']()
+  if not Force and Monitor['last_poll'] != None and now - Monitor['last_poll'] < Monitor['min_interval']:
+    return []
+
+  operations = Monitor['list_ops']()
+  Monitor['last_poll'] = now
+  Monitor['nb_polls'] += 1
+
+  tasks   = Monitor['tasks']
+  changed = []
+  for op in operations:
+    meta = op.get('metadata', {})
+    desc = str(meta.get('description', ''))
+    if Monitor['filter'] not in desc:
+      continue
+
+    #--------------------------------------------------------------------------------------------------------
+    # Skip the operations that have been parsed or have been replaced by a resubmitted task
+    #--------------------------------------------------------------------------------------------------------
+    cached = tasks.get(desc)
+    update = str(meta.get('updateTime', ''))
+    if cached != None and cached['name'] == op.get('name') and cached['update_str'] == update:
+      continue
+
+    create = time_seconds(meta.get('createTime'))
+    if Monitor['since'] != None and create != None and create < Monitor['since']:
+      continue
+    if cached != None and cached['name'] != op.get('name') and create != None and cached['create'] != None and create < cached['create']:
+      continue
+
+    state = str(meta.get('state', 'PENDING'))
+    tasks[desc] = {'name':       op.get('name'),
+                   'state':      state,
+                   'progress':   1.0 if state == 'SUCCEEDED' else float(meta.get('progress', 0.0)),
+                   'create':     create,
+                   'start':      time_seconds(meta.get('startTime')),
+                   'update':     time_seconds(update),
+                   'end':        time_seconds(meta.get('endTime')),
+                   'update_str': update,
+                   'error':      op.get('error', {}).get('message', '') if state in FAILED_STATES else ''}
+
+    if cached == None or cached['state'] != state or cached['progress'] != tasks[desc]['progress']:
+      changed.append(desc)
+
+  return changed
+
+
+
+
+#############################################################################################################
+# Description: These functions return the monitored tasks that are stalled (active but without any update
+#              for 'stall_secs' seconds) or failed (failed or cancelled).
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def stalled_tasks(Monitor, JobFilter = ''):
+  now = Monitor['clock']()
+
+  return sorted(desc for desc, task in Monitor['tasks'].items()
+                if JobFilter in desc and task['state'] in ACTIVE_STATES
+                and now - (task['update'] or task['create'] or now) > Monitor['stall_secs'])
+
+
+
+def failed_tasks(Monitor, JobFilter = ''):
+  return sorted(desc for desc, task in Monitor['tasks'].items() if JobFilter in desc and task['state'] in FAILED_STATES)
+
+
+
+
+#############################################################################################################
+# Description: This function summarizes the monitored tasks of a job (the tasks whose descriptions contain
+#              a given string), including the throughput and the estimated time of arrival (ETA).
+#
+# Note:        The throughput is the number of finished tasks per hour since the first task was created.
+#              Running tasks are counted with their progress, so an ETA is available before the first task
+#              finishes.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def job_status(Monitor, JobFilter = ''):
+  '''Returns a dictionary with the number of tasks in each state, the finished fraction, the throughput
+     (tasks per hour), the ETA (UTC seconds, None if unknown) and the lists of stalled and failed tasks.
+
+     Args:
+       Monitor(Dictionary): A task monitor created with "new_monitor" function;
+       JobFilter(string): A string that the descriptions of the tasks of the job contain.'''
+  now   = Monitor['clock']()
+  tasks = [task for desc, task in Monitor['tasks'].items() if JobFilter in desc]
+
+  counts = {}
+  for task in tasks:
+    counts[task['state']] = counts.get(task['state'], 0) + 1
+
+  total    = len(tasks)
+  finished = sum(1 for task in tasks if task['state'] in TERMINAL_STATES)
+  progress = sum(1.0 if task['state'] in TERMINAL_STATES else task['progress'] for task in tasks)
+  creates  = [task['create'] for task in tasks if task['create'] != None]
+  elapsed  = now - min(creates) if len(creates) > 0 else 0.0
+
+  throughput = progress*3600.0/elapsed if elapsed > 0 else 0.0
+  eta        = now + (total - progress)*3600.0/throughput if throughput > 0 and finished < total else (now if total > 0 and finished == total else None)
+
+  return {'total':      total,
+          'counts':     counts,
+          'finished':   finished,
+          'fraction':   progress/total if total > 0 else 0.0,
+          'throughput': throughput,
+          'eta':        eta,
+          'stalled':    stalled_tasks(Monitor, JobFilter),
+          'failed':     failed_tasks(Monitor, JobFilter)}
+
+
+
+
+#############################################################################################################
+# Description: This function polls a monitor and prints a short status report of a job.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Added 'Force' parameter for interactive reports
+#
+#############################################################################################################
+def print_status(Monitor, JobFilter = '', Verbose = False, Force = False):
+  poll_tasks(Monitor, Force)
+  status = job_status(Monitor, JobFilter)
+
+  eta_str = datetime.fromtimestamp(status['eta'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC') if status['eta'] != None else 'unknown'
+  print('\n<print_status> {} tasks, {:.1f}% done, {:.1f} tasks/hour, ETA: {}'.format(status['total'], status['fraction']*100.0, status['throughput'], eta_str))
+  print('<print_status> States: {}'.format(', '.join('{} = {}'.format(state, count) for state, count in sorted(status['counts'].items()))))
+
+  for desc in status['stalled']:
+    print('<print_status> Stalled: {}'.format(desc))
+  for desc in status['failed']:
+    print('<print_status> Failed: {} ({})'.format(desc, Monitor['tasks'][desc]['error']))
+
+  if Verbose:
+    for desc, task in sorted(Monitor['tasks'].items()):
+      if JobFilter in desc:
+        print('{}: {} ({:.0f}%)'.format(desc, task['state'], task['progress']*100.0))
+
+  return status
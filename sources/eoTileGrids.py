@@ -90,7 +90,8 @@ validTile_polygons = ee.List([geoTile51, geoTile61, geoTile62, geoTile63, geoTil
 #############################################################################################################
 
 
-tile_name_list = ee.List([
+# The names of all the tiles and subtiles with polygons (a client-side list, see "get_subTile_names")
+TILE_NAMES = [
 'tile13', 'tile14',
 'tile21', 'tile22', 'tile23', 'tile24', 'tile25',
 'tile31', 'tile32', 'tile33', 'tile34', 'tile35', 'tile36',
@@ -148,7 +149,9 @@ tile_name_list = ee.List([
 'tile55_911','tile55_912','tile55_913','tile55_921','tile55_922','tile55_923','tile55_931','tile55_932','tile55_933',
 'tile56_911','tile56_912','tile56_913','tile56_921','tile56_922','tile56_923','tile56_931','tile56_932','tile56_933',
 'tile57_911','tile57_912','tile57_913','tile57_921','tile57_922','tile57_923','tile57_931','tile57_932','tile57_933'
-])
+]
+
+tile_name_list = ee.List(TILE_NAMES)
 
 
 
@@ -655,6 +658,49 @@ def get_9subTiles(tile_name):
    
 
 
+#############################################################################################################
+# Description: This function returns the names of 4 or 9 subtiles of a given full tile name (e.g., 'tile55'). 
+#              An empty list will be returned if the given tile name is not a full tile name.
+#
+# Note:        Only the subtiles with polygons (listed in 'TILE_NAMES') are returned, so an empty list is
+#              returned for a tile without 4 or 9 subtiles (e.g., 'tile65').
+#
+# Revision history:  2026-Oct-19  Initial creation
+#                    2026-Oct-19  Excluded the subtiles without polygons
+#
+#############################################################################################################
+def get_subTile_names(tile_name, nSubs):
+  name  = str(tile_name).lower()
+  nSubs = int(nSubs)
+
+  if not name.startswith('tile') or name.find('_') > -1 or nSubs not in [4, 9]:
+    return []
+  
+  nRows = 2 if nSubs == 4 else 3
+
+  sub_names = [name + '_' + str(nSubs) + str(r) + str(c) for r in range(1, nRows+1) for c in range(1, nRows+1)]
+
+  return [sub_name for sub_name in sub_names if sub_name in TILE_NAMES]
+
+
+
+
+#############################################################################################################
+# Description: This function returns a dictionary with the names and (slightly expanded) polygons of the 4 
+#              or 9 subtiles of a given full tile name.
+#
+# Revision history:  2026-Oct-19  Initial creation
+#
+#############################################################################################################
+def get_subTile_regions(tile_name, nSubs, Delta = 0.02):
+  regions = {}
+  for sub_name in get_subTile_names(tile_name, nSubs):
+    regions[sub_name] = expandSquare(ee.Geometry(PolygonDict.get(sub_name)), Delta)
+
+  return regions
+
+
+
 #############################################################################################################
 # Description: This function converts a tile polygon to anticlockwise coordinates, as required for querying
 #              ICESat-2 data.